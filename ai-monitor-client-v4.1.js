@@ -771,7 +771,11 @@
         GM_xmlhttpRequest({
             method:  'POST',
             url:     config.server_url + '/update',
-            headers: { 'Content-Type': 'application/json', 'X-AI-Monitor-Client': '1' },
+            headers: {
+                'Content-Type': 'application/json',
+                'X-AI-Monitor-Client': '1',
+                'X-AI-Monitor-Source': data.source || '',
+            },
             data:    JSON.stringify(data),
             timeout: 5000,
             onload(resp) {
@@ -779,6 +783,9 @@
                     lastSuccessTime = Date.now();
                     setStatus('success');
                     dbg('✓ 伺服器已接收');
+                } else if (resp.status === 429) {
+                    const m = /retry-after:\s*(\d+)/i.exec(resp.responseHeaders || '');
+                    setStatus('error', '伺服器限流' + (m ? '，' + m[1] + ' 秒後再試' : ''));
                 } else {
                     setStatus('error', '伺服器 ' + resp.status);
                 }
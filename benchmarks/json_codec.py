@@ -0,0 +1,81 @@
+"""
+services.json_codec 各後端的編解碼微基準測試。
+
+執行方式（於專案根目錄）：
+    python -m benchmarks.json_codec
+    python -m benchmarks.json_codec --number 20000 --json out.json
+
+以四個瀏覽器來源的擬真 payload（benchmarks.payloads）量測熱路徑：
+- loads        POST /update 的 body 解析（每個來源各一筆）
+- dumps        journal 每行的序列化（每個來源各一筆）
+- status       GET /status 全量回應（四個來源合成一個 dict）
+- digest       去重用的 sort_keys 序列化
+- indent       data_log.json / config.json 的縮排輸出
+未安裝 orjson 時只會列出 json（標準函式庫）。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.payloads import SOURCES, make_payload
+from services import json_codec
+
+
+def _cases() -> dict:
+    payloads = [make_payload(src, 7) for src in SOURCES]
+    for p in payloads:
+        p["received_at"] = "2026-10-17T09:30:00.123456"
+    encoded = [json.dumps(p).encode("utf-8") for p in payloads]
+    store = {p["source"]: p for p in payloads}
+    codec = json_codec
+
+    return {
+        "loads": lambda: [codec.loads(b) for b in encoded],
+        "dumps": lambda: [codec.dumps(p) for p in payloads],
+        "status": lambda: codec.dumps(store),
+        "digest": lambda: [codec.dumps(p, sort_keys=True) for p in payloads],
+        "indent": lambda: codec.dumps(store, indent=True),
+    }
+
+
+def run_backend(name: str, number: int) -> dict:
+    json_codec.use_backend(name)
+    result = {"backend": name}
+    for case, fn in _cases().items():
+        best = min(timeit.repeat(fn, number=number, repeat=3))
+        result[f"{case}_us"] = round(best / number * 1e6, 2)
+    return result
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--number", type=int, default=5000, help="iterations per measurement")
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args(argv)
+
+    default = json_codec.BACKEND
+    try:
+        results = [run_backend(name, args.number) for name in json_codec.available_backends()]
+    finally:
+        json_codec.use_backend(default)
+
+    cases = [k for k in results[0] if k != "backend"]
+    print(f"\n{'backend':<10}" + "".join(f"{c:>12}" for c in cases))
+    for r in results:
+        print(f"{r['backend']:<10}" + "".join(f"{r[c]:>12}" for c in cases))
+    print("（單位：微秒 / 次）")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
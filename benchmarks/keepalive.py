@@ -0,0 +1,134 @@
+"""
+比較 thread 引擎在 HTTP/1.0（每個請求一條新連線）與 HTTP/1.1 keep-alive 下的吞吐量與延遲。
+
+執行方式（於專案根目錄）：
+    python -m benchmarks.keepalive
+    python -m benchmarks.keepalive --clients 8 --requests 400 --json out.json
+
+每個用戶端模擬一個開著監控頁面的瀏覽器分頁：POST /update、
+GET /poll?seq=N，每 10 個請求再讀一次 /status。用戶端以 http.client
+送出，伺服器回 Connection: close 時會自動重新連線，因此兩種模式
+使用同一份用戶端程式，差異只在伺服器端的 protocol_version。
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.payloads import SOURCES, make_payload
+from benchmarks.server_engines import _free_port, _percentile
+from services import local_server
+
+MODES = {
+    "http/1.0": "HTTP/1.0",
+    "keep-alive": "HTTP/1.1",
+}
+
+
+def _browser_client(port: int, n: int, cid: int, latencies: list, errors: list,
+                    connects: list):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    src = SOURCES[cid % len(SOURCES)]
+    headers = {
+        "Content-Type": "application/json",
+        "X-AI-Monitor-Client": "1",
+        "X-AI-Monitor-Source": src,
+    }
+    opened = 0
+    for i in range(n):
+        if conn.sock is None:
+            opened += 1
+        t0 = time.perf_counter()
+        try:
+            if i % 10 == 9:
+                conn.request("GET", "/status")
+            elif i % 2:
+                conn.request("GET", f"/poll?seq={i}")
+            else:
+                body = json.dumps(make_payload(src, i)).encode()
+                conn.request("POST", "/update", body, headers)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status != 200:
+                errors.append(resp.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(repr(e))
+            conn.close()
+            continue
+        latencies.append(time.perf_counter() - t0)
+    conn.close()
+    connects.append(opened)
+
+
+def run_mode(mode: str, clients: int, requests: int) -> dict:
+    handler = local_server._Handler
+    saved = handler.protocol_version
+    handler.protocol_version = MODES[mode]
+    port = _free_port()
+    local_server.start(port, engine="thread")
+    try:
+        latencies: list[float] = []
+        errors: list = []
+        connects: list[int] = []
+        threads = [
+            threading.Thread(target=_browser_client,
+                             args=(port, requests, c, latencies, errors, connects))
+            for c in range(clients)
+        ]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+    finally:
+        local_server.stop()
+        handler.protocol_version = saved
+
+    lat = sorted(latencies)
+    return {
+        "mode": mode,
+        "clients": clients,
+        "requests": len(lat),
+        "errors": len(errors),
+        "connections": sum(connects),
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(len(lat) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_percentile(lat, 50) * 1000, 2),
+        "p99_ms": round(_percentile(lat, 99) * 1000, 2),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--clients", type=int, default=4, help="simulated browser tabs")
+    ap.add_argument("--requests", type=int, default=300, help="requests per client")
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args(argv)
+
+    local_server.set_log_path(os.path.join(tempfile.mkdtemp(prefix="aimon-bench-"), "data_log.json"))
+    local_server.set_rate_limits(0, 0, 0, 0)
+
+    results = [run_mode(m, args.clients, args.requests) for m in MODES]
+
+    print(f"\n{'mode':<12}{'req':>8}{'err':>6}{'conns':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for r in results:
+        print(f"{r['mode']:<12}{r['requests']:>8}{r['errors']:>6}{r['connections']:>8}"
+              f"{r['rps']:>10}{r['p50_ms']:>10}{r['p99_ms']:>10}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""
+本地伺服器負載產生器 — 模擬 N 個瀏覽器用戶端同時送出 /update、/poll、/status。
+
+執行方式（於專案根目錄）：
+    python -m benchmarks.load                               # process 內啟動 thread 引擎
+    python -m benchmarks.load --engine asyncio --clients 32 --duration 20
+    python -m benchmarks.load --url http://127.0.0.1:7890   # 對已執行中的程式量測
+    python -m benchmarks.load --json after.json --compare before.json
+
+每個用戶端一條執行緒、一條 keep-alive 連線，依各自的速率（次/秒）排程
+（長輪詢與瀏覽器一樣另開一條連線與執行緒，不阻擋其他請求）：
+- --update-rate  POST /update，四個來源輪流（benchmarks.payloads 的擬真資料）
+- --poll-rate    GET /poll?seq=N（--poll-wait > 0 時為長輪詢）
+- --status-rate  GET /status
+速率為 0 代表不送該類請求。
+
+輸出：各類請求的吞吐量、延遲百分位數、狀態碼分佈；process 內模式另外取樣
+伺服器執行緒數（不含用戶端與取樣執行緒），--url 模式改由 /debug/stats 取樣
+連線數。--json 會寫出含環境資訊的結果，--compare 讀取先前的結果並列出差異。
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.payloads import SOURCES, make_payload
+from benchmarks.server_engines import _free_port, _percentile
+from services import json_codec, local_server
+
+KINDS = ("update", "poll", "status")
+
+
+class _ClientResult:
+    def __init__(self):
+        self.latencies = {k: [] for k in KINDS}
+        self.status: dict[str, dict[int, int]] = {k: {} for k in KINDS}
+        self.errors: list[str] = []
+
+
+def _client(host: str, port: int, cid: int, rates: dict, poll_wait: float,
+            clock: dict, start_evt: threading.Event, out: _ClientResult):
+    conn = http.client.HTTPConnection(host, port, timeout=max(10.0, poll_wait + 5))
+    rng = random.Random(cid)
+    seq = 0
+    i = 0
+    start_evt.wait()
+    deadline = clock["deadline"]
+    now = time.perf_counter()
+    # 各類請求下一次的預定時間；起點隨機錯開，避免所有用戶端同時送出
+    due = {k: now + rng.random() / r for k, r in rates.items() if r > 0}
+
+    while due:
+        kind = min(due, key=due.get)
+        at = due[kind]
+        if at >= deadline:
+            break
+        delay = at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        due[kind] = at + 1.0 / rates[kind]
+
+        t0 = time.perf_counter()
+        try:
+            if kind == "update":
+                src = SOURCES[(cid + i) % len(SOURCES)]
+                body = json.dumps(make_payload(src, cid * 100000 + i)).encode()
+                conn.request("POST", "/update", body, {
+                    "Content-Type": "application/json",
+                    "X-AI-Monitor-Client": "1",
+                    "X-AI-Monitor-Source": src,
+                })
+                i += 1
+            elif kind == "poll":
+                path = f"/poll?seq={seq}"
+                if poll_wait > 0:
+                    # 不等超過量測結束時間，避免拖長 elapsed
+                    wait = min(poll_wait, max(0.0, deadline - t0))
+                    path += f"&wait={wait:.2f}"
+                conn.request("GET", path)
+            else:
+                conn.request("GET", "/status")
+            resp = conn.getresponse()
+            data = resp.read()
+        except (OSError, http.client.HTTPException) as e:
+            out.errors.append(f"{kind}: {e!r}")
+            conn.close()
+            continue
+        out.latencies[kind].append(time.perf_counter() - t0)
+        codes = out.status[kind]
+        codes[resp.status] = codes.get(resp.status, 0) + 1
+        if kind == "poll" and resp.status == 200:
+            try:
+                seq = json.loads(data).get("seq", seq)
+            except ValueError:
+                pass
+    conn.close()
+
+
+def _sample_server(stop: threading.Event, exclude: set, samples: list,
+                   host: str, port: int, in_process: bool):
+    """Every 100 ms record server thread count (in-process) or open connections (remote)."""
+    conn = None if in_process else http.client.HTTPConnection(host, port, timeout=5)
+    while not stop.wait(0.1):
+        if in_process:
+            samples.append(sum(1 for t in threading.enumerate() if t.ident not in exclude))
+            continue
+        try:
+            conn.request("GET", "/debug/stats")
+            stats = json.loads(conn.getresponse().read())
+            # 扣掉取樣本身這條連線
+            samples.append(stats["server"]["connections"]["active"] - 1)
+        except (OSError, http.client.HTTPException, ValueError, KeyError):
+            conn.close()
+    if conn is not None:
+        conn.close()
+
+
+def _summarize(lat: list[float], codes: dict, elapsed: float) -> dict:
+    lat = sorted(lat)
+    return {
+        "requests": len(lat),
+        "rps": round(len(lat) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_percentile(lat, 50) * 1000, 2),
+        "p90_ms": round(_percentile(lat, 90) * 1000, 2),
+        "p99_ms": round(_percentile(lat, 99) * 1000, 2),
+        "max_ms": round(lat[-1] * 1000, 2) if lat else 0.0,
+        "status": {str(k): v for k, v in sorted(codes.items())},
+    }
+
+
+def run(host: str, port: int, in_process: bool, clients: int, duration: float,
+        rates: dict, poll_wait: float) -> dict:
+    start_evt = threading.Event()
+    clock = {"deadline": 0.0}
+    # 長輪詢時 /poll 由獨立的連線送出
+    if poll_wait > 0 and rates.get("poll", 0) > 0:
+        groups = [{k: r for k, r in rates.items() if k != "poll"}, {"poll": rates["poll"]}]
+    else:
+        groups = [rates]
+    groups = [g for g in groups if any(r > 0 for r in g.values())]
+
+    results = []
+    threads = []
+    for c in range(clients):
+        for g, group in enumerate(groups):
+            out = _ClientResult()
+            results.append(out)
+            threads.append(threading.Thread(
+                target=_client, daemon=True, name=f"load-client-{c}-{g}",
+                args=(host, port, c, group, poll_wait, clock, start_evt, out)))
+    for t in threads:
+        t.start()
+
+    # 取樣時排除的執行緒（主執行緒、用戶端、取樣器本身）
+    exclude = {t.ident for t in threads} | {threading.main_thread().ident}
+    stop_sampler = threading.Event()
+    samples: list[int] = []
+    sampler = threading.Thread(target=_sample_server, daemon=True, name="load-sampler",
+                               args=(stop_sampler, exclude, samples, host, port, in_process))
+    sampler.start()
+    exclude.add(sampler.ident)
+
+    t0 = time.perf_counter()
+    clock["deadline"] = t0 + duration
+    start_evt.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    stop_sampler.set()
+    sampler.join()
+
+    merged = _ClientResult()
+    for r in results:
+        for k in KINDS:
+            merged.latencies[k].extend(r.latencies[k])
+            for code, n in r.status[k].items():
+                merged.status[k][code] = merged.status[k].get(code, 0) + n
+        merged.errors.extend(r.errors)
+
+    all_lat = [x for k in KINDS for x in merged.latencies[k]]
+    all_codes: dict[int, int] = {}
+    for k in KINDS:
+        for code, n in merged.status[k].items():
+            all_codes[code] = all_codes.get(code, 0) + n
+
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "total": _summarize(all_lat, all_codes, elapsed),
+        "by_kind": {k: _summarize(merged.latencies[k], merged.status[k], elapsed)
+                    for k in KINDS if rates.get(k, 0) > 0},
+        "errors": len(merged.errors),
+        "error_samples": merged.errors[:5],
+        "server": {
+            "metric": "threads" if in_process else "connections",
+            "max": max(samples) if samples else 0,
+            "mean": round(sum(samples) / len(samples), 1) if samples else 0.0,
+        },
+    }
+
+
+def _git_revision() -> str:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root,
+                             capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() if out.returncode == 0 else ""
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def _print_report(report: dict):
+    res = report["results"]
+    print(f"\n{report['target']}  clients={report['config']['clients']}  "
+          f"duration={report['config']['duration_s']}s  errors={res['errors']}")
+    print(f"{'kind':<8}{'req':>8}{'req/s':>10}{'p50 ms':>9}{'p90 ms':>9}"
+          f"{'p99 ms':>9}{'max ms':>9}  status")
+    rows = list(res["by_kind"].items()) + [("total", res["total"])]
+    for kind, r in rows:
+        print(f"{kind:<8}{r['requests']:>8}{r['rps']:>10}{r['p50_ms']:>9}{r['p90_ms']:>9}"
+              f"{r['p99_ms']:>9}{r['max_ms']:>9}  {r['status']}")
+    srv = res["server"]
+    print(f"server {srv['metric']}: max {srv['max']}, mean {srv['mean']}")
+    for e in res["error_samples"]:
+        print(f"  ! {e}")
+
+
+def _print_compare(before: dict, after: dict):
+    """Print relative change of throughput and latency per kind against an earlier run."""
+    print(f"\n比較：{before.get('label') or before.get('git') or '前次'} → "
+          f"{after.get('label') or after.get('git') or '本次'}")
+    old_kinds = dict(before["results"]["by_kind"], total=before["results"]["total"])
+    new_kinds = dict(after["results"]["by_kind"], total=after["results"]["total"])
+    for kind, new in new_kinds.items():
+        old = old_kinds.get(kind)
+        if not old:
+            continue
+        parts = []
+        for key in ("rps", "p50_ms", "p99_ms"):
+            a, b = old[key], new[key]
+            pct = f"{(b - a) / a * 100:+.1f}%" if a else "n/a"
+            parts.append(f"{key} {a} → {b} ({pct})")
+        print(f"  {kind:<7}" + "  ".join(parts))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--url", help="measure a running server (e.g. http://127.0.0.1:7890) "
+                                  "instead of starting one in-process")
+    ap.add_argument("--engine", choices=local_server.ENGINES, default=local_server.DEFAULT_ENGINE)
+    ap.add_argument("--clients", type=int, default=16, help="simulated browser clients")
+    ap.add_argument("--duration", type=float, default=10.0, help="seconds")
+    ap.add_argument("--update-rate", type=float, default=5.0, help="POST /update per client per second")
+    ap.add_argument("--poll-rate", type=float, default=2.0, help="GET /poll per client per second")
+    ap.add_argument("--status-rate", type=float, default=1.0, help="GET /status per client per second")
+    ap.add_argument("--poll-wait", type=float, default=0.0, help="long-poll wait seconds (0 = short poll)")
+    ap.add_argument("--keep-rate-limits", action="store_true",
+                    help="in-process: keep the default /update rate limits (429s are counted)")
+    ap.add_argument("--label", default="", help="free-form name stored in the JSON results")
+    ap.add_argument("--json", help="write results to this file")
+    ap.add_argument("--compare", help="earlier --json output to compare against")
+    args = ap.parse_args(argv)
+
+    rates = {"update": args.update_rate, "poll": args.poll_rate, "status": args.status_rate}
+    if not any(r > 0 for r in rates.values()):
+        ap.error("at least one of --update-rate/--poll-rate/--status-rate must be > 0")
+
+    in_process = not args.url
+    if in_process:
+        host, port = "127.0.0.1", _free_port()
+        local_server.set_log_path(os.path.join(tempfile.mkdtemp(prefix="aimon-load-"), "data_log.json"))
+        if not args.keep_rate_limits:
+            local_server.set_rate_limits(0, 0, 0, 0)
+        local_server.start(port, engine=args.engine)
+        if not local_server.is_running():
+            sys.exit(1)
+        target = f"in-process {args.engine} :{port}"
+    else:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname or "127.0.0.1", parts.port or 80
+        target = args.url
+
+    try:
+        results = run(host, port, in_process, args.clients, args.duration, rates, args.poll_wait)
+    finally:
+        if in_process:
+            local_server.stop()
+
+    report = {
+        "label": args.label,
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "git": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "json_backend": json_codec.BACKEND,
+        "target": target,
+        "config": {
+            "engine": args.engine if in_process else None,
+            "clients": args.clients,
+            "duration_s": args.duration,
+            "rates_per_client": rates,
+            "poll_wait_s": args.poll_wait,
+            "rate_limits": args.keep_rate_limits or not in_process,
+        },
+        "results": results,
+    }
+    _print_report(report)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            _print_compare(json.load(f), report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
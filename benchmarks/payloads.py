@@ -0,0 +1,77 @@
+"""
+基準測試用的擬真 payload — 欄位與 ai-monitor-client-v4.1.js 各 transformer 送出的一致。
+
+make_payload(source, i) 會依序號微調數值，避免每筆內容完全相同。
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+SOURCES = ("openai_billing", "claude_usage", "claude_billing", "github_copilot")
+
+_PAGE_URLS = {
+    "openai_billing": "https://platform.openai.com/settings/organization/billing/overview",
+    "claude_usage":   "https://claude.ai/settings/usage",
+    "claude_billing": "https://platform.claude.com/settings/billing",
+    "github_copilot": "https://github.com/settings/copilot/features",
+}
+
+
+def _meta(source: str) -> dict:
+    return {
+        "source": source,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "page_url": _PAGE_URLS[source],
+    }
+
+
+def make_payload(source: str, i: int = 0) -> dict:
+    d = _meta(source)
+    if source == "openai_billing":
+        d.update({
+            "balance_usd": round(42.17 - i * 0.01, 2),
+            "credits_total_usd": 100.0,
+            "credits_used_usd": round(57.83 + i * 0.01, 2),
+            "hard_limit_usd": 120.0,
+            "soft_limit_usd": 96.0,
+            "month_usage_usd": round(12.3456 + i * 0.001, 4),
+            "tier": "Usage tier 2",
+            "auto_recharge": False,
+        })
+    elif source == "claude_usage":
+        d.update({
+            "session_percent": (17 + i) % 101,
+            "session_reset": "3 hrs 12 mins",
+            "weekly_percent": (41 + i // 10) % 101,
+            "weekly_reset": "4 days 6 hrs",
+            "extra_enabled": True,
+            "extra_spent": round(3.25 + i * 0.05, 2),
+            "extra_limit": 50.0,
+            "extra_percent": 7,
+            "extra_balance": 46.75,
+            "extra_resets": "November 1",
+            "auto_reload": False,
+        })
+    elif source == "claude_billing":
+        d.update({
+            "plan": "Build Tier 2",
+            "balance_usd": round(18.4 - i * 0.01, 2),
+            "this_month_usd": round(6.1234 + i * 0.001, 4),
+            "spend_limit_usd": 500.0,
+            "next_billing": "November 1, 2026",
+            "auto_recharge": True,
+        })
+    elif source == "github_copilot":
+        consumed = round(212.5 + i * 0.5, 1)
+        d.update({
+            "plan": "Copilot Pro+",
+            "included_total": 1500.0,
+            "included_consumed": consumed,
+            "included_percent": round(consumed / 1500 * 100, 1),
+            "billed_usd": 0.0,
+            "resets_in_days": 14,
+            "next_billing": "2026/11/1",
+        })
+    else:
+        raise ValueError(f"unknown source: {source}")
+    return d
@@ -0,0 +1,123 @@
+"""
+比較 local_server 兩種引擎（thread / asyncio）的吞吐量與延遲。
+
+執行方式（於專案根目錄）：
+    python -m benchmarks.server_engines
+    python -m benchmarks.server_engines --clients 16 --requests 500 --json out.json
+
+每個引擎在 process 內啟動於隨機 port，N 個用戶端執行緒以 http.client
+混合送出 POST /update 與 GET /status（4:1）。用戶端與伺服器共用 GIL，
+數字僅供兩引擎相互比較，不代表絕對效能。
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.payloads import SOURCES, make_payload
+from services import local_server
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentile(sorted_vals: list[float], p: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = min(len(sorted_vals) - 1, max(0, round(p / 100 * (len(sorted_vals) - 1))))
+    return sorted_vals[k]
+
+
+def _client(port: int, n: int, cid: int, latencies: list, errors: list):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    headers = {"Content-Type": "application/json"}
+    for i in range(n):
+        t0 = time.perf_counter()
+        try:
+            if i % 5 == 4:
+                conn.request("GET", "/status")
+            else:
+                src = SOURCES[(cid + i) % len(SOURCES)]
+                body = json.dumps(make_payload(src, i)).encode()
+                conn.request("POST", "/update", body, headers)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status != 200:
+                errors.append(resp.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(repr(e))
+            conn.close()
+            continue
+        latencies.append(time.perf_counter() - t0)
+    conn.close()
+
+
+def run_engine(engine: str, clients: int, requests: int) -> dict:
+    port = _free_port()
+    local_server.start(port, engine=engine)
+    try:
+        latencies: list[float] = []
+        errors: list = []
+        threads = [
+            threading.Thread(target=_client, args=(port, requests, c, latencies, errors))
+            for c in range(clients)
+        ]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+    finally:
+        local_server.stop()
+
+    lat = sorted(latencies)
+    return {
+        "engine": engine,
+        "clients": clients,
+        "requests": len(lat),
+        "errors": len(errors),
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(len(lat) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_percentile(lat, 50) * 1000, 2),
+        "p99_ms": round(_percentile(lat, 99) * 1000, 2),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--clients", type=int, default=8)
+    ap.add_argument("--requests", type=int, default=300, help="requests per client")
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args(argv)
+
+    local_server.set_log_path(os.path.join(tempfile.mkdtemp(prefix="aimon-bench-"), "data_log.json"))
+    local_server.set_rate_limits(0, 0, 0, 0)   # 量測引擎本身，不受 429 影響
+
+    results = [run_engine(e, args.clients, args.requests) for e in local_server.ENGINES]
+
+    print(f"\n{'engine':<10}{'req':>8}{'err':>6}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for r in results:
+        print(f"{r['engine']:<10}{r['requests']:>8}{r['errors']:>6}"
+              f"{r['rps']:>10}{r['p50_ms']:>10}{r['p99_ms']:>10}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
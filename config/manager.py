@@ -1,8 +1,9 @@
-import json
 import os
 import base64
 from pathlib import Path
 
+from services import json_codec
+
 
 CONFIG_DIR = Path.home() / ".config" / "ai-quota-monitor"
 CONFIG_FILE = CONFIG_DIR / "config.json"
@@ -10,6 +11,18 @@ CONFIG_FILE = CONFIG_DIR / "config.json"
 DEFAULT_CONFIG = {
     "auto_refresh_minutes": 30,
     "server_port": 7890,
+    "server_engine": "thread",   # "thread" 或 "asyncio"
+    "max_body_kb": 256,          # /update body 上限，超過回傳 413
+    "rate_limits": {             # /update 流量限制（次/秒；rate <= 0 代表不限制）
+        "per_source_rate": 2.0,
+        "per_source_burst": 20,
+        "global_rate": 20.0,
+        "global_burst": 100,
+    },
+    "history": {                 # data_history.db 保留策略
+        "raw_days": 7,           # 完整解析度保留天數
+        "hourly_days": 90,       # 之後以每小時彙總保留的天數（更舊的為每日彙總）
+    },
     "widget": {
         "x": -32768,
         "y": -32768,
@@ -80,6 +93,27 @@ def _decode(text: str) -> str:
         return text
 
 
+def _numeric_section(name: str, data: dict) -> dict:
+    """DEFAULT_CONFIG[name] overlaid with the numeric values found in data[name].
+
+    Unknown keys and non-numeric values are dropped so the section can be
+    passed to its setter as keyword arguments (e.g. set_rate_limits(**...)).
+    """
+    section = dict(DEFAULT_CONFIG[name])
+    values = data.get(name)
+    if not isinstance(values, dict):
+        return section
+    for key, default in section.items():
+        value = values.get(key)
+        if isinstance(value, bool):
+            continue
+        try:
+            section[key] = type(default)(value)
+        except (TypeError, ValueError):
+            pass
+    return section
+
+
 class ConfigManager:
     def __init__(self):
         self._config = None
@@ -94,13 +128,17 @@ class ConfigManager:
             self.save()
             return self._config
 
-        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        with open(CONFIG_FILE, "rb") as f:
+            data = json_codec.loads(f.read())
 
         # Merge with defaults to handle new keys
         config = DEFAULT_CONFIG.copy()
         config["auto_refresh_minutes"] = data.get("auto_refresh_minutes", 30)
         config["server_port"] = data.get("server_port", 7890)
+        config["server_engine"] = data.get("server_engine", "thread")
+        config["max_body_kb"] = data.get("max_body_kb", 256)
+        config["rate_limits"] = _numeric_section("rate_limits", data)
+        config["history"] = _numeric_section("history", data)
         if "widget" in data:
             config["widget"].update(data["widget"])
         for svc_key in DEFAULT_CONFIG["services"]:
@@ -130,7 +168,7 @@ class ConfigManager:
             return
 
         # Deep copy and encode sensitive fields
-        data = json.loads(json.dumps(self._config))
+        data = json_codec.loads(json_codec.dumps(self._config))
         services = data["services"]
         if services["github_copilot"]["token"]:
             services["github_copilot"]["token"] = _encode(services["github_copilot"]["token"])
@@ -145,8 +183,8 @@ class ConfigManager:
         if services["github_copilot_web"]["session_cookie"]:
             services["github_copilot_web"]["session_cookie"] = _encode(services["github_copilot_web"]["session_cookie"])
 
-        with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        with open(CONFIG_FILE, "wb") as f:
+            f.write(json_codec.dumps(data, indent=True))
 
     def get(self) -> dict:
         if self._config is None:
@@ -167,3 +205,8 @@ class ConfigManager:
         if self._config is None:
             self.load()
         self._config["server_port"] = port
+
+    def set_server_engine(self, engine: str):
+        if self._config is None:
+            self.load()
+        self._config["server_engine"] = engine
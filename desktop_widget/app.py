@@ -16,7 +16,6 @@ import sys
 import threading
 import webbrowser
 from datetime import datetime
-from pathlib import Path
 
 import tkinter as tk
 from tkinter import ttk
@@ -29,7 +28,10 @@ from services.browser_data import (
     BrowserGitHubCopilotService,
 )
 from services import local_server
+from services import event_bus
+from services import refresh_scheduler
 from services.base import ServiceResult
+from gui.app import DashboardWindow
 
 from desktop_widget.clock import FlipClock
 from desktop_widget.cards import CompactServiceCard
@@ -50,6 +52,7 @@ BROWSER_SERVICE_SOURCES = {
     "browser_claude_billing": "claude_billing",
     "browser_github_copilot": "github_copilot",
 }
+SOURCE_SERVICE_KEYS = {src: key for key, src in BROWSER_SERVICE_SOURCES.items()}
 
 SERVICE_NAMES = {
     "browser_openai":         "OpenAI 帳單 (瀏覽器)",
@@ -287,17 +290,22 @@ class DesktopWidget(tk.Tk):
         self.config_manager = ConfigManager()
         self.config_data = self.config_manager.load()
         self._result_queue: queue.Queue = queue.Queue()
-        self._last_browser_ts: dict[str, str] = {}
+        # 其他執行緒（匯流排、排程器、單一執行個體監聽）要在 Tk 執行緒執行的呼叫
+        self._command_queue: queue.Queue = queue.Queue()
         self._visible = True
         self._drag_x = 0
         self._drag_y = 0
         self._desktop_level: bool = self.config_data.get("widget", {}).get(
             "desktop_level", True
         )
+        self._main_window: DashboardWindow | None = None
 
         # 啟動本地 HTTP 伺服器
         port = self.config_data.get("server_port", 7890)
-        local_server.start(port)
+        local_server.set_rate_limits(**self.config_data.get("rate_limits", {}))
+        local_server.set_history_retention(**self.config_data.get("history", {}))
+        local_server.set_max_body_bytes(self.config_data.get("max_body_kb", 256) * 1024)
+        local_server.start(port, engine=self.config_data.get("server_engine", "thread"))
 
         self._setup_window()
         self._build_ui()
@@ -307,7 +315,14 @@ class DesktopWidget(tk.Tk):
         # 初始化卡片狀態
         self.after(300, self._init_browser_cards)
         self.after(100, self._poll_queue)
-        self.after(1500, self._poll_browser_live)
+        # 瀏覽器資料：每筆 /update 由事件匯流排立即通知
+        self._bus_sub = event_bus.bus.subscribe(
+            BROWSER_SERVICE_SOURCES.values(), self._on_browser_update)
+        # 自動重新整理：依各額度的重置時間排程
+        scheduler = refresh_scheduler.scheduler
+        scheduler.configure(self.config_data.get("auto_refresh_minutes", 30))
+        scheduler.add_listener(self._on_scheduled_refresh)
+        scheduler.start()
 
         # 若設定桌面層則套用 Win32
         if self._desktop_level:
@@ -499,6 +514,10 @@ class DesktopWidget(tk.Tk):
     # ── 右鍵選單 ──────────────────────────────────────────────────────────
 
     def _show_context_menu(self, event):
+        # bind_all 也會收到主視窗（同一程式的 Toplevel）內的右鍵
+        widget = event.widget
+        if hasattr(widget, "winfo_toplevel") and widget.winfo_toplevel() is not self:
+            return
         menu = tk.Menu(
             self, tearoff=0,
             bg=COLORS["card_bg"], fg=COLORS["text"],
@@ -562,14 +581,14 @@ class DesktopWidget(tk.Tk):
         _open_all_in_new_window()
 
     def _open_main_window(self):
-        main_py = Path(sys.argv[0]).parent / "main.py"
-        try:
-            subprocess.Popen(
-                [sys.executable, str(main_py)],
-                creationflags=subprocess.CREATE_NEW_CONSOLE,
-            )
-        except Exception:
-            pass
+        """在同一程式內開啟主視窗（共用伺服器、資料與設定）；已開啟時移到最前面。"""
+        win = self._main_window
+        if win is not None and win.winfo_exists():
+            win.deiconify()
+            win.lift()
+            win.focus_force()
+            return
+        self._main_window = DashboardWindow(self, self.config_manager)
 
     def _opacity_dialog(self):
         OpacityDialog(self, self.config_manager, self.config_data)
@@ -580,6 +599,11 @@ class DesktopWidget(tk.Tk):
         self.status_label.config(text="更新中...", fg=COLORS["warning"])
         self.status_dot.config(fg=COLORS["warning"])
         local_server.request_refresh()
+        self._fetch_api_services()
+        refresh_scheduler.scheduler.note_refresh()
+        self.after(1500, self._restore_status)
+
+    def _fetch_api_services(self):
         config = self.config_manager.get()
         browser_keys = set(BROWSER_SERVICE_SOURCES.keys())
         for key, service in SERVICES:
@@ -593,7 +617,10 @@ class DesktopWidget(tk.Tk):
                         daemon=True,
                     )
                     t.start()
-        self.after(1500, self._restore_status)
+
+    def _on_scheduled_refresh(self, reason: str):
+        """排程器回呼（排程執行緒）：瀏覽器腳本已被通知，交給 Tk 執行緒重新查詢 API 服務。"""
+        self._command_queue.put((self._fetch_api_services, ()))
 
     def _init_browser_cards(self):
         config = self.config_manager.get()
@@ -608,25 +635,15 @@ class DesktopWidget(tk.Tk):
                 )
                 t.start()
 
-    def _poll_browser_live(self):
-        config = self.config_manager.get()
-        for svc_key, src_key in BROWSER_SERVICE_SOURCES.items():
-            entry = local_server.DATA_STORE.get(src_key)
-            if entry is None:
-                continue
-            new_ts = entry.get("received_at", "")
-            if new_ts != self._last_browser_ts.get(src_key, ""):
-                self._last_browser_ts[src_key] = new_ts
-                svc_obj = next((s for k, s in SERVICES if k == svc_key), None)
-                if svc_obj and svc_key in self.cards:
-                    svc_config = config["services"].get(svc_key, {})
-                    t = threading.Thread(
-                        target=self._fetch_service,
-                        args=(svc_key, svc_obj, svc_config),
-                        daemon=True,
-                    )
-                    t.start()
-        self.after(1500, self._poll_browser_live)
+    def _on_browser_update(self, source: str, payload):
+        """事件匯流排回呼（匯流排執行緒）：重新讀取該卡片資料，由 _poll_queue 更新畫面。"""
+        svc_key = SOURCE_SERVICE_KEYS.get(source)
+        svc_obj = next((s for k, s in SERVICES if k == svc_key), None)
+        if svc_obj is None or svc_key not in self.cards:
+            return
+        svc_config = self.config_manager.get()["services"].get(svc_key, {})
+        # fetch() 只讀取 local_server 的快照，直接在匯流排執行緒執行即可
+        self._fetch_service(svc_key, svc_obj, svc_config)
 
     def _fetch_service(self, key: str, service, config: dict):
         try:
@@ -637,9 +654,26 @@ class DesktopWidget(tk.Tk):
                 success=False,
                 error=str(e),
             )
+        local_server.record_service_result(key, result)
         self._result_queue.put((key, result))
 
     def _poll_queue(self):
+        self._run_commands()
+        self._drain_results()
+        self.after(200, self._poll_queue)
+
+    def _run_commands(self):
+        while True:
+            try:
+                func, args = self._command_queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"[AI Monitor] 背景要求處理失敗: {e}")
+
+    def _drain_results(self):
         updated = False
         while not self._result_queue.empty():
             try:
@@ -652,7 +686,6 @@ class DesktopWidget(tk.Tk):
         self._update_status_from_cards()
         if updated:
             self.after(30, self._auto_resize)
-        self.after(200, self._poll_queue)
 
     def _auto_resize(self):
         """依內容自動調整視窗高度，固定左上角位置，僅向下延伸。"""
@@ -697,10 +730,27 @@ class DesktopWidget(tk.Tk):
             if self._desktop_level:
                 self.after(100, self._sink_to_bottom)
 
+    def on_instance_command(self, command: str):
+        """單一執行個體回呼（監聽執行緒）：再次啟動時的命令交給 Tk 執行緒處理。"""
+        self._command_queue.put((self._run_instance_command, (command,)))
+
+    def _run_instance_command(self, command: str):
+        if command == "show":
+            if not self._visible:
+                self.toggle_visibility()
+            elif not self._desktop_level:
+                self.lift()
+        elif command == "refresh":
+            self.refresh_all()
+        elif command == "openurl":
+            _open_all_in_new_window()
+
     def quit_app(self):
         _close_oclaw_window()
         _close_oflaw_window()
         self._save_position()
+        self._bus_sub.close()
+        refresh_scheduler.scheduler.remove_listener(self._on_scheduled_refresh)
         local_server.stop()
         self.destroy()
 
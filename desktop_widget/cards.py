@@ -3,7 +3,10 @@
 資料欄位與主視窗 gui/widgets.py 的 ServiceCard 完全一致。
 """
 import tkinter as tk
+from datetime import datetime
 from services.base import ServiceResult
+from services.forecast import Forecast, format_when
+from services.quota_schema import QuotaRecord
 from desktop_widget.styles import (
     COLORS, SERVICE_ACCENTS, format_tokens, ProgressBar,
     COMPACT_CARD_PAD_X, COMPACT_CARD_PAD_Y,
@@ -80,7 +83,8 @@ class CompactServiceCard(tk.Frame):
             return
 
         self.status_dot.config(fg=COLORS["success"])
-        rows = self._format_data(result.service_name, result.data)
+        rows = self._format_data(result.service_name, result.data,
+                                 result.record, result.warning, result.forecasts)
         self._render(rows)
 
     def set_loading(self):
@@ -183,109 +187,114 @@ class CompactServiceCard(tk.Frame):
 
     # ── 資料格式化（與主視窗 gui/widgets.py _format_data 完全一致）────────
 
-    def _format_data(self, service_name: str, data: dict) -> list:
+    def _format_data(self, service_name: str, data: dict,
+                     record: QuotaRecord | None = None, warning: str | None = None,
+                     forecasts: dict | None = None) -> list:
+        """數值一律讀取 /update 時正規化的 record，data 只提供文字與旗標欄位。"""
         rows = []
+        if record is None:
+            rows.append(("無資料", "", WIDGET_SUBTEXT))
+            return rows
+        amount = record.amount
+        forecasts = forecasts or {}
+        self._browser_header(record, warning, rows)
 
         if service_name == "OpenAI 帳單 (瀏覽器)":
-            self._browser_header(data, rows)
-            if "balance_usd" in data:
-                rows.append(("帳戶餘額", f"${data['balance_usd']:.2f}", COLORS["green"]))
-            if "credits_used_usd" in data and "credits_total_usd" in data:
-                used = data["credits_used_usd"]
-                total = data["credits_total_usd"]
-                pct = round(used / total * 100, 1) if total > 0 else 0
-                rows.append({"type": "bar", "label": "Credits", "percent": pct,
-                             "detail": f"${used:.2f} / ${total:.2f}",
-                             "color": self._pct_color(pct)})
-            if "month_usage_usd" in data:
-                rows.append(("本月用量", f"${data['month_usage_usd']:.4f}"))
-            if "hard_limit_usd" in data:
-                rows.append(("月上限", f"${data['hard_limit_usd']:.2f}"))
+            if amount("balance_usd") is not None:
+                rows.append(("帳戶餘額", f"${amount('balance_usd'):.2f}", COLORS["green"]))
+            credits = record.metric("credits")
+            if credits:
+                rows.append({"type": "bar", "label": "Credits", "percent": credits.percent,
+                             "detail": f"${credits.used:.2f} / ${credits.limit:.2f}",
+                             "color": self._pct_color(credits.percent)})
+                self._forecast_row(forecasts.get("credits"), rows)
+            if amount("month_usage_usd") is not None:
+                rows.append(("本月用量", f"${amount('month_usage_usd'):.4f}"))
+            if amount("hard_limit_usd") is not None:
+                rows.append(("月上限", f"${amount('hard_limit_usd'):.2f}"))
             if data.get("tier"):
                 rows.append(("用量等級", data["tier"]))
             if data.get("auto_recharge"):
                 rows.append(("自動儲值", "已啟用", COLORS["success"]))
 
         elif service_name == "Claude.ai 用量 (瀏覽器)":
-            self._browser_header(data, rows)
-            if data.get("session_percent") is not None:
-                pct = data["session_percent"]
-                reset = data.get("session_reset", "")
-                rows.append({"type": "bar", "label": "本次工作階段", "percent": pct,
-                             "detail": f"重置於: {reset}" if reset else "",
-                             "color": self._pct_color(pct)})
-            if data.get("weekly_percent") is not None:
-                pct = data["weekly_percent"]
-                reset = data.get("weekly_reset", "")
-                rows.append({"type": "bar", "label": "每週限額", "percent": pct,
-                             "detail": f"重置於: {reset}" if reset else "",
-                             "color": self._pct_color(pct)})
-            if data.get("extra_enabled") or "extra_spent" in data or "extra_balance" in data:
-                pct   = data.get("extra_percent", 0)
-                reset = data.get("extra_resets", "")
-                spent = data.get("extra_spent")
-                limit = data.get("extra_limit")
-                bal   = data.get("extra_balance")
+            for name, label in (("session", "本次工作階段"), ("weekly", "每週限額")):
+                m = record.metric(name)
+                if m:
+                    rows.append({"type": "bar", "label": label, "percent": m.percent,
+                                 "detail": f"重置於: {m.reset_text}" if m.reset_text else "",
+                                 "color": self._pct_color(m.percent)})
+                    self._forecast_row(forecasts.get(name), rows)
+            extra = record.metric("extra")
+            if extra:
                 # 進度條（含重置日）
                 rows.append({"type": "bar", "label": "額外用量",
-                             "percent": pct,
-                             "detail": f"重置: {reset}" if reset else "",
-                             "color": self._pct_color(pct)})
+                             "percent": extra.percent,
+                             "detail": f"重置: {extra.reset_text}" if extra.reset_text else "",
+                             "color": self._pct_color(extra.percent)})
+                self._forecast_row(forecasts.get("extra"), rows)
                 # 摘要一行：已花費 / 上限 · 餘額
                 parts = []
-                if spent is not None and limit is not None:
-                    parts.append(f"${spent:.2f} / ${limit:.0f}")
-                elif spent is not None:
-                    parts.append(f"已花費 ${spent:.2f}")
-                if bal is not None:
-                    parts.append(f"餘額 ${bal:.2f}")
+                if extra.used is not None and extra.limit is not None:
+                    parts.append(f"${extra.used:.2f} / ${extra.limit:.0f}")
+                elif extra.used is not None:
+                    parts.append(f"已花費 ${extra.used:.2f}")
+                if amount("extra_balance") is not None:
+                    parts.append(f"餘額 ${amount('extra_balance'):.2f}")
                 if "auto_reload" in data:
                     parts.append("自動儲值" if data["auto_reload"] else "儲值:關")
                 if parts:
                     rows.append(("", "  ·  ".join(parts), COLORS["green"]))
 
         elif service_name == "Claude API 帳單 (瀏覽器)":
-            self._browser_header(data, rows)
             if data.get("plan"):
                 rows.append(("方案", data["plan"]))
-            if "monthly_usd" in data:
-                rows.append(("月費", f"${data['monthly_usd']:.2f}"))
-            if "this_month_usd" in data:
-                rows.append(("本月用量", f"${data['this_month_usd']:.4f}"))
-            if "balance_usd" in data:
-                rows.append(("帳戶餘額", f"${data['balance_usd']:.2f}", COLORS["green"]))
-            if "spend_limit_usd" in data:
-                rows.append(("消費上限", f"${data['spend_limit_usd']:.2f}"))
+            if amount("monthly_usd") is not None:
+                rows.append(("月費", f"${amount('monthly_usd'):.2f}"))
+            if amount("this_month_usd") is not None:
+                rows.append(("本月用量", f"${amount('this_month_usd'):.4f}"))
+            if amount("balance_usd") is not None:
+                rows.append(("帳戶餘額", f"${amount('balance_usd'):.2f}", COLORS["green"]))
+            if amount("spend_limit_usd") is not None:
+                rows.append(("消費上限", f"${amount('spend_limit_usd'):.2f}"))
             if data.get("next_billing"):
                 rows.append(("下次計費", data["next_billing"]))
 
         elif service_name == "GitHub Copilot (瀏覽器)":
-            self._browser_header(data, rows)
             if data.get("plan"):
                 rows.append(("方案", data["plan"]))
-            pct = data.get("included_percent")
-            if pct is not None:
-                consumed = data.get("included_consumed")
-                total = data.get("included_total")
-                detail = (f"{consumed:.1f} / {total:.0f} 次"
-                          if consumed is not None and total is not None else "")
+            premium = record.metric("premium_requests")
+            if premium:
                 rows.append({"type": "bar", "label": "Premium Requests",
-                             "percent": pct, "detail": detail,
-                             "color": self._pct_color(pct)})
-            if data.get("billed_usd") and data["billed_usd"] > 0:
-                rows.append(("已計費", f"${data['billed_usd']:.2f}", COLORS["peach"]))
+                             "percent": premium.percent,
+                             "detail": f"{premium.used:.1f} / {premium.limit:.0f} 次",
+                             "color": self._pct_color(premium.percent)})
+                self._forecast_row(forecasts.get("premium_requests"), rows)
+            if amount("billed_usd"):
+                rows.append(("已計費", f"${amount('billed_usd'):.2f}", COLORS["peach"]))
             if data.get("resets_in_days") is not None:
                 rows.append(("重置於", f"{data['resets_in_days']} 天後"))
             if data.get("next_billing"):
                 rows.append(("下次計費", data["next_billing"]))
 
-        if not rows:
-            rows.append(("無資料", "", WIDGET_SUBTEXT))
-
         return rows
 
-    def _browser_header(self, data: dict, rows: list):
-        if data.get("updated_at"):
-            rows.append(("更新時間", data["updated_at"], WIDGET_SUBTEXT))
-        if data.get("stale_warning"):
-            rows.append((data["stale_warning"], "", COLORS["warning"]))
+    @staticmethod
+    def _forecast_row(forecast: Forecast | None, rows: list):
+        """預計用完時間；早於重置時以紅色顯示。"""
+        if forecast is None or forecast.exhaust_at is None or forecast.percent >= 100:
+            return
+        when = format_when(forecast.exhaust_at)
+        if forecast.reset_at is None:
+            rows.append(("預計用完", when, COLORS["warning"]))
+        elif forecast.before_reset:
+            rows.append(("預計用完", f"{when} · 重置 {format_when(forecast.reset_at)}",
+                         COLORS["error"]))
+        else:
+            rows.append(("預計用完", "重置前不會用完", COLORS["success"]))
+
+    def _browser_header(self, record: QuotaRecord, warning: str | None, rows: list):
+        updated = datetime.fromtimestamp(record.received_ts).strftime("%H:%M:%S")
+        rows.append(("更新時間", updated, WIDGET_SUBTEXT))
+        if warning:
+            rows.append((warning, "", COLORS["warning"]))
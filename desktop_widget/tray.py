@@ -5,9 +5,6 @@
 """
 from __future__ import annotations
 import threading
-import subprocess
-import sys
-from pathlib import Path
 
 _TRAY_AVAILABLE = False
 try:
@@ -89,13 +86,9 @@ class SystemTray:
         app.after(0, app.refresh_all)
 
     def _on_open_main(self, icon, item):
-        """啟動主視窗 (main.py)。"""
-        main_py = Path(sys.argv[0]).parent / "main.py"
-        try:
-            subprocess.Popen([sys.executable, str(main_py)],
-                             creationflags=0x00000008)  # DETACHED_PROCESS
-        except Exception:
-            pass
+        """在小工具程式內開啟主視窗。"""
+        app = self._app
+        app.after(0, app._open_main_window)
 
     def _on_quit(self, icon, item):
         app = self._app
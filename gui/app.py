@@ -15,6 +15,8 @@ from services.browser_data import (
     BrowserGitHubCopilotService,
 )
 from services import local_server
+from services import event_bus
+from services import refresh_scheduler
 from gui.widgets import ServiceCard, COLORS
 
 
@@ -25,27 +27,30 @@ SERVICES = [
     ("browser_github_copilot", BrowserGitHubCopilotService()),
 ]
 
-# Mapping: service key → DATA_STORE source key (for live browser polling)
+# Mapping: service key → DATA_STORE source key (event-bus topic)
 BROWSER_SERVICE_SOURCES = {
     "browser_openai":         "openai_billing",
     "browser_claude_usage":   "claude_usage",
     "browser_claude_billing": "claude_billing",
     "browser_github_copilot": "github_copilot",
 }
+SOURCE_SERVICE_KEYS = {src: key for key, src in BROWSER_SERVICE_SOURCES.items()}
 
 
-class MainApp(tk.Tk):
-    def __init__(self):
-        super().__init__()
-        self.config_manager = ConfigManager()
-        self.config_data = self.config_manager.load()
-        self._result_queue = queue.Queue()
-        self._refresh_job = None
-        self._last_browser_ts: dict[str, str] = {}  # source_key → received_at
+class Dashboard:
+    """Main dashboard (title bar, card grid, status bar) shared by MainApp and DashboardWindow.
 
-        # Start local HTTP server for Tampermonkey browser data
-        port = self.config_data.get("server_port", 7890)
-        local_server.start(port)
+    Mixed into a tk.Tk or tk.Toplevel subclass, which calls _init_dashboard()
+    once the window exists.
+    """
+
+    def _init_dashboard(self, config_manager: ConfigManager):
+        self.config_manager = config_manager
+        self.config_data = config_manager.get()
+        self._result_queue = queue.Queue()
+        # 其他執行緒（匯流排、排程器）要在 Tk 執行緒執行的呼叫，由 _poll_queue 取出
+        self._command_queue = queue.Queue()
+        self._poll_job = None
 
         self.title("AI 額度監控")
         self.configure(bg=COLORS["bg"])
@@ -62,10 +67,17 @@ class MainApp(tk.Tk):
         self.after(250, self._init_browser_cards)
 
         # Poll for results from background threads
-        self.after(100, self._poll_queue)
+        self._poll_job = self.after(100, self._poll_queue)
+
+        # Live browser data: woken by the event bus on every accepted /update
+        self._bus_sub = event_bus.bus.subscribe(
+            BROWSER_SERVICE_SOURCES.values(), self._on_browser_update)
 
-        # Poll for live browser data changes (every 1.5s)
-        self.after(1500, self._poll_browser_live)
+        # 自動重新整理：依各額度的重置時間排程，取代固定間隔計時器
+        scheduler = refresh_scheduler.scheduler
+        scheduler.configure(self.config_data.get("auto_refresh_minutes", 30))
+        scheduler.add_listener(self._on_scheduled_refresh)
+        scheduler.start()
 
     def _position_window(self):
         self.update_idletasks()
@@ -170,7 +182,8 @@ class MainApp(tk.Tk):
         canvas.grid(row=0, column=0, sticky="nsew")
         scrollbar.grid(row=0, column=1, sticky="ns")
 
-        canvas.bind_all("<MouseWheel>", lambda e: canvas.yview_scroll(int(-1*(e.delta/120)), "units"))
+        # Bound on this window (not bind_all) so other windows in the process keep their wheel
+        self.bind("<MouseWheel>", lambda e: canvas.yview_scroll(int(-1*(e.delta/120)), "units"))
 
         # Cards grid
         self.cards = {}
@@ -219,8 +232,23 @@ class MainApp(tk.Tk):
         # Notify all JS clients to re-fetch immediately
         local_server.request_refresh()
         config = self.config_manager.get()
+        self._fetch_api_services()
+
+        # 下一次自動重新整理由排程器決定（重置時間或退避間隔，上限 auto_refresh_minutes）
+        refresh_scheduler.scheduler.configure(config.get("auto_refresh_minutes", 30))
+        refresh_scheduler.scheduler.note_refresh()
+
+        # All cards are browser-driven; restore button after brief delay
+        browser_keys = set(BROWSER_SERVICE_SOURCES.keys())
+        all_browser = all(k in browser_keys for k, _ in SERVICES)
+        if all_browser:
+            self.after(1500, self._restore_refresh_btn)
+
+    def _fetch_api_services(self):
+        """Start a fetch for every enabled non-browser service."""
+        config = self.config_manager.get()
 
-        # browser_* services are driven by _poll_browser_live, skip here
+        # browser_* services are driven by the event bus, skip here
         browser_keys = set(BROWSER_SERVICE_SOURCES.keys())
 
         for key, service in SERVICES:
@@ -236,17 +264,9 @@ class MainApp(tk.Tk):
                 )
                 t.start()
 
-        # Schedule auto-refresh (minimum 1 minute to avoid tight loop)
-        minutes = max(1, config.get("auto_refresh_minutes", 30))
-        if self._refresh_job:
-            self.after_cancel(self._refresh_job)
-        self._refresh_job = self.after(minutes * 60 * 1000, self.refresh_all)
-
-        # All cards are browser-driven; restore button after brief delay
-        browser_keys = set(BROWSER_SERVICE_SOURCES.keys())
-        all_browser = all(k in browser_keys for k, _ in SERVICES)
-        if all_browser:
-            self.after(1500, self._restore_refresh_btn)
+    def _on_scheduled_refresh(self, reason: str):
+        """Scheduler callback (scheduler thread): browser scripts were already notified; re-query APIs."""
+        self._command_queue.put((self._fetch_api_services, ()))
 
     def _init_browser_cards(self):
         """Run once at startup: fetch each browser service to show proper initial state."""
@@ -262,27 +282,15 @@ class MainApp(tk.Tk):
                 )
                 t.start()
 
-    def _poll_browser_live(self):
-        """Check DATA_STORE every 1.5s; if a browser source has new data, refresh that card."""
-        config = self.config_manager.get()
-        for svc_key, src_key in BROWSER_SERVICE_SOURCES.items():
-            entry = local_server.DATA_STORE.get(src_key)
-            if entry is None:
-                continue
-            new_ts = entry.get("received_at", "")
-            if new_ts != self._last_browser_ts.get(src_key, ""):
-                self._last_browser_ts[src_key] = new_ts
-                # Find the matching service object
-                svc_obj = next((s for k, s in SERVICES if k == svc_key), None)
-                if svc_obj and svc_key in self.cards:
-                    svc_config = config["services"].get(svc_key, {})
-                    t = threading.Thread(
-                        target=self._fetch_service,
-                        args=(svc_key, svc_obj, svc_config),
-                        daemon=True
-                    )
-                    t.start()
-        self.after(1500, self._poll_browser_live)
+    def _on_browser_update(self, source: str, payload):
+        """Event-bus callback (bus thread): re-read that card's data; _poll_queue shows it."""
+        svc_key = SOURCE_SERVICE_KEYS.get(source)
+        svc_obj = next((s for k, s in SERVICES if k == svc_key), None)
+        if svc_obj is None or svc_key not in self.cards:
+            return
+        svc_config = self.config_manager.get()["services"].get(svc_key, {})
+        # fetch() 只讀取 local_server 的快照，直接在匯流排執行緒執行即可
+        self._fetch_service(svc_key, svc_obj, svc_config)
 
     def _fetch_service(self, key: str, service, config: dict):
         try:
@@ -294,9 +302,26 @@ class MainApp(tk.Tk):
                 success=False,
                 error=str(e)
             )
+        local_server.record_service_result(key, result)
         self._result_queue.put((key, result))
 
     def _poll_queue(self):
+        self._run_commands()
+        self._drain_results()
+        self._poll_job = self.after(200, self._poll_queue)
+
+    def _run_commands(self):
+        while True:
+            try:
+                func, args = self._command_queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"[AI Monitor] 背景要求處理失敗: {e}")
+
+    def _drain_results(self):
         completed = []
         while not self._result_queue.empty():
             try:
@@ -319,7 +344,12 @@ class MainApp(tk.Tk):
                 self.status_dot_lbl.config(fg=COLORS["success"])
                 self.refresh_btn.config(state="normal", text="⟳  重新整理")
 
-        self.after(200, self._poll_queue)
+    def destroy(self):
+        self._bus_sub.close()
+        refresh_scheduler.scheduler.remove_listener(self._on_scheduled_refresh)
+        if self._poll_job:
+            self.after_cancel(self._poll_job)
+        super().destroy()
 
     def _restore_refresh_btn(self):
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -423,21 +453,21 @@ class MainApp(tk.Tk):
                 after = self._get_chrome_hwnds()
                 new = after - before
                 if new:
-                    MainApp._oclaw_hwnds.update(new)
+                    Dashboard._oclaw_hwnds.update(new)
                     return
         threading.Thread(target=track, daemon=True).start()
 
     def _close_oclaw_window(self):
         """Close tracked Chrome windows (Win32) or oclaw-tagged tabs (macOS)."""
         if sys.platform == "win32":
-            if not MainApp._oclaw_hwnds:
+            if not Dashboard._oclaw_hwnds:
                 return
             import ctypes
             u32 = ctypes.windll.user32
             WM_CLOSE = 0x0010
-            for hwnd in list(MainApp._oclaw_hwnds):
+            for hwnd in list(Dashboard._oclaw_hwnds):
                 u32.PostMessageW(hwnd, WM_CLOSE, 0, 0)
-            MainApp._oclaw_hwnds.clear()
+            Dashboard._oclaw_hwnds.clear()
         elif sys.platform == "darwin":
             script = (
                 'tell application "Google Chrome"\n'
@@ -475,21 +505,21 @@ class MainApp(tk.Tk):
                 after = self._get_firefox_hwnds()
                 new = after - before
                 if new:
-                    MainApp._oflaw_hwnds.update(new)
+                    Dashboard._oflaw_hwnds.update(new)
                     return
         threading.Thread(target=track, daemon=True).start()
 
     def _close_oflaw_window(self):
         """Close tracked Firefox windows (Win32 only)."""
         if sys.platform == "win32":
-            if not MainApp._oflaw_hwnds:
+            if not Dashboard._oflaw_hwnds:
                 return
             import ctypes
             u32 = ctypes.windll.user32
             WM_CLOSE = 0x0010
-            for hwnd in list(MainApp._oflaw_hwnds):
+            for hwnd in list(Dashboard._oflaw_hwnds):
                 u32.PostMessageW(hwnd, WM_CLOSE, 0, 0)
-            MainApp._oflaw_hwnds.clear()
+            Dashboard._oflaw_hwnds.clear()
 
     def _show_open_menu(self):
         menu = tk.Menu(self, tearoff=0,
@@ -523,8 +553,38 @@ class MainApp(tk.Tk):
         SettingsDialog(self, self.config_manager)
 
 
+class MainApp(Dashboard, tk.Tk):
+    """Standalone dashboard process: owns the Tk root and starts the local server."""
+
+    def __init__(self):
+        super().__init__()
+        config_manager = ConfigManager()
+        config = config_manager.load()
+
+        # Start local HTTP server for Tampermonkey browser data
+        port = config.get("server_port", 7890)
+        local_server.set_rate_limits(**config.get("rate_limits", {}))
+        local_server.set_history_retention(**config.get("history", {}))
+        local_server.set_max_body_bytes(config.get("max_body_kb", 256) * 1024)
+        local_server.start(port, engine=config.get("server_engine", "thread"))
+
+        self._init_dashboard(config_manager)
+
+
+class DashboardWindow(Dashboard, tk.Toplevel):
+    """Dashboard as a Toplevel inside another Tk process (the desktop widget).
+
+    Shares the caller's local server, event bus and ConfigManager, so opening
+    it needs no new interpreter, Tk root or server port.
+    """
+
+    def __init__(self, master: tk.Misc, config_manager: ConfigManager):
+        super().__init__(master)
+        self._init_dashboard(config_manager)
+
+
 class SettingsDialog(tk.Toplevel):
-    def __init__(self, parent: MainApp, config_manager: ConfigManager):
+    def __init__(self, parent: Dashboard, config_manager: ConfigManager):
         super().__init__(parent)
         self.parent = parent
         self.config_manager = config_manager
@@ -695,7 +755,7 @@ class SettingsDialog(tk.Toplevel):
 
         # Server status indicator
         from services import local_server as _ls
-        _srv_on = "已啟動 ✓"
+        _srv_on = "同步自另一個視窗 ✓" if _ls.is_attached() else "已啟動 ✓"
         _srv_off = "未啟動"
         status_text = f"本地伺服器: {_srv_on if _ls.is_running() else _srv_off}"
         self._browser_status_lbl = tk.Label(
@@ -719,7 +779,7 @@ class SettingsDialog(tk.Toplevel):
     def _add_general_tab(self, nb):
         frame = self._make_tab(nb, "一般")
 
-        tk.Label(frame, text="自動更新間隔:", fg=COLORS["subtext"],
+        tk.Label(frame, text="自動更新間隔（上限）:", fg=COLORS["subtext"],
                  bg=COLORS["card_bg"], font=("Helvetica", 9)).pack(anchor="w", pady=(0, 4))
 
         refresh_var = tk.IntVar(value=self.config_data.get("auto_refresh_minutes", 30))
@@ -758,12 +818,35 @@ class SettingsDialog(tk.Toplevel):
                  fg=COLORS["subtext"], bg=COLORS["card_bg"],
                  font=("Helvetica", 8)).pack(side="left")
 
+        tk.Label(frame, text="\n伺服器引擎 (重新啟動後生效):",
+                 fg=COLORS["subtext"], bg=COLORS["card_bg"],
+                 font=("Helvetica", 9)).pack(anchor="w", pady=(8, 4))
+
+        engine_var = tk.StringVar(value=self.config_data.get("server_engine", "thread"))
+        self.entries["server_engine"] = engine_var
+        engine_row = tk.Frame(frame, bg=COLORS["card_bg"])
+        engine_row.pack(anchor="w")
+        for value, label in (("thread", "多執行緒"), ("asyncio", "asyncio")):
+            tk.Radiobutton(
+                engine_row,
+                text=label,
+                variable=engine_var,
+                value=value,
+                fg=COLORS["text"],
+                bg=COLORS["card_bg"],
+                selectcolor=COLORS["bg"],
+                activebackground=COLORS["card_bg"],
+                activeforeground=COLORS["text"],
+                font=("Helvetica", 9)
+            ).pack(side="left", padx=4)
+
     def save(self):
         config_manager = self.config_manager
 
         # General
         config_manager.set_auto_refresh(self.entries["auto_refresh"].get())
         config_manager.set_server_port(int(self.entries["server_port"].get()))
+        config_manager.set_server_engine(self.entries["server_engine"].get())
 
         config_manager.save()
         self.destroy()
@@ -1,6 +1,9 @@
 import tkinter as tk
+from datetime import datetime
 from tkinter import ttk
 from services.base import ServiceResult
+from services.forecast import Forecast, format_when
+from services.quota_schema import QuotaRecord
 
 
 COLORS = {
@@ -158,7 +161,8 @@ class ServiceCard(tk.Frame):
             return
 
         self.status_dot.config(fg=COLORS["success"])
-        rows = self._format_data(result.service_name, result.data)
+        rows = self._format_data(result.service_name, result.data,
+                                 result.record, result.warning, result.forecasts)
         self._render_rows(rows)
 
     def set_loading(self):
@@ -266,7 +270,10 @@ class ServiceCard(tk.Frame):
 
     # ── Data formatters ────────────────────────────────────────────────────
 
-    def _format_data(self, service_name: str, data: dict) -> list:
+    def _format_data(self, service_name: str, data: dict,
+                     record: QuotaRecord | None = None, warning: str | None = None,
+                     forecasts: dict | None = None) -> list:
+        """Rows for one result. Browser services read numbers from the ingest-time *record*."""
         rows = []
 
         if service_name == "GitHub Copilot":
@@ -403,95 +410,105 @@ class ServiceCard(tk.Frame):
                 if len(models) > 5:
                     rows.append((f"...共 {len(models)} 個模型", ""))
 
-        elif service_name == "OpenAI 帳單 (瀏覽器)":
-            self._browser_header_rows(data, rows)
-            if "balance_usd" in data:
-                rows.append(("帳戶餘額", f"${data['balance_usd']:.2f}", COLORS["green"]))
-            if "credits_used_usd" in data and "credits_total_usd" in data:
-                used = data["credits_used_usd"]
-                total = data["credits_total_usd"]
-                pct = round(used / total * 100, 1) if total > 0 else 0
-                rows.append({"type": "bar", "label": "Credits", "percent": pct,
-                             "detail": f"${used:.2f} / ${total:.2f}", "color": self._pct_color(pct)})
-            if "month_usage_usd" in data:
-                rows.append(("本月用量", f"${data['month_usage_usd']:.4f}"))
-            if "hard_limit_usd" in data:
-                rows.append(("月上限", f"${data['hard_limit_usd']:.2f}"))
+        elif record is not None:
+            self._browser_header_rows(record, warning, rows)
+            self._browser_rows(service_name, data, record, forecasts or {}, rows)
+
+        if not rows:
+            rows.append(("無資料", "", COLORS["subtext"]))
+
+        return rows
+
+    def _browser_rows(self, service_name: str, data: dict, record: QuotaRecord,
+                      forecasts: dict, rows: list):
+        amount = record.amount
+
+        if service_name == "OpenAI 帳單 (瀏覽器)":
+            if amount("balance_usd") is not None:
+                rows.append(("帳戶餘額", f"${amount('balance_usd'):.2f}", COLORS["green"]))
+            credits = record.metric("credits")
+            if credits:
+                rows.append({"type": "bar", "label": "Credits", "percent": credits.percent,
+                             "detail": f"${credits.used:.2f} / ${credits.limit:.2f}",
+                             "color": self._pct_color(credits.percent)})
+                self._forecast_row(forecasts.get("credits"), rows)
+            if amount("month_usage_usd") is not None:
+                rows.append(("本月用量", f"${amount('month_usage_usd'):.4f}"))
+            if amount("hard_limit_usd") is not None:
+                rows.append(("月上限", f"${amount('hard_limit_usd'):.2f}"))
             if data.get("tier"):
                 rows.append(("用量等級", data["tier"]))
             if data.get("auto_recharge"):
                 rows.append(("自動儲值", "已啟用", COLORS["success"]))
 
         elif service_name == "Claude.ai 用量 (瀏覽器)":
-            self._browser_header_rows(data, rows)
-            if data.get("session_percent") is not None:
-                pct = data["session_percent"]
-                reset = data.get("session_reset", "")
-                rows.append({"type": "bar", "label": "本次工作階段", "percent": pct,
-                             "detail": f"重置於: {reset}" if reset else "", "color": self._pct_color(pct)})
-            if data.get("weekly_percent") is not None:
-                pct = data["weekly_percent"]
-                reset = data.get("weekly_reset", "")
-                rows.append({"type": "bar", "label": "每週限額", "percent": pct,
-                             "detail": f"重置於: {reset}" if reset else "", "color": self._pct_color(pct)})
-            if data.get("extra_enabled"):
+            for name, label in (("session", "本次工作階段"), ("weekly", "每週限額")):
+                m = record.metric(name)
+                if m:
+                    rows.append({"type": "bar", "label": label, "percent": m.percent,
+                                 "detail": f"重置於: {m.reset_text}" if m.reset_text else "",
+                                 "color": self._pct_color(m.percent)})
+                    self._forecast_row(forecasts.get(name), rows)
+            extra = record.metric("extra")
+            if data.get("extra_enabled") and extra:
                 rows.append({"type": "divider", "label": "額外用量"})
-                if "extra_spent" in data:
-                    rows.append(("已花費", f"${data['extra_spent']:.2f}"))
-                if "extra_limit" in data:
-                    rows.append(("每月上限", f"${data['extra_limit']:.2f}"))
-                if "extra_balance" in data:
-                    rows.append(("目前餘額", f"${data['extra_balance']:.2f}", COLORS["green"]))
-                if data.get("extra_resets"):
-                    rows.append(("重置日期", data["extra_resets"]))
+                if extra.used is not None:
+                    rows.append(("已花費", f"${extra.used:.2f}"))
+                if extra.limit is not None:
+                    rows.append(("每月上限", f"${extra.limit:.2f}"))
+                if amount("extra_balance") is not None:
+                    rows.append(("目前餘額", f"${amount('extra_balance'):.2f}", COLORS["green"]))
+                if extra.reset_text:
+                    rows.append(("重置日期", extra.reset_text))
 
         elif service_name == "Claude API 帳單 (瀏覽器)":
-            self._browser_header_rows(data, rows)
             if data.get("plan"):
                 rows.append(("方案", data["plan"]))
-            if "monthly_usd" in data:
-                rows.append(("月費", f"${data['monthly_usd']:.2f}"))
-            if "this_month_usd" in data:
-                rows.append(("本月用量", f"${data['this_month_usd']:.4f}"))
-            if "balance_usd" in data:
-                rows.append(("帳戶餘額", f"${data['balance_usd']:.2f}", COLORS["green"]))
-            if "spend_limit_usd" in data:
-                rows.append(("消費上限", f"${data['spend_limit_usd']:.2f}"))
+            if amount("monthly_usd") is not None:
+                rows.append(("月費", f"${amount('monthly_usd'):.2f}"))
+            if amount("this_month_usd") is not None:
+                rows.append(("本月用量", f"${amount('this_month_usd'):.4f}"))
+            if amount("balance_usd") is not None:
+                rows.append(("帳戶餘額", f"${amount('balance_usd'):.2f}", COLORS["green"]))
+            if amount("spend_limit_usd") is not None:
+                rows.append(("消費上限", f"${amount('spend_limit_usd'):.2f}"))
             if data.get("next_billing"):
                 rows.append(("下次計費", data["next_billing"]))
 
         elif service_name == "GitHub Copilot (瀏覽器)":
-            self._browser_header_rows(data, rows)
             if data.get("plan"):
                 rows.append(("方案", data["plan"]))
-            pct = data.get("included_percent")
-            if pct is not None:
-                consumed = data.get("included_consumed")
-                total = data.get("included_total")
-                detail = f"{consumed:.1f} / {total:.0f} 次" if consumed is not None and total is not None else ""
-                rows.append({"type": "bar", "label": "Premium Requests", "percent": pct,
-                             "detail": detail, "color": self._pct_color(pct)})
-                DEFAULT_TOTAL = 1500
-                display_total = int(total) if total else DEFAULT_TOTAL
-                if consumed is not None:
-                    display_consumed = consumed
-                else:
-                    display_consumed = round(pct / 100 * display_total, 1)
-                rows.append(("已使用", f"{display_consumed:.1f} / {display_total} 次"))
-            if data.get("billed_usd") and data["billed_usd"] > 0:
-                rows.append(("已計費", f"${data['billed_usd']:.2f}", COLORS["peach"]))
+            premium = record.metric("premium_requests")
+            if premium:
+                rows.append({"type": "bar", "label": "Premium Requests", "percent": premium.percent,
+                             "detail": f"{premium.used:.1f} / {premium.limit:.0f} 次",
+                             "color": self._pct_color(premium.percent)})
+                self._forecast_row(forecasts.get("premium_requests"), rows)
+                rows.append(("已使用", f"{premium.used:.1f} / {premium.limit:.0f} 次"))
+            if amount("billed_usd"):
+                rows.append(("已計費", f"${amount('billed_usd'):.2f}", COLORS["peach"]))
             if data.get("resets_in_days") is not None:
                 rows.append(("重置於", f"{data['resets_in_days']} 天後"))
             if data.get("next_billing"):
                 rows.append(("下次計費", data["next_billing"]))
 
-        if not rows:
-            rows.append(("無資料", "", COLORS["subtext"]))
-
-        return rows
-
-    def _browser_header_rows(self, data: dict, rows: list):
-        if data.get("updated_at"):
-            rows.append(("更新時間", data["updated_at"], COLORS["subtext"]))
-        if data.get("stale_warning"):
-            rows.append((data["stale_warning"], "", COLORS["warning"]))
+    @staticmethod
+    def _forecast_row(forecast: Forecast | None, rows: list):
+        """Projected exhaustion under a quota bar; red if it comes before the reset."""
+        if forecast is None or forecast.exhaust_at is None or forecast.percent >= 100:
+            return
+        when = format_when(forecast.exhaust_at)
+        if forecast.reset_at is None:
+            rows.append(("預計用完", when, COLORS["warning"]))
+        elif forecast.before_reset:
+            rows.append(("預計用完", f"{when}（早於重置 {format_when(forecast.reset_at)}）",
+                         COLORS["error"]))
+        else:
+            rows.append(("預計用完", f"重置（{format_when(forecast.reset_at)}）前不會用完",
+                         COLORS["success"]))
+
+    def _browser_header_rows(self, record: QuotaRecord, warning: str | None, rows: list):
+        updated = datetime.fromtimestamp(record.received_ts).strftime("%H:%M:%S")
+        rows.append(("更新時間", updated, COLORS["subtext"]))
+        if warning:
+            rows.append((warning, "", COLORS["warning"]))
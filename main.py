@@ -11,11 +11,22 @@ else:
 if BASE_DIR not in sys.path:
     sys.path.insert(0, BASE_DIR)
 
-from desktop_widget.app import DesktopWidget
+from services import single_instance
 
 
 def main():
+    # Already running: hand over this launch's intent and exit before importing Tk
+    lock = single_instance.acquire()
+    if lock is None:
+        if single_instance.forward(single_instance.commands_from_argv(sys.argv[1:])):
+            return
+        print("[AI Monitor] 無法連絡已在執行的程式，改為啟動新的視窗")
+
+    from desktop_widget.app import DesktopWidget
+
     app = DesktopWidget()
+    if lock is not None:
+        lock.set_handler(app.on_instance_command)
     app.mainloop()
 
 
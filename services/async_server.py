@@ -0,0 +1,411 @@
+"""
+asyncio 版本的本地伺服器引擎 — local_server.start(port, engine="asyncio")
+
+與 ThreadingHTTPServer 版本提供相同的路由與回應格式
+（/update、/refresh、/status、/poll、/health、/events、/history、/debug/stats），差異在於：
+
+- 所有連線由背景執行緒中的單一 event loop 處理，不再每個連線一條執行緒
+- HTTP/1.1 keep-alive；連線閒置超過 idle_timeout 秒自動關閉
+- 以 Semaphore 限制同時處理中的連線數（max_connections），多出的連線排隊等待
+- 長輪詢 /poll 與 /events 透過 local_server 的喚醒回呼等待，不佔用執行緒
+- /history 的 SQLite 查詢與降採樣在執行緒池進行，不阻塞 event loop
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from http import HTTPStatus
+from typing import Optional
+
+from . import local_server as ls
+
+
+def _response(status: int, body: bytes, keep_alive: bool,
+              content_type: str = "application/json",
+              headers: Optional[dict] = None) -> bytes:
+    lines = [
+        f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+        f"Content-Type: {content_type}",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    lines.extend(f"{k}: {v}" for k, v in ls.CORS_HEADERS.items())
+    if headers:
+        lines.extend(f"{k}: {v}" for k, v in headers.items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+def _parse_head(head: bytes) -> Optional[tuple[str, str, str, dict]]:
+    """Parse request line + headers. Returns (method, path, version, headers) or None."""
+    try:
+        text = head.decode("latin-1")
+    except UnicodeDecodeError:
+        return None
+    lines = text.split("\r\n")
+    parts = lines[0].split()
+    if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+        return None
+    headers = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, sep, value = line.partition(":")
+        if not sep:
+            return None
+        headers[name.strip().lower()] = value.strip()
+    return parts[0].upper(), parts[1], parts[2], headers
+
+
+class AsyncIngestServer:
+    """Single event-loop HTTP server with the same API surface the thread engine uses."""
+
+    def __init__(self, host: str, port: int, max_connections: int = 128,
+                 idle_timeout: float = 15.0, max_header_bytes: int = 16 * 1024):
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.max_header_bytes = max_header_bytes
+        self.thread: Optional[threading.Thread] = None
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._stop_event: Optional[asyncio.Event] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._waiters: set = set()
+        self._conn_tasks: set = set()
+        self._stopping = False
+        self._start_error: Optional[BaseException] = None
+
+    # ── 生命週期（由 local_server 呼叫）────────────────────────────────
+
+    def start(self):
+        """Bind and start serving in a daemon thread. Raises OSError if the port is taken."""
+        ready = threading.Event()
+        self.thread = threading.Thread(
+            target=self._run, args=(ready,), daemon=True, name="ai-monitor-server")
+        self.thread.start()
+        ready.wait()
+        if self._start_error is not None:
+            self.thread.join(1)
+            raise self._start_error
+
+    def shutdown(self):
+        """Stop accepting, close open connections and end the event loop."""
+        loop = self._loop
+        if loop is None or self._stopping:
+            return
+        self._stopping = True
+        ls._remove_wake_listener(self._on_wake)
+        try:
+            loop.call_soon_threadsafe(self._stop_event.set)
+        except RuntimeError:
+            return  # loop 已關閉
+        if self.thread is not None:
+            self.thread.join(5)
+
+    def server_close(self):
+        """Listening socket is closed by shutdown(); kept for API parity with socketserver."""
+
+    # ── event loop ────────────────────────────────────────────────────
+
+    def _run(self, ready: threading.Event):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        try:
+            loop.run_until_complete(self._main(ready))
+        finally:
+            loop.close()
+
+    async def _main(self, ready: threading.Event):
+        self._stop_event = asyncio.Event()
+        self._sem = asyncio.Semaphore(self.max_connections)
+        try:
+            self._server = await asyncio.start_server(
+                self._handle_conn, self.host, self.port, limit=self.max_header_bytes)
+        except OSError as e:
+            self._start_error = e
+            ready.set()
+            return
+        ls._add_wake_listener(self._on_wake)
+        ready.set()
+
+        await self._stop_event.wait()
+
+        self._server.close()
+        tasks = list(self._conn_tasks)
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # ── 喚醒等待中的 /poll 與 /events ─────────────────────────────────
+
+    def _on_wake(self):
+        # 由任意執行緒呼叫（request_refresh / _commit_update）
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._wake_all)
+            except RuntimeError:
+                pass
+
+    def _wake_all(self):
+        waiters, self._waiters = self._waiters, set()
+        for fut in waiters:
+            if not fut.done():
+                fut.set_result(None)
+
+    async def _wait_until(self, predicate, timeout: float):
+        """Wait until predicate() is true, a stop is requested or timeout elapses."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not predicate() and not self._stopping:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            fut = loop.create_future()
+            self._waiters.add(fut)
+            if predicate():          # 註冊後再檢查一次，避免漏掉喚醒
+                self._waiters.discard(fut)
+                return
+            try:
+                await asyncio.wait_for(fut, remaining)
+            except asyncio.TimeoutError:
+                return
+            finally:
+                self._waiters.discard(fut)
+
+    # ── 連線處理 ─────────────────────────────────────────────────────
+
+    async def _handle_conn(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._conn_tasks.add(task)
+        ls._stats.connection_opened()
+        try:
+            async with self._sem:
+                await self._serve_conn(reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # 用戶端已斷線
+        except asyncio.CancelledError:
+            pass  # shutdown() 取消；不往外拋，避免 streams callback 記錄錯誤
+        finally:
+            self._conn_tasks.discard(task)
+            ls._stats.connection_closed()
+            writer.close()
+
+    async def _serve_conn(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        while not self._stopping:
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.idle_timeout)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+                return  # 閒置逾時或用戶端關閉
+            except asyncio.LimitOverrunError:
+                writer.write(_response(431, b'{"error":"headers too large"}', False))
+                await writer.drain()
+                return
+
+            t0 = time.perf_counter()
+            req = _parse_head(head)
+            if req is None:
+                writer.write(_response(400, b'{"error":"bad request"}', False))
+                await writer.drain()
+                return
+            method, path, version, headers = req
+
+            conn_hdr = headers.get("connection", "").lower()
+            if version == "HTTP/1.0":
+                keep_alive = conn_hdr == "keep-alive"
+            else:
+                keep_alive = conn_hdr != "close"
+
+            async def reply(status: int, payload: bytes, alive: bool,
+                            extra: Optional[dict] = None, bytes_in: int = 0):
+                writer.write(_response(status, payload, alive, headers=extra))
+                await writer.drain()
+                ls._stats.record_request(method, path, status, bytes_in, len(payload),
+                                         time.perf_counter() - t0)
+
+            is_update = method == "POST" and ls._route(path) == "/update"
+            if is_update:
+                rejected = ls._admit_update(path, headers.get("x-ai-monitor-source"))
+                if rejected is not None:
+                    # body 未讀取，連線無法續用
+                    status, payload, extra = rejected
+                    await reply(status, payload, False, extra)
+                    return
+
+            length, error = ls._check_body_length(headers.get("content-length"),
+                                                  headers.get("transfer-encoding"))
+            if error is not None:
+                await reply(error[0], error[1], False)
+                return
+
+            if is_update:
+                status, payload, consumed = await self._read_update(
+                    reader, length, headers.get("content-type", ""))
+                keep_alive = keep_alive and consumed == length
+                await reply(status, payload, keep_alive, bytes_in=consumed)
+                if not keep_alive:
+                    return
+                continue
+
+            # 其他路由不使用 body；分塊讀掉（長度已檢查）後連線才能續用
+            await self._discard_body(reader, length)
+
+            if method == "GET" and path.startswith("/events"):
+                await self._stream_events(writer, path, headers, t0)
+                return
+
+            if method == "GET" and ls._route(path) == "/history":
+                if not await self._stream_history(writer, path, version, keep_alive, t0):
+                    return
+                continue
+
+            status, payload, extra = await self._dispatch(method, path, headers)
+            await reply(status, payload, keep_alive, extra, length)
+            if not keep_alive:
+                return
+
+    async def _read_update(self, reader: asyncio.StreamReader, length: int,
+                           content_type: str) -> tuple[int, bytes, int]:
+        """Stream a POST /update body through the incremental parser.
+
+        Returns (status, body, bytes consumed); fewer than *length* bytes are
+        consumed when the body was rejected part-way.
+        """
+        parser = ls._UpdateBodyParser(content_type)
+        consumed = 0
+        while consumed < length:
+            chunk = await reader.read(min(ls.BODY_CHUNK_BYTES, length - consumed))
+            if not chunk:
+                raise asyncio.IncompleteReadError(b"", length - consumed)
+            consumed += len(chunk)
+            error = parser.feed(chunk)
+            if error is not None:
+                return error[0], error[1], consumed
+        status, payload = parser.finish()
+        return status, payload, consumed
+
+    async def _discard_body(self, reader: asyncio.StreamReader, length: int):
+        """Read and drop *length* body bytes in BODY_CHUNK_BYTES pieces."""
+        remaining = length
+        while remaining > 0:
+            chunk = await reader.read(min(ls.BODY_CHUNK_BYTES, remaining))
+            if not chunk:
+                raise asyncio.IncompleteReadError(b"", remaining)
+            remaining -= len(chunk)
+
+    async def _dispatch(self, method: str, path: str,
+                        headers: dict) -> tuple[int, bytes, Optional[dict]]:
+        """Route one request. Returns (status, body, extra response headers)."""
+        if method == "OPTIONS":
+            return 204, b"", None
+        if method == "GET":
+            route = ls._route(path)
+            if route == "/status" or route == "/":
+                return ls._handle_status(headers.get("if-none-match"), path)
+            if path == "/health":
+                return 200, ls._health_body(), None
+            if route == "/debug/stats":
+                return 200, ls._handle_debug_stats(), None
+            if path.startswith("/poll"):
+                client_seq, wait = ls._parse_poll_query(path)
+                if wait > 0:
+                    await self._wait_until(lambda: ls.get_refresh_seq() > client_seq, wait)
+                return 200, ls._poll_body(client_seq, ls.get_refresh_seq()), None
+            return 404, ls.NOT_FOUND, None
+        if method == "POST":
+            if ls._route(path) == "/refresh":
+                return 200, ls._handle_refresh(), None
+            return 404, ls.NOT_FOUND, None   # /update 由 _read_update 處理
+        return 405, b'{"error":"method not allowed"}', None
+
+    async def _stream_history(self, writer: asyncio.StreamWriter, path: str, version: str,
+                              keep_alive: bool, t0: float) -> bool:
+        """GET /history as a chunked response. Returns whether the connection stays open."""
+        loop = asyncio.get_running_loop()
+        status, body = await loop.run_in_executor(None, ls._handle_history, path)
+        if isinstance(body, bytes):
+            writer.write(_response(status, body, keep_alive))
+            await writer.drain()
+            ls._stats.record_request("GET", path, status, 0, len(body), time.perf_counter() - t0)
+            return keep_alive
+
+        chunked = version != "HTTP/1.0"
+        keep_alive = keep_alive and chunked
+        head = [
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+            "Content-Type: application/json",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if chunked:
+            head.append("Transfer-Encoding: chunked")
+        head.extend(f"{k}: {v}" for k, v in ls.CORS_HEADERS.items())
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+        sent = 0
+        while True:
+            chunk = await loop.run_in_executor(None, next, body, None)
+            if chunk is None:
+                break
+            if not chunk:
+                continue
+            writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk) if chunked else chunk)
+            sent += len(chunk)
+            await writer.drain()
+        if chunked:
+            writer.write(b"0\r\n\r\n")
+        await writer.drain()
+        ls._stats.record_request("GET", path, status, 0, sent, time.perf_counter() - t0)
+        return keep_alive
+
+    async def _stream_events(self, writer: asyncio.StreamWriter, path: str, headers: dict,
+                             t0: float):
+        """Same event stream as the thread engine's _Handler._stream_events."""
+        last_id = ls._parse_last_event_id(headers.get("last-event-id"), path)
+
+        head = [
+            "HTTP/1.1 200 OK",
+            "Content-Type: text/event-stream; charset=utf-8",
+            "Cache-Control: no-cache",
+            "Connection: close",
+        ]
+        head.extend(f"{k}: {v}" for k, v in ls.CORS_HEADERS.items())
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+        sent = len(ls.SSE_PREAMBLE)
+        writer.write(ls.SSE_PREAMBLE)
+        if last_id is None:
+            frame, last_id = ls._sse_hello()
+            writer.write(frame)
+            sent += len(frame)
+        frame, seen = ls._sse_seen({})
+        writer.write(frame)
+        sent += len(frame)
+        try:
+            await writer.drain()
+
+            while not self._stopping:
+                with ls._store_lock:
+                    events, gap = ls._events_after(last_id)
+                if not events and not gap:
+                    since = last_id
+                    await self._wait_until(lambda: ls.get_store_version() > since,
+                                           ls.SSE_HEARTBEAT_SEC)
+                    with ls._store_lock:
+                        events, gap = ls._events_after(last_id)
+                with ls._store_lock:
+                    version = ls._store_version
+                frames = b""
+                if events or gap:
+                    frames, last_id = ls._sse_frames(events, gap, version, last_id)
+                frame, seen = ls._sse_seen(seen)
+                frames += frame
+                if not frames and not self._stopping:
+                    frames = ls.SSE_PING
+                writer.write(frames)
+                sent += len(frames)
+                await writer.drain()
+        finally:
+            # 串流的延遲即連線持續時間
+            ls._stats.record_request("GET", path, 200, 0, sent, time.perf_counter() - t0)
@@ -1,14 +1,22 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Mapping, Optional
+
+from .forecast import Forecast
+from .quota_schema import QuotaRecord
 
 
 @dataclass
 class ServiceResult:
     service_name: str
     success: bool
-    data: dict = field(default_factory=dict)
+    data: Mapping = field(default_factory=dict)
     error: Optional[str] = None
+    # 瀏覽器服務：接收時正規化的額度記錄與資料過期提示
+    record: Optional[QuotaRecord] = None
+    warning: Optional[str] = None
+    # 各額度條的預計用完時間（key 為 QuotaMetric.name）
+    forecasts: Mapping[str, Forecast] = field(default_factory=dict)
 
 
 class BaseService(ABC):
@@ -1,7 +1,11 @@
 """
-瀏覽器資料服務 — 從 local_server.DATA_STORE 讀取
+瀏覽器資料服務 — 從 local_server 的唯讀資料快照讀取
 Tampermonkey 注入的頁面資料。
 
+回傳的 ServiceResult 帶有 /update 當下正規化好的 QuotaRecord
+（services.quota_schema），卡片直接讀取其中的百分比、金額與重置時間；
+forecasts 為各額度條的預計用完時間（services.forecast）。
+
 四個服務類別分別對應四個被監控的頁面：
   - BrowserOpenAIService      → openai_billing
   - BrowserClaudeUsageService → claude_usage
@@ -9,7 +13,7 @@ Tampermonkey 注入的頁面資料。
   - BrowserGitHubCopilotService → github_copilot
 """
 from __future__ import annotations
-from datetime import datetime
+import time
 from . import local_server
 from .base import BaseService, ServiceResult
 
@@ -17,25 +21,16 @@ from .base import BaseService, ServiceResult
 STALE_THRESHOLD_SEC = 600  # 10 分鐘
 
 
-def _stale_warning(received_at: str) -> str | None:
-    """Return stale warning string if data is old, else None."""
-    try:
-        dt = datetime.fromisoformat(received_at)
-        age = (datetime.now() - dt).total_seconds()
-        if age > STALE_THRESHOLD_SEC:
-            mins = int(age // 60)
-            return f"（資料已 {mins} 分鐘未更新，請確認瀏覽器頁面仍開啟）"
-    except Exception:
-        pass
-    return None
-
+def _stale_warning(last_seen: float) -> str | None:
+    """Return stale warning string if data is old, else None.
 
-def _ts_display(received_at: str) -> str:
-    try:
-        dt = datetime.fromisoformat(received_at)
-        return dt.strftime("%H:%M:%S")
-    except Exception:
-        return received_at
+    Pass local_server.get_last_seen() so unchanged re-sends still count as fresh.
+    """
+    age = time.time() - last_seen
+    if age > STALE_THRESHOLD_SEC:
+        mins = int(age // 60)
+        return f"（資料已 {mins} 分鐘未更新，請確認瀏覽器頁面仍開啟）"
+    return None
 
 
 def _base_not_connected(name: str) -> ServiceResult:
@@ -52,6 +47,20 @@ def _base_not_connected(name: str) -> ServiceResult:
     )
 
 
+def _browser_result(service: BaseService) -> ServiceResult:
+    """Payload and its ingest-time QuotaRecord from one snapshot; nothing is copied or re-parsed."""
+    snap = local_server.get_snapshot()
+    raw = snap.get(service.source_key)
+    record = snap.records.get(service.source_key)
+    if not raw or record is None:
+        return _base_not_connected(service.name)
+
+    last_seen = local_server.get_last_seen(service.source_key) or record.received_ts
+    return ServiceResult(service_name=service.name, success=True, data=raw,
+                         record=record, warning=_stale_warning(last_seen),
+                         forecasts=local_server.get_forecasts(record))
+
+
 # ─────────────────────────────────────────────────────
 #  OpenAI 帳單
 # ─────────────────────────────────────────────────────
@@ -60,18 +69,7 @@ class BrowserOpenAIService(BaseService):
     source_key = "openai_billing"
 
     def fetch(self, config: dict) -> ServiceResult:
-        raw = local_server.get_data(self.source_key)
-        if not raw:
-            return _base_not_connected(self.name)
-
-        data = dict(raw)
-        recv = data.get("received_at", "")
-        data["updated_at"] = _ts_display(recv)
-        warn = _stale_warning(recv)
-        if warn:
-            data["stale_warning"] = warn
-
-        return ServiceResult(service_name=self.name, success=True, data=data)
+        return _browser_result(self)
 
 
 # ─────────────────────────────────────────────────────
@@ -82,18 +80,7 @@ class BrowserClaudeUsageService(BaseService):
     source_key = "claude_usage"
 
     def fetch(self, config: dict) -> ServiceResult:
-        raw = local_server.get_data(self.source_key)
-        if not raw:
-            return _base_not_connected(self.name)
-
-        data = dict(raw)
-        recv = data.get("received_at", "")
-        data["updated_at"] = _ts_display(recv)
-        warn = _stale_warning(recv)
-        if warn:
-            data["stale_warning"] = warn
-
-        return ServiceResult(service_name=self.name, success=True, data=data)
+        return _browser_result(self)
 
 
 # ─────────────────────────────────────────────────────
@@ -104,18 +91,7 @@ class BrowserClaudeBillingService(BaseService):
     source_key = "claude_billing"
 
     def fetch(self, config: dict) -> ServiceResult:
-        raw = local_server.get_data(self.source_key)
-        if not raw:
-            return _base_not_connected(self.name)
-
-        data = dict(raw)
-        recv = data.get("received_at", "")
-        data["updated_at"] = _ts_display(recv)
-        warn = _stale_warning(recv)
-        if warn:
-            data["stale_warning"] = warn
-
-        return ServiceResult(service_name=self.name, success=True, data=data)
+        return _browser_result(self)
 
 
 # ─────────────────────────────────────────────────────
@@ -126,15 +102,4 @@ class BrowserGitHubCopilotService(BaseService):
     source_key = "github_copilot"
 
     def fetch(self, config: dict) -> ServiceResult:
-        raw = local_server.get_data(self.source_key)
-        if not raw:
-            return _base_not_connected(self.name)
-
-        data = dict(raw)
-        recv = data.get("received_at", "")
-        data["updated_at"] = _ts_display(recv)
-        warn = _stale_warning(recv)
-        if warn:
-            data["stale_warning"] = warn
-
-        return ServiceResult(service_name=self.name, success=True, data=data)
+        return _browser_result(self)
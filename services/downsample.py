@@ -0,0 +1,52 @@
+"""
+時間序列降採樣 — Largest-Triangle-Three-Buckets（LTTB）
+
+GET /history 以此把數千到數萬筆資料縮減為圖表需要的點數，同時保留
+尖峰、低谷與重置時的陡降（單純取平均或每 N 筆取一筆會把它們抹平）。
+
+- 第一筆與最後一筆一定保留
+- 其餘資料分成 threshold - 2 個區間，每個區間挑出與「前一個選中點」及
+  「下一個區間平均點」構成最大三角形面積的那一筆
+- 以產生器逐點輸出，呼叫端可邊算邊送出回應
+"""
+from __future__ import annotations
+
+from typing import Iterator, Sequence
+
+
+def lttb(ts: Sequence[float], values: Sequence[float],
+         threshold: int) -> Iterator[tuple[float, float]]:
+    """Yield at most *threshold* (ts, value) points chosen by LTTB; all points if there are fewer."""
+    n = len(ts)
+    if threshold >= n or n <= 2:
+        yield from zip(ts, values)
+        return
+    if threshold <= 2:
+        yield ts[0], values[0]
+        yield ts[-1], values[-1]
+        return
+
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    yield ts[0], values[0]
+    for i in range(threshold - 2):
+        # 下一個區間的平均點
+        nxt_lo = int((i + 1) * every) + 1
+        nxt_hi = min(int((i + 2) * every) + 1, n)
+        count = nxt_hi - nxt_lo
+        avg_x = sum(ts[nxt_lo:nxt_hi]) / count
+        avg_y = sum(values[nxt_lo:nxt_hi]) / count
+
+        # 目前區間中與 a、平均點構成最大三角形的點
+        lo = int(i * every) + 1
+        hi = int((i + 1) * every) + 1
+        ax, ay = ts[a], values[a]
+        dx, dy = ax - avg_x, avg_y - ay
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs(dx * (values[j] - ay) - (ax - ts[j]) * dy)
+            if area > best_area:
+                best, best_area = j, area
+        yield ts[best], values[best]
+        a = best
+    yield ts[-1], values[-1]
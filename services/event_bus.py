@@ -0,0 +1,99 @@
+"""
+程序內的發布 / 訂閱事件匯流排
+
+local_server 每接受一筆 /update（或移除一個來源）就以來源名稱為 topic 發布；
+GUI、桌面小工具等訂閱需要的來源，有新資料時立即被喚醒，不必定時輪詢 DATA_STORE。
+
+- publish() 只把事件放進佇列就返回，不會拖慢伺服器的請求處理
+- 回呼在單一背景執行緒（ai-monitor-bus）依序執行；Tk 程式需自行以 after() 轉回主執行緒
+- 同一批待處理事件中，同一個 topic 只送最新的一筆（連續灌入時不重複重繪）
+
+    from services import event_bus
+    sub = event_bus.bus.subscribe(["claude_usage"], on_update)   # on_update(topic, payload)
+    sub.close()
+"""
+from __future__ import annotations
+
+import queue
+import threading
+from typing import Callable, Iterable, Mapping, Optional
+
+Callback = Callable[[str, Optional[Mapping]], None]
+
+
+class Subscription:
+    """Handle returned by EventBus.subscribe(); close() stops delivery."""
+
+    __slots__ = ("_bus", "topics", "callback", "active")
+
+    def __init__(self, bus: "EventBus", topics: Optional[frozenset], callback: Callback):
+        self._bus = bus
+        self.topics = topics          # None = 所有 topic
+        self.callback = callback
+        self.active = True
+
+    def wants(self, topic: str) -> bool:
+        return self.active and (self.topics is None or topic in self.topics)
+
+    def close(self):
+        self._bus.unsubscribe(self)
+
+
+class EventBus:
+    """Topic-based fan-out with asynchronous delivery on one dispatcher thread."""
+
+    def __init__(self, name: str = "ai-monitor-bus"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._subs: tuple[Subscription, ...] = ()
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, topics: Optional[Iterable[str]], callback: Callback) -> Subscription:
+        """Call callback(topic, payload) for each event on *topics* (None = every topic)."""
+        sub = Subscription(self, frozenset(topics) if topics is not None else None, callback)
+        with self._lock:
+            self._subs = self._subs + (sub,)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name=self.name)
+                self._thread.start()
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            sub.active = False
+            self._subs = tuple(s for s in self._subs if s is not sub)
+
+    def publish(self, topic: str, payload: Optional[Mapping] = None):
+        """Queue an event; returns immediately. payload None means the topic was removed."""
+        if self._subs:
+            self._queue.put((topic, payload))
+
+    # ── 背景派送 ─────────────────────────────────────────────────────
+
+    def _run(self):
+        while True:
+            latest = {}
+            topic, payload = self._queue.get()
+            latest[topic] = payload
+            while True:
+                try:
+                    topic, payload = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                latest.pop(topic, None)       # 保持最後抵達的順序
+                latest[topic] = payload
+
+            subs = self._subs
+            for topic, payload in latest.items():
+                for sub in subs:
+                    if not sub.wants(topic):
+                        continue
+                    try:
+                        sub.callback(topic, payload)
+                    except Exception as e:
+                        print(f"[AI Monitor] 事件處理失敗 ({topic}): {e}")
+
+
+# 全程式共用的匯流排；local_server 發布 DATA_STORE 的變更
+bus = EventBus()
@@ -0,0 +1,166 @@
+"""
+額度用完時間預測
+
+每個額度條（claude_usage 的 session / weekly / extra、github_copilot 的
+premium_requests、openai_billing 的 credits）一個 SlopeEstimator，以
+時間加權的 EWMA 追蹤百分比的增加速度：
+
+- 每筆新資料只更新固定幾個欄位（O(1)），不重新掃描歷史
+- 取樣間隔不固定：權重 alpha = 1 - exp(-dt / tau)，間隔越長新斜率占比越高
+- 百分比明顯下降視為額度已重置，從該筆重新開始估計
+- 內容未變的重送不會進到估計器；預測時把距上次變更的時間視為零消耗，
+  斜率隨之衰減
+
+預計用完時間 = 最後一筆時間 + 剩餘百分比 / 斜率，與 QuotaRecord 解析出的
+重置時間比較，卡片據此顯示「重置前會不會用完」。
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from .quota_schema import QuotaMetric, QuotaRecord
+
+# EWMA 時間常數：約為最近一小時的平均消耗速度
+SLOPE_TAU_SEC = 3600.0
+# 百分比下降超過此值視為重置
+RESET_DROP_PCT = 1.0
+# 至少涵蓋這麼長的時間才提供預測，避免兩筆相鄰資料造成誇張的估計
+MIN_SPAN_SEC = 300.0
+# 每小時增加不到此百分比視為沒有在消耗
+MIN_SLOPE_PCT_PER_HOUR = 0.01
+
+
+@dataclass(frozen=True, slots=True)
+class Forecast:
+    """Projected exhaustion of one quota bar; times are epoch seconds."""
+
+    percent: float
+    slope_per_hour: float          # 百分點 / 小時
+    exhaust_at: Optional[float]    # None：目前幾乎沒有消耗
+    reset_at: Optional[float]
+
+    @property
+    def before_reset(self) -> bool:
+        """True if the quota is projected to run out before it resets."""
+        if self.exhaust_at is None:
+            return False
+        return self.reset_at is None or self.exhaust_at < self.reset_at
+
+
+class SlopeEstimator:
+    """Time-weighted EWMA of d(percent)/dt over irregular samples."""
+
+    __slots__ = ("tau", "slope", "last_ts", "last_value", "since")
+
+    def __init__(self, tau: float = SLOPE_TAU_SEC):
+        self.tau = tau
+        self.slope: Optional[float] = None     # 百分點 / 秒
+        self.last_ts: Optional[float] = None
+        self.last_value = 0.0
+        self.since = 0.0                       # 本次估計（上次重置後）第一筆的時間
+
+    def update(self, ts: float, value: float):
+        """Add one sample; samples not newer than the last one are ignored."""
+        if self.last_ts is not None and ts <= self.last_ts:
+            return
+        if self.last_ts is None or value < self.last_value - RESET_DROP_PCT:
+            self.slope = None
+            self.since = ts
+        else:
+            dt = ts - self.last_ts
+            inst = max(0.0, (value - self.last_value) / dt)
+            if self.slope is None:
+                self.slope = inst
+            else:
+                self.slope += (1.0 - math.exp(-dt / self.tau)) * (inst - self.slope)
+        self.last_ts = ts
+        self.last_value = value
+
+    def forecast(self, reset_at: Optional[float], now: float,
+                 limit: float = 100.0) -> Optional[Forecast]:
+        """Projection as of *now*.
+
+        Unchanged re-sends never reach update(), so the time since the last
+        change counts as a zero-slope interval: the slope decays toward 0.
+        """
+        if self.slope is None or self.last_ts - self.since < MIN_SPAN_SEC:
+            return None
+        idle = max(0.0, now - self.last_ts)
+        slope = self.slope * math.exp(-idle / self.tau)
+        per_hour = slope * 3600
+        remaining = limit - self.last_value
+        if remaining <= 0:
+            exhaust_at = self.last_ts
+        elif per_hour < MIN_SLOPE_PCT_PER_HOUR:
+            exhaust_at = None
+        else:
+            exhaust_at = max(now, self.last_ts) + remaining / slope
+        return Forecast(self.last_value, per_hour, exhaust_at, reset_at)
+
+
+class QuotaForecaster:
+    """One SlopeEstimator per (source, metric), fed from QuotaRecords."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._estimators: dict[tuple[str, str], SlopeEstimator] = {}
+
+    def add_record(self, record: QuotaRecord):
+        with self._lock:
+            for m in record.metrics:
+                if m.percent is None:
+                    continue
+                key = (record.source, m.name)
+                est = self._estimators.get(key)
+                if est is None:
+                    est = self._estimators[key] = SlopeEstimator()
+                est.update(record.received_ts, m.percent)
+
+    def replay(self, source: str, name: str, ts, values):
+        """Rebuild one estimator from a stored series (oldest first), e.g. MetricBuffers after a restart.
+
+        The series should already contain any live samples (the ring buffers
+        merge them); the previous estimator is replaced rather than fed,
+        since update() would drop every sample older than its last one.
+        """
+        est = SlopeEstimator()
+        for t, v in zip(ts, values):
+            est.update(t, v)
+        with self._lock:
+            old = self._estimators.get((source, name))
+            if old is not None and old.last_ts is not None:
+                # 取得序列後才到達的即時資料
+                est.update(old.last_ts, old.last_value)
+            self._estimators[(source, name)] = est
+
+    def forecast(self, source: str, metric: QuotaMetric,
+                 now: Optional[float] = None) -> Optional[Forecast]:
+        now = time.time() if now is None else now
+        with self._lock:
+            est = self._estimators.get((source, metric.name))
+            return est.forecast(metric.reset_at, now) if est else None
+
+    def forecasts(self, record: QuotaRecord, now: Optional[float] = None) -> dict[str, Forecast]:
+        """Forecast for each metric of *record* that has enough samples."""
+        out = {}
+        for m in record.metrics:
+            f = self.forecast(record.source, m, now)
+            if f is not None:
+                out[m.name] = f
+        return out
+
+
+def format_when(ts: float, now: Optional[float] = None) -> str:
+    """Short local time: "14:30" today, "明天 14:30", otherwise "11/03 14:30"."""
+    now = time.time() if now is None else now
+    dt, today = datetime.fromtimestamp(ts), datetime.fromtimestamp(now).date()
+    if dt.date() == today:
+        return dt.strftime("%H:%M")
+    if dt.date() == today + timedelta(days=1):
+        return dt.strftime("明天 %H:%M")
+    return dt.strftime("%m/%d %H:%M")
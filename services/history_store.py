@@ -0,0 +1,365 @@
+"""
+額度歷史記錄（SQLite，WAL 模式）
+
+journal 只保留每個來源最新一筆；這裡保存每筆被接受的 /update 與每次成功的
+API 查詢，供趨勢圖與用量預測使用：
+
+- 每筆資料展開為數值序列 (source, metric) → (ts, value)，例如
+  claude_usage / weekly.percent、openai_billing / balance_usd
+- 背景執行緒批次寫入，每批一個交易（呼叫端只把資料放進佇列）
+- 保留策略：最近 raw_days 天保留原始解析度；較舊的資料併為每小時彙總
+  （筆數、最小、最大、總和、最後值），超過 hourly_days 天再併為每日彙總
+- 彙總在背景定期執行，每 30 秒一筆連續一年後資料量仍維持在數十萬列以內
+
+時間區間以 UTC 切齊（每小時 / 每日的起點）。
+"""
+from __future__ import annotations
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Mapping, Optional
+
+from .quota_schema import QuotaRecord
+from .server_stats import Histogram
+
+HOUR = 3600
+DAY = 86400
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id     INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    UNIQUE (source, metric)
+);
+CREATE TABLE IF NOT EXISTS samples (
+    series_id INTEGER NOT NULL,
+    ts        REAL NOT NULL,
+    value     REAL NOT NULL,
+    PRIMARY KEY (series_id, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollups (
+    series_id INTEGER NOT NULL,
+    bucket    INTEGER NOT NULL,          -- 3600 或 86400
+    ts        INTEGER NOT NULL,          -- 區間起點（UTC epoch）
+    n         INTEGER NOT NULL,
+    vmin      REAL NOT NULL,
+    vmax      REAL NOT NULL,
+    vsum      REAL NOT NULL,
+    vlast     REAL NOT NULL,
+    PRIMARY KEY (series_id, bucket, ts)
+) WITHOUT ROWID;
+"""
+
+# 把 ts < cutoff 的原始資料併入每小時彙總（last 取區間內最晚的一筆）
+_ROLLUP_SAMPLES = """
+INSERT INTO rollups (series_id, bucket, ts, n, vmin, vmax, vsum, vlast)
+SELECT series_id, :bucket, start, n, vmin, vmax, vsum, vlast FROM (
+    SELECT series_id, CAST(ts / :bucket AS INTEGER) * :bucket AS start,
+           count(*) AS n, min(value) AS vmin, max(value) AS vmax, sum(value) AS vsum,
+           max(ts), value AS vlast
+    FROM samples WHERE ts < :cutoff GROUP BY series_id, start
+) WHERE true
+ON CONFLICT (series_id, bucket, ts) DO UPDATE SET
+    n = n + excluded.n, vmin = min(vmin, excluded.vmin), vmax = max(vmax, excluded.vmax),
+    vsum = vsum + excluded.vsum, vlast = excluded.vlast
+"""
+
+# 把較舊的每小時彙總併入每日彙總
+_ROLLUP_HOURLY = """
+INSERT INTO rollups (series_id, bucket, ts, n, vmin, vmax, vsum, vlast)
+SELECT series_id, :bucket, start, n, vmin, vmax, vsum, vlast FROM (
+    SELECT series_id, CAST(ts / :bucket AS INTEGER) * :bucket AS start,
+           sum(n) AS n, min(vmin) AS vmin, max(vmax) AS vmax, sum(vsum) AS vsum,
+           max(ts), vlast
+    FROM rollups WHERE bucket = :from_bucket AND ts < :cutoff GROUP BY series_id, start
+) WHERE true
+ON CONFLICT (series_id, bucket, ts) DO UPDATE SET
+    n = n + excluded.n, vmin = min(vmin, excluded.vmin), vmax = max(vmax, excluded.vmax),
+    vsum = vsum + excluded.vsum, vlast = excluded.vlast
+"""
+
+# 讀取時把三種解析度接成一條序列（彙總以平均值代表該區間）
+_QUERY = """
+SELECT ts, vsum / n FROM rollups
+ WHERE series_id = :sid AND bucket = 86400 AND ts >= :start AND ts <= :end
+UNION ALL
+SELECT ts, vsum / n FROM rollups
+ WHERE series_id = :sid AND bucket = 3600 AND ts >= :start AND ts <= :end
+UNION ALL
+SELECT ts, value FROM samples
+ WHERE series_id = :sid AND ts >= :start AND ts <= :end
+ORDER BY ts
+"""
+
+
+def record_values(record: QuotaRecord) -> dict[str, float]:
+    """Numeric series of one QuotaRecord: <metric>.percent / <metric>.used and each amount."""
+    values = {}
+    for m in record.metrics:
+        if m.percent is not None:
+            values[f"{m.name}.percent"] = m.percent
+        if m.used is not None and m.unit != "percent":
+            values[f"{m.name}.used"] = m.used
+    values.update(record.amounts)
+    return values
+
+
+def numeric_fields(data: Mapping, prefix: str = "") -> dict[str, float]:
+    """Finite numbers in an API result's data, nested keys joined with "."."""
+    values = {}
+    for key, value in data.items():
+        if isinstance(value, bool):
+            continue
+        if isinstance(value, (int, float)):
+            if math.isfinite(value):
+                values[prefix + str(key)] = float(value)
+        elif isinstance(value, Mapping):
+            values.update(numeric_fields(value, f"{prefix}{key}."))
+    return values
+
+
+class HistoryStore:
+    """SQLite-backed sample history with a batching writer thread and rollup retention."""
+
+    def __init__(self, path: str, raw_days: float = 7, hourly_days: float = 90,
+                 flush_interval: float = 1.0, batch_size: int = 256,
+                 maintain_interval: float = HOUR):
+        self.path = path
+        self.raw_days = raw_days
+        self.hourly_days = hourly_days
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.maintain_interval = maintain_interval
+
+        self._cond = threading.Condition()
+        self._pending: list[tuple] = []     # (source, metric, ts, value)
+        self._closing = False
+        self._flush_requested = False
+        self._written_gen = 0
+        self._busy = False
+        self._thread: Optional[threading.Thread] = None
+        self._disabled = False          # 資料庫無法開啟時停止收集
+
+        # 統計（/debug/stats）
+        self.write_latency = Histogram()
+        self.maintain_latency = Histogram()
+        self._samples_written = 0
+
+        # 結構描述與 WAL 模式只設定一次；讀取共用一條連線（/history 與 preload 都很短）
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._reader: Optional[sqlite3.Connection] = None
+
+        # 以下欄位只由背景執行緒存取
+        self._db: Optional[sqlite3.Connection] = None
+        self._series_ids: dict[tuple[str, str], int] = {}
+        self._next_maintain = 0.0
+
+    # ── 公開 API ─────────────────────────────────────────────────────────
+
+    def add(self, source: str, ts: float, values: Mapping[str, float]):
+        """Queue one sample per metric in *values*, all stamped *ts*."""
+        if not values or self._disabled:
+            return
+        rows = [(source, metric, ts, value) for metric, value in values.items()]
+        with self._cond:
+            self._ensure_thread()
+            idle = not self._pending
+            self._pending.extend(rows)
+            if idle or len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+
+    def add_record(self, record: QuotaRecord):
+        self.add(record.source, record.received_ts, record_values(record))
+
+    def set_retention(self, raw_days: float, hourly_days: float):
+        """Days kept at full resolution, then as hourly rollups (daily rollups are kept forever)."""
+        with self._cond:
+            self.raw_days = max(1.0, float(raw_days))
+            self.hourly_days = max(self.raw_days, float(hourly_days))
+            self._next_maintain = 0.0
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued so far is committed."""
+        with self._cond:
+            if self._thread is None:
+                return True
+            target = self._written_gen + (2 if self._busy else 1)
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._written_gen >= target, timeout)
+
+    def close(self, timeout: Optional[float] = 5.0):
+        """Commit pending samples and stop the writer thread."""
+        with self._cond:
+            t = self._thread
+            if t is None:
+                return
+            self._closing = True
+            self._cond.notify_all()
+        t.join(timeout)
+        with self._cond:
+            # 逾時仍在寫入時保留狀態，執行緒結束時會自行清除
+            if not t.is_alive() and self._thread is t:
+                self._thread = None
+                self._closing = False
+        with self._read_lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+
+    def series(self) -> list[tuple[str, str]]:
+        """All (source, metric) pairs that have history."""
+        return self._read("SELECT source, metric FROM series ORDER BY source, metric")
+
+    def query(self, source: str, metric: str, start: float = 0.0,
+              end: float = math.inf) -> list[tuple[float, float]]:
+        """(ts, value) pairs in [start, end]; rolled-up ranges yield one averaged point per bucket."""
+        rows = self._read("SELECT id FROM series WHERE source = ? AND metric = ?", (source, metric))
+        if not rows:
+            return []
+        end = min(end, 1e18)
+        return self._read(_QUERY, {"sid": rows[0][0], "start": start, "end": end})
+
+    def stats(self) -> dict:
+        with self._cond:
+            pending = len(self._pending)
+        try:
+            db_bytes = os.path.getsize(self.path)
+        except OSError:
+            db_bytes = 0
+        return {
+            "pending": pending,
+            "samples_written": self._samples_written,
+            "db_bytes": db_bytes,
+            "write": self.write_latency.snapshot(),
+            "maintain": self.maintain_latency.snapshot(),
+        }
+
+    # ── 背景執行緒 ───────────────────────────────────────────────────────
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False)
+        with self._schema_lock:
+            if not self._schema_ready:
+                # journal_mode 會記在資料庫檔案中，之後的連線不必再設定
+                db.execute("PRAGMA journal_mode=WAL")
+                db.executescript(_SCHEMA)
+                self._schema_ready = True
+        return db
+
+    def _read(self, sql: str, params=()) -> list[tuple]:
+        """Run one query on the shared read connection."""
+        with self._read_lock:
+            if self._reader is None:
+                self._reader = self._connect()
+                self._reader.execute("PRAGMA query_only=ON")
+            try:
+                return self._reader.execute(sql, params).fetchall()
+            except sqlite3.Error:
+                # 下次重新開啟（例如資料庫檔案被刪除或替換）
+                self._reader.close()
+                self._reader = None
+                raise
+
+    def _ensure_thread(self):
+        # 呼叫者需持有 self._cond
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, daemon=True, name="ai-monitor-history")
+            self._thread.start()
+
+    def _run(self):
+        try:
+            self._db = self._connect()
+            self._db.execute("PRAGMA synchronous=NORMAL")
+        except sqlite3.Error as e:
+            print(f"[AI Monitor] 歷史資料庫開啟失敗: {e}")
+            with self._cond:
+                self._disabled = True
+                self._pending.clear()
+                self._thread = None
+                self._cond.notify_all()
+            return
+
+        while True:
+            with self._cond:
+                while not (self._pending or self._closing or self._flush_requested):
+                    self._cond.wait()      # 閒置時不喚醒；彙總在下一批資料到達時補做
+                if not (self._closing or self._flush_requested) and len(self._pending) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                batch, self._pending = self._pending, []
+                closing = self._closing
+                self._flush_requested = False
+                self._busy = True
+
+            if batch:
+                t0 = time.perf_counter()
+                try:
+                    self._write_batch(batch)
+                    self._samples_written += len(batch)
+                except sqlite3.Error as e:
+                    print(f"[AI Monitor] 歷史資料寫入失敗: {e}")
+                self.write_latency.record(time.perf_counter() - t0)
+            if time.time() >= self._next_maintain:
+                t0 = time.perf_counter()
+                try:
+                    self._maintain()
+                except sqlite3.Error as e:
+                    print(f"[AI Monitor] 歷史資料彙總失敗: {e}")
+                self.maintain_latency.record(time.perf_counter() - t0)
+                self._next_maintain = time.time() + self.maintain_interval
+
+            with self._cond:
+                self._written_gen += 1
+                self._busy = False
+                self._cond.notify_all()
+                if closing and not self._pending:
+                    break
+
+        self._db.close()
+        self._db = None
+        self._series_ids.clear()
+        with self._cond:
+            if self._thread is threading.current_thread():
+                self._thread = None
+                self._closing = False
+
+    def _series_id(self, source: str, metric: str) -> int:
+        key = (source, metric)
+        sid = self._series_ids.get(key)
+        if sid is None:
+            self._db.execute("INSERT OR IGNORE INTO series (source, metric) VALUES (?, ?)", key)
+            sid = self._db.execute("SELECT id FROM series WHERE source = ? AND metric = ?",
+                                   key).fetchone()[0]
+            self._series_ids[key] = sid
+        return sid
+
+    def _write_batch(self, batch: list[tuple]):
+        with self._db:
+            rows = [(self._series_id(source, metric), ts, value)
+                    for source, metric, ts, value in batch]
+            self._db.executemany(
+                "INSERT OR REPLACE INTO samples (series_id, ts, value) VALUES (?, ?, ?)", rows)
+
+    def _maintain(self):
+        """Fold samples older than raw_days into hourly rollups, hourly older than hourly_days into daily."""
+        now = time.time()
+        with self._cond:
+            raw_days, hourly_days = self.raw_days, self.hourly_days
+        raw_cutoff = int(now - raw_days * DAY) // HOUR * HOUR
+        hourly_cutoff = int(now - hourly_days * DAY) // DAY * DAY
+        with self._db:
+            self._db.execute(_ROLLUP_SAMPLES, {"bucket": HOUR, "cutoff": raw_cutoff})
+            self._db.execute("DELETE FROM samples WHERE ts < ?", (raw_cutoff,))
+            self._db.execute(_ROLLUP_HOURLY, {"bucket": DAY, "from_bucket": HOUR,
+                                              "cutoff": hourly_cutoff})
+            self._db.execute("DELETE FROM rollups WHERE bucket = ? AND ts < ?",
+                             (HOUR, hourly_cutoff))
+        # WAL 檔在檢查點後截斷，避免長時間執行後無限成長
+        self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
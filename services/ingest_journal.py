@@ -0,0 +1,220 @@
+"""
+Append-only 資料記錄（ingest journal）
+
+取代舊版「每次 POST 都讀取並改寫整個 data_log.json」的作法：
+
+- 每筆資料以一行 JSON 附加到 data_log.jsonl，寫入成本與歷史大小無關
+- 背景執行緒批次寫入，每批只 fsync 一次（group commit）
+- journal 超過門檻大小時，在背景壓縮為 data_log.json
+  （每個 source 只保留最新一筆，格式與舊版相同）
+- 啟動時讀取 data_log.json 並重播 data_log.jsonl，可從中斷處恢復
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Optional
+
+from . import json_codec
+from .server_stats import Histogram
+
+
+class IngestJournal:
+    """Line-delimited append-only journal with batched fsync and compaction."""
+
+    def __init__(self, snapshot_path: str, journal_path: str,
+                 flush_interval: float = 0.5, batch_size: int = 64,
+                 compact_bytes: int = 1 << 20):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.compact_bytes = compact_bytes
+
+        self._cond = threading.Condition()
+        self._pending: list[dict] = []
+        self._closing = False
+        self._flush_requested = False
+        self._written_gen = 0        # 已寫入磁碟的批次序號
+        self._busy = False           # 背景執行緒正在處理一個批次
+        self._thread: Optional[threading.Thread] = None
+
+        # 統計（/debug/stats）
+        self.write_latency = Histogram()     # 每批寫入 + fsync
+        self.compact_latency = Histogram()
+        self._records_written = 0
+
+        # 以下欄位只由背景執行緒存取
+        self._latest: dict[str, dict] = {}
+        self._file = None
+        self._journal_size = 0
+
+    # ── 公開 API ─────────────────────────────────────────────────────────
+
+    def append(self, record: dict):
+        """Queue one record; returns immediately (no disk I/O on caller thread)."""
+        self.append_many((record,))
+
+    def append_many(self, records):
+        """Queue several records as one journal write."""
+        with self._cond:
+            self._ensure_thread()
+            idle = not self._pending
+            self._pending.extend(records)
+            if idle or len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued so far is written and fsynced."""
+        with self._cond:
+            if self._thread is None:
+                return True
+            # 進行中的批次可能不含呼叫者剛加入的資料，需再等下一批
+            target = self._written_gen + (2 if self._busy else 1)
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._written_gen >= target, timeout)
+
+    def close(self, timeout: Optional[float] = 5.0):
+        """Flush pending records, compact and stop the writer thread."""
+        with self._cond:
+            t = self._thread
+            if t is None:
+                return
+            self._closing = True
+            self._cond.notify_all()
+        t.join(timeout)
+        with self._cond:
+            # 逾時仍在寫入時保留狀態，執行緒結束時會自行清除
+            if not t.is_alive() and self._thread is t:
+                self._thread = None
+                self._closing = False
+
+    def stats(self) -> dict:
+        with self._cond:
+            pending = len(self._pending)
+        return {
+            "pending": pending,
+            "records_written": self._records_written,
+            "journal_bytes": self._journal_size,
+            "write": self.write_latency.snapshot(),
+            "compact": self.compact_latency.snapshot(),
+        }
+
+    # ── 背景執行緒 ───────────────────────────────────────────────────────
+
+    def _ensure_thread(self):
+        # 呼叫者需持有 self._cond
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, daemon=True, name="ai-monitor-journal")
+            self._thread.start()
+
+    def _run(self):
+        try:
+            self._recover()
+        except Exception as e:
+            print(f"[AI Monitor] 記錄恢復失敗: {e}")
+
+        while True:
+            with self._cond:
+                while not (self._pending or self._closing or self._flush_requested):
+                    self._cond.wait()
+                if not (self._closing or self._flush_requested) and len(self._pending) < self.batch_size:
+                    # 第一筆到達後再等 flush_interval，把這段時間內的資料合併成一次 fsync
+                    self._cond.wait(self.flush_interval)
+                batch, self._pending = self._pending, []
+                closing = self._closing
+                self._flush_requested = False
+                self._busy = True
+
+            if batch:
+                t0 = time.perf_counter()
+                try:
+                    self._write_batch(batch)
+                    self._records_written += len(batch)
+                except Exception as e:
+                    print(f"[AI Monitor] 記錄寫入失敗: {e}")
+                self.write_latency.record(time.perf_counter() - t0)
+            if closing or self._journal_size >= self.compact_bytes:
+                t0 = time.perf_counter()
+                try:
+                    self._compact()
+                    self.compact_latency.record(time.perf_counter() - t0)
+                except Exception as e:
+                    print(f"[AI Monitor] 記錄壓縮失敗: {e}")
+
+            with self._cond:
+                self._written_gen += 1
+                self._busy = False
+                self._cond.notify_all()
+                if closing and not self._pending:
+                    break
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        with self._cond:
+            if self._thread is threading.current_thread():
+                self._thread = None
+                self._closing = False
+
+    def _recover(self):
+        """Load the last snapshot, replay the journal, then compact once."""
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                snap = json_codec.loads(f.read())
+            if isinstance(snap, dict):
+                self._latest.update(snap)
+        except (FileNotFoundError, json_codec.JSONDecodeError):
+            pass
+
+        try:
+            with open(self.journal_path, "rb") as f:
+                for line in f:
+                    try:
+                        rec = json_codec.loads(line)
+                    except json_codec.JSONDecodeError:
+                        continue  # 中斷時殘留的半行
+                    if isinstance(rec, dict):
+                        self._latest[rec.get("source", "unknown")] = rec
+        except FileNotFoundError:
+            return
+
+        # 重播過的 journal 壓縮後清空，避免新資料接在殘缺的最後一行後面
+        if os.path.getsize(self.journal_path) > 0:
+            self._compact()
+
+    def _open_journal(self):
+        if self._file is None:
+            self._file = open(self.journal_path, "ab")
+            self._journal_size = self._file.tell()
+
+    def _write_batch(self, batch: list[dict]):
+        self._open_journal()
+        lines = []
+        for rec in batch:
+            lines.append(json_codec.dumps(rec))
+            self._latest[rec.get("source", "unknown")] = rec
+        chunk = b"\n".join(lines) + b"\n"
+        self._file.write(chunk)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._journal_size += len(chunk)
+
+    def _compact(self):
+        """Rewrite data_log.json from the in-memory latest map and truncate the journal."""
+        tmp = self.snapshot_path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(json_codec.dumps(self._latest, indent=True))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_path)
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        with open(self.journal_path, "wb"):
+            pass
+        self._journal_size = 0
@@ -0,0 +1,105 @@
+"""
+JSON 編解碼層 — 伺服器、journal 與設定檔共用
+
+有安裝 orjson 時使用 orjson，否則退回標準函式庫 json。
+兩種後端輸出格式一致：UTF-8 bytes、不跳脫非 ASCII、緊湊分隔符號；
+indent=True 時為 2 格縮排（orjson 只支援 2 格）。
+
+    from services import json_codec
+    body = json_codec.dumps(obj)          # -> bytes
+    obj  = json_codec.loads(body)         # bytes 或 str
+
+環境變數 AI_MONITOR_JSON_BACKEND=json 可強制使用標準函式庫。
+"""
+from __future__ import annotations
+
+import json
+import os
+
+# orjson.JSONDecodeError 是 json.JSONDecodeError 的子類別，兩種後端都可用這個捕捉
+JSONDecodeError = json.JSONDecodeError
+
+
+def _stdlib_dumps(obj, *, indent: bool = False, sort_keys: bool = False) -> bytes:
+    if indent:
+        text = json.dumps(obj, ensure_ascii=False, indent=2, sort_keys=sort_keys)
+    else:
+        text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys)
+    return text.encode("utf-8")
+
+
+def _stdlib_loads(data):
+    return json.loads(data)
+
+
+def _make_orjson():
+    import orjson
+
+    base = orjson.OPT_NON_STR_KEYS
+    options = {
+        (False, False): base,
+        (True, False): base | orjson.OPT_INDENT_2,
+        (False, True): base | orjson.OPT_SORT_KEYS,
+        (True, True): base | orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS,
+    }
+    _dumps = orjson.dumps
+
+    def dumps(obj, *, indent: bool = False, sort_keys: bool = False) -> bytes:
+        return _dumps(obj, option=options[(indent, sort_keys)])
+
+    return dumps, orjson.loads
+
+
+def _make_stdlib():
+    return _stdlib_dumps, _stdlib_loads
+
+
+# 依偏好順序排列
+_BACKENDS = {
+    "orjson": _make_orjson,
+    "json": _make_stdlib,
+}
+
+BACKEND = ""
+dumps = _stdlib_dumps
+loads = _stdlib_loads
+
+
+def available_backends() -> list[str]:
+    """Backends that can be imported here, fastest first."""
+    names = []
+    for name, factory in _BACKENDS.items():
+        try:
+            factory()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def use_backend(name: str):
+    """Switch the module-level dumps/loads to *name*. Raises ImportError if unavailable."""
+    global BACKEND, dumps, loads
+    if name not in _BACKENDS:
+        raise ValueError(f"unknown JSON backend: {name!r}")
+    dumps, loads = _BACKENDS[name]()
+    BACKEND = name
+
+
+def dumps_str(obj, *, indent: bool = False, sort_keys: bool = False) -> str:
+    return dumps(obj, indent=indent, sort_keys=sort_keys).decode("utf-8")
+
+
+def _select_default():
+    preferred = os.environ.get("AI_MONITOR_JSON_BACKEND", "")
+    order = [preferred] if preferred in _BACKENDS else []
+    order += [n for n in _BACKENDS if n not in order]
+    for name in order:
+        try:
+            use_backend(name)
+            return
+        except ImportError:
+            continue
+
+
+_select_default()
@@ -2,172 +2,1204 @@
 本地 HTTP 伺服器 — 接收 Tampermonkey JS 傳來的瀏覽器頁面資料。
 
 - 監聽 http://localhost:7890
-- POST /update  → 接收 JSON 並更新 DATA_STORE
-- GET  /status  → 回傳所有暫存資料
+- POST /update  → 接收 JSON 並更新資料快照（單一物件、JSON 陣列或 NDJSON 批次）
+- GET  /status  → 回傳所有暫存資料（ETag / If-None-Match → 304）
+- GET  /status?since=V → 只回傳版本 V 之後變更或移除的來源
+- GET  /poll?seq=N[&wait=S] → 查詢是否需重新擷取；帶 wait 時長輪詢最多 S 秒
+- GET  /events  → text/event-stream，每筆接受的 /update 推送一個事件（支援 Last-Event-ID 續傳）
+- 每筆變更在寫入時以 services.quota_schema 正規化為 QuotaRecord（get_record()）
+- 每筆變更同時發布到 services.event_bus（topic = source），供 GUI 即時更新
+- GET  /history?source=&metric=&from=&to=&points= → 歷史序列，伺服器端以 LTTB 降採樣後分段串流
+- GET  /health  → {"ok", "app", "boot"}，供第二個程式辨識已在執行的伺服器
+- POST /refresh → 等同 request_refresh()（附掛的程式把重新擷取要求轉給擁有者）
+- 每筆變更的數值另寫入 services.history_store（SQLite），舊資料依保留設定彙總
+- 最近數天的數值保留在 services.metric_buffer 的環形緩衝區（get_buffers()）
+- 每個額度條的消耗速度由 services.forecast 逐筆更新，get_forecasts() 提供預計用完時間
+- GET  /debug/stats → 各路由計數與延遲分佈、lock 等待 / 解析 / journal 耗時、連線數、限流丟棄次數
+- /update 依來源與全域 token bucket 限流，超過時在解析 body 前回傳 429 + Retry-After
 - 支援 CORS (讓 Tampermonkey GM_xmlhttpRequest 能順利傳送)
 - 在背景執行緒中運行，不阻擋主程式
+- port 已被另一個 AI Monitor 占用時，改以 services.shared_ingest 附掛為用戶端，
+  同步對方的資料而不另開一條接收管線
 """
-import json
+import codecs
+import hashlib
 import os
+import sqlite3
 import threading
+import time
+from collections import deque
 from datetime import datetime
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
-from typing import Optional
+from types import MappingProxyType
+from typing import Iterator, Mapping, Optional, Union
+
+from . import json_codec
+from .downsample import lttb
+from .event_bus import bus as event_bus
+from .forecast import Forecast, QuotaForecaster
+from .history_store import HistoryStore, numeric_fields
+from .ingest_journal import IngestJournal
+from .metric_buffer import MetricBuffers
+from .quota_schema import QuotaRecord, normalize
+from .rate_limit import AdmissionControl, retry_after_header
+from .server_stats import ServerStats
 
 # 記錄檔路徑（同程式執行目錄）
+# data_log.json  — 每個 source 最新一筆的快照（由 journal 壓縮產生）
+# data_log.jsonl — append-only journal，每行一筆
 _LOG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data_log.json")
-_log_lock = threading.Lock()
+_JOURNAL_PATH = _LOG_PATH + "l"
+_journal = IngestJournal(_LOG_PATH, _JOURNAL_PATH)
+# data_history.db — 每筆資料的數值歷史（SQLite WAL）
+_history = HistoryStore(os.path.join(os.path.dirname(_LOG_PATH), "data_history.db"))
+
+# 效能計數器（GET /debug/stats）
+_stats = ServerStats()
 
 
-def _append_log(data: dict):
-    """每個 source 只保留最新一筆，寫入 data_log.json。"""
+def _append_log(*records: dict):
+    """附加資料到 journal；實際寫入與 fsync 由背景執行緒批次處理。"""
+    t0 = time.perf_counter()
     try:
-        with _log_lock:
-            try:
-                with open(_LOG_PATH, "r", encoding="utf-8") as f:
-                    log = json.load(f)
-                    if not isinstance(log, dict):
-                        log = {}
-            except (FileNotFoundError, json.JSONDecodeError):
-                log = {}
-            source = data.get("source", "unknown")
-            log[source] = data
-            with open(_LOG_PATH, "w", encoding="utf-8") as f:
-                json.dump(log, f, ensure_ascii=False, indent=2)
+        _journal.append_many(records)
+        _stats.journal_append.record(time.perf_counter() - t0)
     except Exception as e:
         print(f"[AI Monitor] 記錄寫入失敗: {e}")
 
+
+def get_history() -> HistoryStore:
+    return _history
+
+
+# 各額度數值的近期序列（趨勢、消耗速度）
+_buffers = MetricBuffers()
+
+
+def get_buffers() -> MetricBuffers:
+    return _buffers
+
+
+# 各額度條的消耗速度與預計用完時間
+_forecaster = QuotaForecaster()
+
+
+def get_forecasts(record: QuotaRecord) -> dict[str, Forecast]:
+    """Exhaustion forecasts for the metrics of *record*, keyed by metric name."""
+    return _forecaster.forecasts(record)
+
+
+def _preload_recent(since: float):
+    """Restore the ring buffers from history, then replay them into the forecaster."""
+    _buffers.preload(_history, since)
+    for source, metric in _buffers.metrics():
+        name, _, field = metric.rpartition(".")
+        if field == "percent":
+            ts, values = _buffers.window(source, metric, time.time() - since)
+            _forecaster.replay(source, name, ts, values)
+
+
+def record_service_result(key: str, result) -> None:
+    """Add the numbers of a successful API ServiceResult to the history store.
+
+    Browser results (result.record set) are skipped; their payloads were
+    recorded when /update accepted them.
+    """
+    if result.success and result.record is None:
+        _history.add(key, time.time(), numeric_fields(result.data))
+
+
+def set_history_retention(raw_days: float = 7, hourly_days: float = 90):
+    """Days of full-resolution history, then hourly rollups; older data is kept as daily rollups."""
+    _history.set_retention(raw_days, hourly_days)
+
 # ─────────────────────────────────────────────────────────────────
 #  共用資料儲存（由伺服器寫入、由服務類別讀取）
 # ─────────────────────────────────────────────────────────────────
-DATA_STORE: dict[str, dict] = {}
+class StoreSnapshot:
+    """Immutable view of the store at one version, swapped in whole on every write.
+
+    Readers take the current snapshot without a lock and never see a
+    half-applied batch. `data` is read-only all the way down; `_entries`
+    holds the same payload dicts for serialization and is never mutated
+    after the snapshot is published. `records` holds the QuotaRecord
+    normalized from each payload at ingest.
+    """
+
+    __slots__ = ("version", "data", "records", "_entries", "_views")
+
+    def __init__(self, version: int, entries: dict, views: dict, records: dict):
+        self.version = version
+        self._entries = entries
+        self._views = views
+        self.data: Mapping[str, Mapping] = MappingProxyType(views)
+        self.records: Mapping[str, QuotaRecord] = MappingProxyType(records)
+
+    def get(self, key: str) -> Optional[Mapping]:
+        return self._views.get(key)
+
+    def replace(self, version: int, updates: dict) -> "StoreSnapshot":
+        """New snapshot with *updates* applied.
+
+        updates maps source → (payload, record), or None to remove the key.
+        Only the changed entries get a new read-only view; the rest are shared.
+        """
+        entries = dict(self._entries)
+        views = dict(self._views)
+        records = dict(self.records)
+        for key, update in updates.items():
+            if update is None:
+                entries.pop(key, None)
+                views.pop(key, None)
+                records.pop(key, None)
+            else:
+                payload, record = update
+                entries[key] = payload
+                views[key] = MappingProxyType(payload)
+                records[key] = record
+        return StoreSnapshot(version, entries, views, records)
+
+
+_snapshot = StoreSnapshot(0, {}, {}, {})
+# 相容舊程式：指向目前快照的唯讀 mapping，每次寫入時重新指定
+DATA_STORE: Mapping[str, Mapping] = _snapshot.data
 _store_lock = threading.Lock()
+_store_cond = threading.Condition(_store_lock)
+
+# 每次接受 /update 遞增；同時作為 /events 的 event id
+_store_version: int = 0
+
+# 每個 source 最後一次變更時的版本，與已移除 source 的墓碑（source → 移除時版本）
+# 供 /status?since=V 只回傳變更過的來源
+_source_versions: dict[str, int] = {}
+_removed_versions: dict[str, int] = {}
+
+# 去除 meta 欄位後的 payload 雜湊；內容相同的重送只更新 _last_seen
+_content_digests: dict[str, bytes] = {}
+_last_seen: dict[str, float] = {}    # source → 最後一次收到（含未變更）的 epoch 秒
+
+# 最近的變更事件 (version, source, data)，供 /events 以 Last-Event-ID 續傳；data 為 None 表示移除
+EVENT_BACKLOG = 256
+_events: deque = deque(maxlen=EVENT_BACKLOG)
+
+# /events 無資料時的心跳間隔與建議的重連等待
+SSE_HEARTBEAT_SEC = 15.0
+SSE_RETRY_MS = 3000
 
 # ─────────────────────────────────────────────────────────────────
 #  Refresh command flag — GUI sets this to trigger JS re-fetch
 # ─────────────────────────────────────────────────────────────────
 _refresh_seq: int = 0          # monotonically increasing sequence
 _refresh_lock = threading.Lock()
+_refresh_cond = threading.Condition(_refresh_lock)
+
+# Long-poll: GET /poll?seq=N&wait=S blocks up to S seconds (capped)
+POLL_MAX_WAIT_SEC = 55.0
+
+
+# 非執行緒型的引擎（asyncio）無法等待 Condition，改為註冊喚醒回呼；
+# 每次 refresh seq 或 store version 變動後呼叫（不持有任何鎖）
+_wake_listeners: list = []
+
+
+def _add_wake_listener(fn):
+    _wake_listeners.append(fn)
+
+
+def _remove_wake_listener(fn):
+    try:
+        _wake_listeners.remove(fn)
+    except ValueError:
+        pass
+
+
+def _notify_wake():
+    for fn in list(_wake_listeners):
+        try:
+            fn()
+        except Exception:
+            pass
 
 
 def request_refresh():
     """Called by GUI to tell all JS clients to re-fetch immediately."""
     global _refresh_seq
-    with _refresh_lock:
+    client = _ingest_client
+    if client is not None:
+        # 附掛模式：瀏覽器腳本輪詢的是擁有者的 /poll
+        client.request_refresh()
+        return
+    with _refresh_cond:
         _refresh_seq += 1
+        _refresh_cond.notify_all()
+    _notify_wake()
 
 
 def get_refresh_seq() -> int:
     with _refresh_lock:
         return _refresh_seq
 
+
+def wait_refresh_seq(client_seq: int, timeout: float) -> int:
+    """Block until the refresh seq moves past *client_seq* or *timeout* elapses.
+
+    Returns the current seq (unchanged on timeout).
+    """
+    timeout = max(0.0, min(timeout, POLL_MAX_WAIT_SEC))
+    with _refresh_cond:
+        _refresh_cond.wait_for(lambda: _refresh_seq > client_seq, timeout)
+        return _refresh_seq
+
 DEFAULT_PORT = 7890
-_server_instance: Optional[ThreadingHTTPServer] = None
+
+# keep-alive 連線閒置逾時（秒），兩種引擎共用
+KEEPALIVE_IDLE_SEC = 15.0
+
+# "thread": ThreadingHTTPServer（每個連線一條執行緒，HTTP/1.1 keep-alive）
+# "asyncio": services.async_server（單一 event loop，keep-alive，限制同時連線數）
+ENGINES = ("thread", "asyncio")
+DEFAULT_ENGINE = "thread"
+
+_server_instance = None
 _server_thread: Optional[threading.Thread] = None
+_server_engine: Optional[str] = None
+# port 已被另一個 AI Monitor 占用時的同步用戶端（services.shared_ingest.IngestClient）
+_ingest_client = None
+
+# /health 回傳的程式識別，shared_ingest 以此確認 port 上是本程式而非其他服務
+APP_ID = "ai-quota-monitor"
+
+# 啟動時從歷史資料庫載入環形緩衝區的時間範圍
+BUFFER_PRELOAD_SEC = 3 * 86400
+
+
+def get_snapshot() -> StoreSnapshot:
+    """Current immutable store snapshot (no lock, no copy)."""
+    return _snapshot
+
+
+def get_data(key: str) -> Optional[Mapping]:
+    """Read-only payload for *key*; copy with dict() before modifying."""
+    return _snapshot.get(key)
+
+
+def get_all_data() -> Mapping[str, Mapping]:
+    return _snapshot.data
+
+
+def get_record(key: str) -> Optional[QuotaRecord]:
+    """Typed quota record normalized from *key*'s payload when it was accepted."""
+    return _snapshot.records.get(key)
+
 
+def _publish_snapshot(updates: dict):
+    """Swap in a new snapshot with *updates*. Caller must hold _store_lock."""
+    global _snapshot, DATA_STORE
+    _snapshot = _snapshot.replace(_store_version, updates)
+    DATA_STORE = _snapshot.data
 
-def get_data(key: str) -> Optional[dict]:
+
+def get_store_version() -> int:
+    """Version of the published snapshot."""
+    return _snapshot.version
+
+
+def get_last_seen(key: str) -> Optional[float]:
+    """Epoch of the last /update for *key*, including unchanged re-sends (for staleness)."""
+    with _store_lock:
+        return _last_seen.get(key)
+
+
+def _merge_last_seen(seen: Mapping) -> None:
+    """Apply an owner's last-seen times (the `seen` SSE event) in an attached process."""
     with _store_lock:
-        return DATA_STORE.get(key)
+        for source, ts in seen.items():
+            if isinstance(ts, (int, float)) and not isinstance(ts, bool) and isinstance(source, str):
+                if ts > _last_seen.get(source, 0.0):
+                    _last_seen[source] = float(ts)
+
+
+def _payload_digest(data: dict) -> bytes:
+    """Hash of the payload without its meta keys (SKIP_KEYS)."""
+    body = {k: v for k, v in data.items() if k not in SKIP_KEYS}
+    return hashlib.blake2b(json_codec.dumps(body, sort_keys=True), digest_size=16).digest()
+
+
+def _commit_update(source: str, data: dict) -> int:
+    """Store one accepted payload, bump the version and wake /events streams."""
+    _commit_updates([(source, data, None)])
+    return get_store_version()
+
+
+def _commit_updates(items: list) -> list[Optional[QuotaRecord]]:
+    """Apply (source, data, digest) triples under a single _store_lock acquisition.
+
+    Items whose digest equals the stored one only refresh _last_seen.
+    Changed payloads are normalized into a QuotaRecord once, here.
+    Returns one entry per item: its new QuotaRecord, or None if unchanged.
+    """
+    global _store_version
+    # 正規化在取鎖前完成；內容未變（digest 相同）的重送不需要
+    records = [
+        normalize(source, data)
+        if digest is None or _content_digests.get(source) != digest else None
+        for source, data, digest in items
+    ]
+    now = time.time()
+    changed = []
+    updates = {}
+    t0 = time.perf_counter()
+    with _store_cond:
+        waited = time.perf_counter() - t0
+        for (source, data, digest), record in zip(items, records):
+            _last_seen[source] = now
+            if digest is not None and _content_digests.get(source) == digest:
+                changed.append(None)
+                continue
+            if record is None:
+                record = normalize(source, data)  # 取鎖前讀到的 digest 已被其他請求更新
+            updates[source] = (data, record)
+            _store_version += 1
+            _source_versions[source] = _store_version
+            _removed_versions.pop(source, None)
+            if digest is not None:
+                _content_digests[source] = digest
+            else:
+                _content_digests.pop(source, None)
+            _events.append((_store_version, source, data))
+            # 在鎖內發布，事件順序與版本號一致（publish 只放進佇列）
+            event_bus.publish(source, MappingProxyType(data))
+            changed.append(record)
+        if updates:
+            _publish_snapshot(updates)
+            _store_cond.notify_all()
+    _stats.lock_wait.record(waited)
+    if updates:
+        for record in changed:
+            if record is not None:
+                _buffers.add_record(record)
+                _forecaster.add_record(record)
+        _notify_wake()
+    return changed
+
+
+def remove_data(key: str) -> bool:
+    """Drop one source from DATA_STORE; delta readers see it in `removed`."""
+    global _store_version
+    with _store_cond:
+        if _snapshot.get(key) is None:
+            return False
+        _content_digests.pop(key, None)
+        _store_version += 1
+        _publish_snapshot({key: None})
+        _source_versions.pop(key, None)
+        _removed_versions[key] = _store_version
+        _events.append((_store_version, key, None))
+        event_bus.publish(key, None)
+        _store_cond.notify_all()
+    _notify_wake()
+    return True
+
 
+def get_changes_since(since: int) -> dict:
+    """Sources changed and removed after store version *since*.
 
-def get_all_data() -> dict:
+    Returns {"version", "since", "changed": {source: data}, "removed": [source]}.
+    """
     with _store_lock:
-        return dict(DATA_STORE)
+        entries = _snapshot._entries
+        changed = {src: entries[src] for src, ver in _source_versions.items() if ver > since}
+        removed = [src for src, ver in _removed_versions.items() if ver > since]
+        return {"version": _store_version, "since": since, "changed": changed, "removed": removed}
+
+
+def _events_after(last_id: int) -> tuple[list, bool]:
+    """Return (events newer than last_id, gap) — gap means the backlog no longer covers last_id.
+
+    Caller must hold _store_lock.
+    """
+    if last_id >= _store_version:
+        return [], False
+    if not _events or _events[0][0] > last_id + 1:
+        return [], True
+    return [ev for ev in _events if ev[0] > last_id], False
 
 
 def is_running() -> bool:
-    return _server_instance is not None
+    return _server_instance is not None or _ingest_client is not None
+
+
+def is_attached() -> bool:
+    """True if this process mirrors another instance's server instead of owning the port."""
+    return _ingest_client is not None
+
+
+# ─────────────────────────────────────────────────────────────────
+#  Route logic (shared by both engines)
+# ─────────────────────────────────────────────────────────────────
+
+# CORS headers for all responses
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type, X-AI-Monitor-Client, X-AI-Monitor-Source, "
+                                    "Last-Event-ID, If-None-Match",
+    "Access-Control-Expose-Headers": "ETag, X-Store-Version, Retry-After",
+}
+
+# Meta keys added by the JS client / server, not real data values
+SKIP_KEYS = {"source", "timestamp", "page_url", "received_at"}
+
+NOT_FOUND = b'{"error":"not found"}'
+
+
+# 一次批次 /update 最多接受的項目數
+MAX_BATCH_ITEMS = 64
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+# 請求 body 上限；Content-Length 超過時不讀取 body，直接回傳 413
+MAX_BODY_BYTES = 256 * 1024
+# 逐塊讀取 body 的大小
+BODY_CHUNK_BYTES = 16 * 1024
+
+
+def _prepare_item(data) -> tuple[Optional[dict], dict]:
+    """Validate one source payload. Returns (payload to store or None, per-item result)."""
+    if not isinstance(data, dict):
+        return None, {"ok": False, "error": "expected a JSON object"}
+
+    source = data.get("source")
+    if not source:
+        return None, {"ok": False, "error": "missing source field"}
+
+    # Reject empty payloads (only meta keys, no real data values)
+    real_keys = [k for k in data if k not in SKIP_KEYS]
+    if not real_keys:
+        return None, {"ok": False, "source": source, "reason": "empty payload, ignored"}
+
+    # Stamp with received time
+    data["received_at"] = datetime.now().isoformat()
+    return data, {"ok": True, "source": source}
+
+
+def _apply_items(parsed: list) -> list[dict]:
+    """Validate parsed items, commit the accepted ones together and write one journal batch.
+
+    Payloads identical to the stored one (ignoring meta keys) are answered
+    with "unchanged": true and skip the store, journal and UI refresh.
+    """
+    results = []
+    accepted = []
+    for item in parsed:
+        if isinstance(item, Exception):
+            results.append({"ok": False, "error": str(item)})
+            continue
+        data, result = _prepare_item(item)
+        results.append(result)
+        if data is not None:
+            accepted.append((data, result))
+
+    if accepted:
+        triples = [(d["source"], d, _payload_digest(d)) for d, _ in accepted]
+        records = _commit_updates(triples)
+        written = []
+        for (data, result), record in zip(accepted, records):
+            if record is not None:
+                written.append(data)
+                _history.add_record(record)
+            else:
+                result["unchanged"] = True
+        if written:
+            _append_log(*written)
+    return results
+
+
+def _parse_ndjson_line(line: str):
+    try:
+        return json_codec.loads(line)
+    except json_codec.JSONDecodeError as e:
+        return e
+
+
+def _parse_ndjson(text: str) -> list:
+    return [_parse_ndjson_line(line) for line in text.splitlines() if line.strip()]
+
+
+def _error_body(message: str) -> bytes:
+    return json_codec.dumps({"error": message})
+
+
+class _UpdateBodyParser:
+    """Incremental POST /update body: fed in chunks, rejected as early as possible.
+
+    UTF-8 is decoded chunk by chunk, so invalid bytes fail on the chunk that
+    contains them. NDJSON lines are parsed as soon as they are complete and
+    the batch limit is checked per line; a JSON body must start with '{' or
+    '[' and is parsed once the last chunk has arrived.
+    """
+
+    def __init__(self, content_type: str = ""):
+        self.ndjson = content_type.split(";")[0].strip().lower() in NDJSON_TYPES
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._parts: list[str] = []
+        self._items: list = []
+        self._partial_line = ""
+        self._started = False
+        self.parse_seconds = 0.0
+
+    def feed(self, chunk: bytes) -> Optional[tuple[int, bytes]]:
+        """Consume one chunk. Returns an error response to send now, or None."""
+        t0 = time.perf_counter()
+        try:
+            text = self._decoder.decode(chunk)
+        except UnicodeDecodeError as e:
+            return 400, _error_body(str(e))
+        error = self._feed_text(text)
+        self.parse_seconds += time.perf_counter() - t0
+        return error
+
+    def _feed_text(self, text: str) -> Optional[tuple[int, bytes]]:
+        if not self._started:
+            stripped = text.lstrip()
+            if not stripped:
+                return None
+            self._started = True
+            if not self.ndjson and stripped[0] not in "{[":
+                return 400, b'{"error":"expected a JSON object or array"}'
+
+        if not self.ndjson:
+            self._parts.append(text)
+            return None
+
+        lines = (self._partial_line + text).split("\n")
+        self._partial_line = lines.pop()
+        for line in lines:
+            if not line.strip():
+                continue
+            self._items.append(_parse_ndjson_line(line))
+            if len(self._items) > MAX_BATCH_ITEMS:
+                return 400, _error_body(f"too many items (max {MAX_BATCH_ITEMS})")
+        return None
+
+    def _parse_rest(self):
+        """Decode the tail and parse the body. Returns (error response or None, parsed value)."""
+        try:
+            tail = self._decoder.decode(b"", final=True)
+        except UnicodeDecodeError as e:
+            return (400, _error_body(str(e))), None
+        error = self._feed_text(tail)
+        if error is not None:
+            return error, None
+        if not self._started:
+            return (400, b'{"error":"empty body"}'), None
+
+        if self.ndjson:
+            error = self._feed_text("\n")      # 最後一行可能沒有換行
+            return error, self._items
+
+        try:
+            return None, json_codec.loads("".join(self._parts))
+        except json_codec.JSONDecodeError as e:
+            return (400, _error_body(str(e))), None
+
+    def finish(self) -> tuple[int, bytes]:
+        """Body complete: parse what is left and apply it. Returns (status, response body)."""
+        t0 = time.perf_counter()
+        error, data = self._parse_rest()
+        self.parse_seconds += time.perf_counter() - t0
+        _stats.parse.record(self.parse_seconds)
+        if error is not None:
+            return error
+        if self.ndjson:
+            return _handle_batch(data)
+
+        if isinstance(data, dict):
+            # 單筆：維持原本的狀態碼與回應格式
+            results = _apply_items([data])
+            result = results[0]
+            if result.get("error"):
+                return 400, _error_body(result["error"])
+            if not result["ok"]:
+                return 200, json_codec.dumps({"ok": False, "reason": result["reason"]})
+            return 200, json_codec.dumps(result)
+        if not isinstance(data, list):
+            return 400, b'{"error":"expected a JSON object or array"}'
+        return _handle_batch(data)
+
+
+def _handle_batch(items: list) -> tuple[int, bytes]:
+    if not items:
+        return 400, b'{"error":"empty batch"}'
+    if len(items) > MAX_BATCH_ITEMS:
+        return 400, _error_body(f"too many items (max {MAX_BATCH_ITEMS})")
+
+    results = _apply_items(items)
+    accepted = sum(1 for r in results if r["ok"])
+    return 200, json_codec.dumps({"ok": accepted > 0, "accepted": accepted, "results": results})
+
+
+def _handle_update(raw: bytes, content_type: str = "") -> tuple[int, bytes]:
+    """Validate and apply one POST /update body. Returns (status, response body).
+
+    Accepts a single JSON object (original format), a JSON array of objects,
+    or application/x-ndjson with one object per line. Batches are applied
+    under one store lock and one journal write, and answered with a
+    per-item `results` array. The engines stream large bodies through
+    _UpdateBodyParser directly; this is the one-shot form.
+    """
+    parser = _UpdateBodyParser(content_type)
+    error = parser.feed(raw)
+    if error is not None:
+        return error
+    return parser.finish()
+
+
+def _check_body_length(length_header: Optional[str],
+                       transfer_encoding: Optional[str]) -> tuple[int, Optional[tuple[int, bytes]]]:
+    """Validate request framing before any body byte is read.
+
+    Returns (content length, None) or (-1, error response); on error the
+    body is left unread and the connection must be closed.
+    """
+    if transfer_encoding:
+        return -1, (411, b'{"error":"Content-Length required"}')
+    try:
+        length = int(length_header or 0)
+    except ValueError:
+        length = -1
+    if length < 0:
+        return -1, (400, b'{"error":"bad content-length"}')
+    if length > MAX_BODY_BYTES:
+        return -1, (413, _error_body(f"body too large (max {MAX_BODY_BYTES} bytes)"))
+    return length, None
+
+
+def set_max_body_bytes(limit: int):
+    """Set the largest accepted request body; bigger posts get 413 before reading."""
+    global MAX_BODY_BYTES
+    MAX_BODY_BYTES = max(1024, int(limit))
+
+
+# /status 的序列化結果快取到下一次版本遞增為止
+_status_cache: tuple[int, bytes] = (-1, b"")
+_status_cache_lock = threading.Lock()
+
+# ETag 加上每次啟動不同的前綴，避免重啟後版本號歸零而誤判為未變更
+_ETAG_BOOT = f"{os.getpid():x}{int(datetime.now().timestamp()):x}"
+
+
+def _status_etag(version: int) -> str:
+    return f'"{_ETAG_BOOT}-{version}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def _status_body() -> tuple[int, bytes]:
+    """Return (version, serialized DATA_STORE), re-serializing only after a version bump."""
+    global _status_cache
+    with _status_cache_lock:
+        snap = _snapshot
+        cached_version, cached_body = _status_cache
+        if cached_version == snap.version:
+            return cached_version, cached_body
+        body = json_codec.dumps(snap._entries)
+        _status_cache = (snap.version, body)
+        return snap.version, body
+
+
+# ── /update 流量限制 ─────────────────────────────────────────────
+_admission = AdmissionControl()
+
+
+def set_rate_limits(per_source_rate: float = 2.0, per_source_burst: float = 20,
+                    global_rate: float = 20.0, global_burst: float = 100):
+    """Configure /update admission limits (requests/sec and burst size; rate <= 0 disables)."""
+    _admission.configure(per_source_rate, per_source_burst, global_rate, global_burst)
+
+
+def _update_source_hint(path: str, header: Optional[str]) -> Optional[str]:
+    """Source name available before the body is read: X-AI-Monitor-Source or ?source=."""
+    if header:
+        return header.strip()
+    if "?" in path:
+        values = _parse_query(path).get("source")
+        if values:
+            return values[0]
+    return None
+
+
+def _admit_update(path: str, source_header: Optional[str]) -> Optional[tuple[int, bytes, dict]]:
+    """Return a 429 response if /update is over its rate limit, else None."""
+    wait = _admission.admit(_update_source_hint(path, source_header))
+    if not wait:
+        return None
+    retry = retry_after_header(wait)
+    body = json_codec.dumps({"ok": False, "error": "rate limited", "retry_after": int(retry)})
+    return 429, body, {"Retry-After": retry}
+
+
+def _health_body() -> bytes:
+    return json_codec.dumps({"ok": True, "app": APP_ID, "boot": _ETAG_BOOT})
+
+
+# GET /history：預設範圍與點數；points 上限避免圖表拉取完整解析度
+HISTORY_DEFAULT_SEC = 7 * 86400
+HISTORY_DEFAULT_POINTS = 500
+HISTORY_MAX_POINTS = 5000
+# 每個 chunk 的點數
+HISTORY_CHUNK_POINTS = 256
+
+
+def _parse_time(value: str) -> float:
+    """Epoch seconds from "1791763200" or an ISO timestamp; raises ValueError."""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def _handle_history(path: str) -> tuple[int, Union[bytes, Iterator[bytes]]]:
+    """GET /history. Returns (status, body); a 200 body is an iterator of chunks to stream.
+
+    Without source and metric, lists the series that have history.
+    """
+    qs = _parse_query(path)
+    source = qs.get("source", [""])[0]
+    metric = qs.get("metric", [""])[0]
+    try:
+        series = _history.series()
+    except sqlite3.Error as e:
+        return _history_unavailable(e)
+    if not source and not metric:
+        listing = [{"source": s, "metric": m} for s, m in series]
+        return 200, iter((json_codec.dumps({"series": listing}),))
+    if (source, metric) not in series:
+        return 404, json_codec.dumps({"error": "unknown series", "source": source, "metric": metric})
+
+    try:
+        end = _parse_time(qs["to"][0]) if "to" in qs else time.time()
+        start = _parse_time(qs["from"][0]) if "from" in qs else end - HISTORY_DEFAULT_SEC
+        points = int(qs.get("points", [str(HISTORY_DEFAULT_POINTS)])[0])
+    except ValueError as e:
+        return 400, json_codec.dumps({"error": f"invalid parameter: {e}"})
+    points = max(2, min(points, HISTORY_MAX_POINTS))
+
+    try:
+        rows = _history.query(source, metric, start, end)
+    except sqlite3.Error as e:
+        return _history_unavailable(e)
+    ts = [r[0] for r in rows]
+    values = [r[1] for r in rows]
+    head = {"source": source, "metric": metric, "from": start, "to": end, "count": len(rows)}
+    return 200, _history_chunks(head, lttb(ts, values, points))
+
+
+def _history_unavailable(error: sqlite3.Error) -> tuple[int, bytes]:
+    print(f"[AI Monitor 伺服器] 讀取歷史資料失敗: {error}")
+    return 503, _error_body("history unavailable")
+
+
+def _history_chunks(head: dict, samples: Iterator[tuple[float, float]]) -> Iterator[bytes]:
+    """Serialize {..head, "points": [[ts, value], ...]} a few hundred points at a time."""
+    yield json_codec.dumps(head)[:-1] + b',"points":['
+    chunk = []
+    first = True
+    for point in samples:
+        chunk.append(point)
+        if len(chunk) >= HISTORY_CHUNK_POINTS:
+            yield (b"" if first else b",") + json_codec.dumps(chunk)[1:-1]
+            chunk, first = [], False
+    if chunk:
+        yield (b"" if first else b",") + json_codec.dumps(chunk)[1:-1]
+    yield b"]}"
+
+
+def _handle_refresh() -> bytes:
+    request_refresh()
+    return json_codec.dumps({"ok": True, "seq": get_refresh_seq()})
+
+
+def _handle_debug_stats() -> bytes:
+    return json_codec.dumps({
+        "engine": _server_engine,
+        "server": _stats.snapshot(),
+        "journal": _journal.stats(),
+        "history": _history.stats(),
+        "rate_limit": _admission.stats(),
+        # 目前資料的正規化問題（型別錯誤、無法解析的重置時間等）
+        "schema_errors": {src: list(rec.errors)
+                          for src, rec in _snapshot.records.items() if rec.errors},
+    })
+
+
+def _handle_status(if_none_match: Optional[str] = None,
+                   path: str = "/status") -> tuple[int, bytes, dict]:
+    """GET /status with conditional-GET support. Returns (status, body, extra headers).
+
+    /status?since=V[&boot=B] returns only the sources changed after version V
+    plus the ones removed since. If B is not this process's boot id (server
+    restarted) or V is ahead of the store, the answer is a full snapshot
+    marked "full": true.
+    """
+    qs = _parse_query(path)
+    if "since" in qs:
+        return _handle_status_delta(qs, if_none_match)
+
+    version, body = _status_body()
+    etag = _status_etag(version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "X-Store-Version": str(version)}
+    if _etag_matches(if_none_match, etag):
+        return 304, b"", headers
+    return 200, body, headers
+
+
+def _handle_status_delta(qs: dict, if_none_match: Optional[str]) -> tuple[int, bytes, dict]:
+    try:
+        since = int(qs.get("since", ["0"])[0])
+    except ValueError:
+        return 400, b'{"error":"since must be an integer"}', {}
+    boot = qs.get("boot", [_ETAG_BOOT])[0]
+
+    version = get_store_version()
+    etag = _status_etag(version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "X-Store-Version": str(version)}
+    if _etag_matches(if_none_match, etag):
+        return 304, b"", headers
+
+    if boot != _ETAG_BOOT or since < 0 or since > version:
+        delta = get_changes_since(-1)
+        delta["full"] = True
+    else:
+        delta = get_changes_since(since)
+        delta["full"] = False
+    delta["boot"] = _ETAG_BOOT
+    # 以實際取得變更時的版本為準（期間可能又有更新）
+    headers["X-Store-Version"] = str(delta["version"])
+    headers["ETag"] = _status_etag(delta["version"])
+    return 200, json_codec.dumps(delta), headers
+
+
+def _route(path: str) -> str:
+    """Path without the query string."""
+    return path.split("?", 1)[0]
+
+
+def _parse_query(path: str) -> dict:
+    import urllib.parse as _up
+    return _up.parse_qs(_up.urlparse(path).query)
+
+
+def _parse_poll_query(path: str) -> tuple[int, float]:
+    """Return (client seq, long-poll wait seconds) from /poll?seq=N&wait=S."""
+    qs = _parse_query(path)
+    try:
+        client_seq = int(qs.get("seq", ["0"])[0])
+    except (ValueError, IndexError):
+        client_seq = 0
+    try:
+        wait = float(qs.get("wait", ["0"])[0])
+    except (ValueError, IndexError):
+        wait = 0.0
+    return client_seq, max(0.0, min(wait, POLL_MAX_WAIT_SEC))
+
+
+def _poll_body(client_seq: int, server_seq: int) -> bytes:
+    return json_codec.dumps({
+        "seq": server_seq,
+        "refresh": server_seq > client_seq,
+    })
+
+
+def _parse_last_event_id(header: Optional[str], path: str) -> Optional[int]:
+    raw_id = header or _parse_query(path).get("last_id", [""])[0]
+    try:
+        return int(raw_id)
+    except ValueError:
+        return None
+
+
+def _sse_event(event_id: int, event: str, payload: dict) -> bytes:
+    head = f"id: {event_id}\nevent: {event}\ndata: ".encode()
+    return head + json_codec.dumps(payload) + b"\n\n"
+
+
+def _sse_hello() -> tuple[bytes, int]:
+    """First frame for a new /events connection without Last-Event-ID."""
+    with _store_lock:
+        version = _store_version
+    # 新連線：只告知目前版本，由用戶端自行 GET /status 取得全量資料
+    return _sse_event(version, "hello", {"version": version}), version
+
+
+def _sse_frames(events: list, gap: bool, version: int, last_id: int) -> tuple[bytes, int]:
+    """Encode pending events (or a reset) and return (frames, new last id)."""
+    if gap:
+        return _sse_event(version, "reset", {"version": version}), version
+    out = []
+    for ver, source, data in events:
+        if data is None:
+            out.append(_sse_event(ver, "remove", {"version": ver, "source": source}))
+            last_id = ver
+            continue
+        out.append(_sse_event(ver, "update", {
+            "version": ver,
+            "source": source,
+            "received_at": data.get("received_at"),
+            "data": data,
+        }))
+        last_id = ver
+    return b"".join(out), last_id
+
+
+def _sse_seen(sent: Mapping) -> tuple[bytes, dict]:
+    """`seen` frame when any last-seen time differs from *sent*, else b"".
+
+    Unchanged re-sends publish no `update`, so attached processes learn of
+    them only through this map (no id: Last-Event-ID is unaffected).
+    """
+    with _store_lock:
+        if _last_seen == sent:
+            return b"", sent
+        current = dict(_last_seen)
+    return b"event: seen\ndata: " + json_codec.dumps(current) + b"\n\n", current
+
+
+SSE_PREAMBLE = f"retry: {SSE_RETRY_MS}\n\n".encode()
+SSE_PING = b": ping\n\n"
 
 
 # ─────────────────────────────────────────────────────────────────
-#  HTTP Handler
+#  HTTP Handler (thread engine)
 # ─────────────────────────────────────────────────────────────────
 class _Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1：同一條連線可連續處理多個請求（每個回應都必須帶 Content-Length）
+    protocol_version = "HTTP/1.1"
+    # 連線閒置超過此秒數（socket timeout）即關閉，釋放處理執行緒
+    timeout = KEEPALIVE_IDLE_SEC
+    # 標頭與 body 分兩次寫出；關閉 Nagle 避免與 delayed ACK 疊加造成 40ms 延遲
+    disable_nagle_algorithm = True
+
+    _CORS = CORS_HEADERS
+
+    # ── 統計：連線數與每個請求的延遲 / bytes ────────────────────────
+    def setup(self):
+        super().setup()
+        _stats.connection_opened()
+
+    def finish(self):
+        try:
+            super().finish()
+        finally:
+            _stats.connection_closed()
+
+    def parse_request(self):
+        self._t0 = time.perf_counter()
+        self._bytes_in = 0
+        return super().parse_request()
 
-    # CORS headers for all responses
-    _CORS = {
-        "Access-Control-Allow-Origin": "*",
-        "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
-        "Access-Control-Allow-Headers": "Content-Type, X-AI-Monitor-Client",
-    }
+    def _record(self, status: int, bytes_out: int):
+        _stats.record_request(self.command, self.path, status, self._bytes_in, bytes_out,
+                              time.perf_counter() - self._t0)
 
-    def _send(self, status: int, body: bytes, content_type: str = "application/json"):
+    def _send(self, status: int, body: bytes, content_type: str = "application/json",
+              headers: Optional[dict] = None):
         self.send_response(status)
         self.send_header("Content-Type", content_type)
         self.send_header("Content-Length", str(len(body)))
         for k, v in self._CORS.items():
             self.send_header(k, v)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        if self.close_connection:
+            self.send_header("Connection", "close")
         self.end_headers()
         self.wfile.write(body)
+        self._record(status, len(body))
 
-    def do_OPTIONS(self):
-        """Handle CORS preflight."""
-        self.send_response(204)
+    def _send_chunked(self, status: int, chunks: Iterator[bytes],
+                      content_type: str = "application/json"):
+        """Stream *chunks* with Transfer-Encoding: chunked (HTTP/1.0: until close)."""
+        chunked = self.request_version != "HTTP/1.0"
+        if not chunked:
+            self.close_connection = True
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
         for k, v in self._CORS.items():
             self.send_header(k, v)
+        if self.close_connection:
+            self.send_header("Connection", "close")
         self.end_headers()
+        sent = 0
+        for chunk in chunks:
+            if not chunk:
+                continue
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk) if chunked else chunk)
+            sent += len(chunk)
+        if chunked:
+            self.wfile.write(b"0\r\n\r\n")
+        self._record(status, sent)
+
+    def do_OPTIONS(self):
+        """Handle CORS preflight."""
+        self._send(204, b"")
 
     def do_GET(self):
-        if self.path == "/status" or self.path == "/":
-            payload = json.dumps(get_all_data(), ensure_ascii=False).encode()
-            self._send(200, payload)
+        route = _route(self.path)
+        if route == "/status" or route == "/":
+            status, body, headers = _handle_status(self.headers.get("If-None-Match"), self.path)
+            self._send(status, body, headers=headers)
         elif self.path == "/health":
-            self._send(200, b'{"ok":true}')
+            self._send(200, _health_body())
         elif self.path.startswith("/poll"):
-            # JS polls with ?seq=N; if server seq > N, tell JS to refresh
-            import urllib.parse as _up
-            qs = _up.parse_qs(_up.urlparse(self.path).query)
-            try:
-                client_seq = int(qs.get("seq", ["0"])[0])
-            except (ValueError, IndexError):
-                client_seq = 0
-            server_seq = get_refresh_seq()
-            payload = json.dumps({
-                "seq": server_seq,
-                "refresh": server_seq > client_seq,
-            }).encode()
-            self._send(200, payload)
+            # JS polls with ?seq=N; if server seq > N, tell JS to refresh.
+            # With &wait=S the request is parked until a refresh or timeout.
+            client_seq, wait = _parse_poll_query(self.path)
+            if wait > 0:
+                server_seq = wait_refresh_seq(client_seq, wait)
+            else:
+                server_seq = get_refresh_seq()
+            self._send(200, _poll_body(client_seq, server_seq))
+        elif self.path.startswith("/events"):
+            self._stream_events()
+        elif route == "/history":
+            status, body = _handle_history(self.path)
+            if isinstance(body, bytes):
+                self._send(status, body)
+            else:
+                self._send_chunked(status, body)
+        elif route == "/debug/stats":
+            self._send(200, _handle_debug_stats())
         else:
-            self._send(404, b'{"error":"not found"}')
+            self._send(404, NOT_FOUND)
 
-    def do_POST(self):
-        if self.path != "/update":
-            self._send(404, b'{"error":"not found"}')
-            return
+    def _stream_events(self):
+        """Server-Sent Events: one `update` event per accepted /update.
 
-        length = int(self.headers.get("Content-Length", 0))
-        if length == 0:
-            self._send(400, b'{"error":"empty body"}')
-            return
+        Resume with the Last-Event-ID header (or ?last_id=N for clients that
+        cannot set headers). If the backlog no longer covers that id, a
+        `reset` event tells the client to re-fetch /status once.
+        """
+        last_id = _parse_last_event_id(self.headers.get("Last-Event-ID"), self.path)
+
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        for k, v in self._CORS.items():
+            self.send_header(k, v)
+        self.end_headers()
 
-        raw = self.rfile.read(length)
+        server = self.server
+        sent = 0
+        seen: dict = {}
         try:
-            data = json.loads(raw.decode("utf-8"))
-        except json.JSONDecodeError as e:
-            self._send(400, json.dumps({"error": str(e)}).encode())
-            return
+            self.wfile.write(SSE_PREAMBLE)
+            sent += len(SSE_PREAMBLE)
+            if last_id is None:
+                frame, last_id = _sse_hello()
+                self.wfile.write(frame)
+                sent += len(frame)
+            frame, seen = _sse_seen(seen)
+            self.wfile.write(frame)
+            sent += len(frame)
+            self.wfile.flush()
 
-        source = data.get("source")
-        if not source:
-            self._send(400, b'{"error":"missing source field"}')
+            while _server_instance is server:
+                with _store_cond:
+                    events, gap = _events_after(last_id)
+                    if not events and not gap:
+                        _store_cond.wait(SSE_HEARTBEAT_SEC)
+                        events, gap = _events_after(last_id)
+                    version = _store_version
+                frames = b""
+                if events or gap:
+                    frames, last_id = _sse_frames(events, gap, version, last_id)
+                frame, seen = _sse_seen(seen)
+                frames += frame
+                if not frames:
+                    frames = SSE_PING
+                self.wfile.write(frames)
+                self.wfile.flush()
+                sent += len(frames)
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            pass  # 用戶端已斷線
+        finally:
+            # 串流的延遲即連線持續時間
+            self._record(200, sent)
+
+    def do_POST(self):
+        if _route(self.path) == "/refresh":
+            length, error = _check_body_length(self.headers.get("Content-Length"),
+                                               self.headers.get("Transfer-Encoding"))
+            if error is not None:
+                self.close_connection = True
+                self._send(*error)
+            elif self._discard_body(length):
+                self._send(200, _handle_refresh())
+            return
+        if _route(self.path) != "/update":
+            # body 未讀取，不能續用這條連線
+            self.close_connection = True
+            self._send(404, NOT_FOUND)
             return
 
-        # Reject empty payloads (only meta keys, no real data values)
-        SKIP_KEYS = {"source", "timestamp", "page_url", "received_at"}
-        real_keys = [k for k in data if k not in SKIP_KEYS]
-        if not real_keys:
-            self._send(200, json.dumps({"ok": False, "reason": "empty payload, ignored"}).encode())
+        rejected = _admit_update(self.path, self.headers.get("X-AI-Monitor-Source"))
+        if rejected is not None:
+            # 不讀取 body，直接關閉連線
+            self.close_connection = True
+            status, body, headers = rejected
+            self._send(status, body, headers=headers)
             return
 
-        # Stamp with received time
-        data["received_at"] = datetime.now().isoformat()
+        length, error = _check_body_length(self.headers.get("Content-Length"),
+                                           self.headers.get("Transfer-Encoding"))
+        if error is not None:
+            self.close_connection = True
+            self._send(*error)
+            return
 
-        with _store_lock:
-            DATA_STORE[source] = data
+        parser = _UpdateBodyParser(self.headers.get("Content-Type", ""))
+        remaining = length
+        while remaining > 0:
+            # read1：有多少收多少，不等滿一整塊，才能在第一段資料就提早拒絕
+            chunk = self.rfile.read1(min(BODY_CHUNK_BYTES, remaining))
+            if not chunk:
+                self.close_connection = True
+                self._send(400, b'{"error":"incomplete body"}')
+                return
+            remaining -= len(chunk)
+            self._bytes_in += len(chunk)
+            error = parser.feed(chunk)
+            if error is not None:
+                # 提早拒絕：剩餘 body 未讀取，連線不可續用
+                if remaining:
+                    self.close_connection = True
+                self._send(*error)
+                return
+        status, body = parser.finish()
+        self._send(status, body)
 
-        _append_log(data)
-        self._send(200, json.dumps({"ok": True, "source": source}).encode())
+    def _discard_body(self, length: int) -> bool:
+        """Read and drop a (size-checked) body so the connection can be reused."""
+        remaining = length
+        while remaining > 0:
+            chunk = self.rfile.read1(min(BODY_CHUNK_BYTES, remaining))
+            if not chunk:
+                self.close_connection = True
+                self._send(400, b'{"error":"incomplete body"}')
+                return False
+            remaining -= len(chunk)
+            self._bytes_in += len(chunk)
+        return True
 
     def log_message(self, fmt, *args):
         # Suppress default console output to keep the app clean
@@ -177,34 +1209,106 @@ class _Handler(BaseHTTPRequestHandler):
 # ─────────────────────────────────────────────────────────────────
 #  Server lifecycle
 # ─────────────────────────────────────────────────────────────────
-def start(port: int = DEFAULT_PORT):
-    """Start the local HTTP server in a background daemon thread."""
-    global _server_instance, _server_thread
+def start(port: int = DEFAULT_PORT, engine: str = DEFAULT_ENGINE):
+    """Start the local HTTP server in a background daemon thread.
 
-    if _server_instance is not None:
+    engine: "thread" (ThreadingHTTPServer) or "asyncio" (single event loop).
+    If another AI Monitor process already owns the port, attach to it as a
+    client (services.shared_ingest) and mirror its store instead.
+    """
+    global _ingest_client
+
+    if _server_instance is not None or _ingest_client is not None:
         return  # Already running
 
+    if engine not in ENGINES:
+        print(f"[AI Monitor 伺服器] 未知的引擎 {engine!r}，改用 {DEFAULT_ENGINE}")
+        engine = DEFAULT_ENGINE
+
+    # 重啟前的近期資料從 SQLite 補回環形緩衝區（背景執行，不延遲啟動）
+    threading.Thread(target=_preload_recent, args=(time.time() - BUFFER_PRELOAD_SEC,),
+                     daemon=True, name="ai-monitor-preload").start()
+
+    error = _bind(port, engine)
+    if error is None:
+        print(f"[AI Monitor 伺服器] 已在 http://localhost:{port} 啟動 ({engine})")
+        return
+
+    from . import shared_ingest
+    if shared_ingest.probe(port):
+        print(f"[AI Monitor 伺服器] port {port} 已由另一個 AI Monitor 使用，改為同步其資料")
+        _ingest_client = shared_ingest.IngestClient(port, engine)
+        _ingest_client.start()
+    else:
+        print(f"[AI Monitor 伺服器] 無法啟動 (port {port}): {error}")
+
+
+def _bind(port: int, engine: str) -> Optional[OSError]:
+    """Bind and serve on *port*. Returns the OSError if the port could not be bound."""
+    global _server_instance, _server_thread, _server_engine
     try:
-        server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
-        _server_instance = server
+        if engine == "asyncio":
+            from .async_server import AsyncIngestServer
+            server = AsyncIngestServer("127.0.0.1", port, idle_timeout=KEEPALIVE_IDLE_SEC)
+            server.start()
+            _server_instance = server
+            _server_thread = server.thread
+        else:
+            server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+            _server_instance = server
 
-        def _run():
-            server.serve_forever()
+            def _run():
+                server.serve_forever()
 
-        t = threading.Thread(target=_run, daemon=True, name="ai-monitor-server")
-        t.start()
-        _server_thread = t
-        print(f"[AI Monitor 伺服器] 已在 http://localhost:{port} 啟動")
+            t = threading.Thread(target=_run, daemon=True, name="ai-monitor-server")
+            t.start()
+            _server_thread = t
+        _server_engine = engine
+        return None
     except OSError as e:
-        print(f"[AI Monitor 伺服器] 無法啟動 (port {port}): {e}")
         _server_instance = None
+        return e
+
+
+def _take_over(port: int, engine: str) -> bool:
+    """Called by the ingest client when the owner went away: try to become the owner."""
+    global _ingest_client
+    if _bind(port, engine) is not None:
+        return False
+    _ingest_client = None
+    print(f"[AI Monitor 伺服器] 原主程式已結束，改由本程式在 http://localhost:{port} 接收 ({engine})")
+    return True
 
 
 def stop():
     """Stop the server gracefully."""
-    global _server_instance, _server_thread
+    global _server_instance, _server_thread, _server_engine, _ingest_client
+    client = _ingest_client
+    if client is not None:
+        _ingest_client = None
+        client.stop()
     if _server_instance:
-        _server_instance.shutdown()
+        server = _server_instance
         _server_instance = None
+        _server_engine = None
+        server.shutdown()
+        server.server_close()
         _server_thread = None
+        # 喚醒仍在等待的 /events 串流，讓它們結束
+        with _store_cond:
+            _store_cond.notify_all()
         print("[AI Monitor 伺服器] 已停止")
+    _journal.close()
+    _history.close()
+
+
+def set_log_path(path: str):
+    """Point the ingest journal and history database at another directory (benchmarks, tests, portable installs)."""
+    global _journal, _history, _LOG_PATH, _JOURNAL_PATH
+    _journal.close()
+    _history.close()
+    _LOG_PATH = path
+    _JOURNAL_PATH = path + "l"
+    _journal = IngestJournal(_LOG_PATH, _JOURNAL_PATH)
+    _history = HistoryStore(os.path.join(os.path.dirname(path), "data_history.db"),
+                            _history.raw_days, _history.hourly_days)
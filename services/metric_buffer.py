@@ -0,0 +1,227 @@
+"""
+近期額度數值的記憶體環形緩衝區
+
+趨勢與消耗速度需要最近幾天的數字常駐記憶體。每個 (source, metric) 一個
+RingBuffer，時間與數值各存在一個 array('d')（每筆 16 bytes，而非一整個
+payload dict）：
+
+- append() O(1)，容量固定，寫滿後覆蓋最舊的一筆
+- window() 以二分搜尋找出時間區間，再以 array 切片一次取出
+- stats() 的總和、極值、最小平方斜率都在切片上以內建函式（C 迴圈）計算
+
+local_server 在每筆變更寫入時由 QuotaRecord 餵入；啟動時 preload() 從
+history_store 補回重啟前的資料。
+
+    stats = local_server.get_buffers().stats("claude_usage", "weekly.percent", 6 * 3600)
+    stats.slope * 3600   # 每小時增加的百分比
+"""
+from __future__ import annotations
+
+import bisect
+import operator
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from itertools import repeat
+from typing import Optional
+
+from .history_store import HistoryStore, record_values
+from .quota_schema import QuotaRecord
+
+# 緩衝的來源（瀏覽器腳本送出的四種 payload）
+SOURCES = ("claude_usage", "github_copilot", "openai_billing", "claude_billing")
+
+# 每 30 秒一筆時約 3 天
+DEFAULT_CAPACITY = 8640
+
+
+@dataclass(frozen=True, slots=True)
+class WindowStats:
+    """Summary of the samples in one time window; slope is value units per second."""
+
+    count: int
+    first_ts: float
+    last_ts: float
+    first: float
+    last: float
+    min: float
+    max: float
+    mean: float
+    slope: Optional[float]       # 最小平方斜率；少於兩個時間點時為 None
+
+
+class RingBuffer:
+    """Fixed-capacity (timestamp, value) series in two array('d') rings."""
+
+    __slots__ = ("capacity", "_ts", "_values", "_start", "_count")
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._ts = array("d", bytes(8 * capacity))
+        self._values = array("d", bytes(8 * capacity))
+        self._start = 0          # 最舊一筆的實體位置
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, ts: float, value: float):
+        """Add a sample. Timestamps must not go backwards; an equal one replaces the last value."""
+        if self._count:
+            last = (self._start + self._count - 1) % self.capacity
+            if ts < self._ts[last]:
+                return
+            if ts == self._ts[last]:
+                self._values[last] = value
+                return
+        if self._count < self.capacity:
+            pos = (self._start + self._count) % self.capacity
+            self._count += 1
+        else:
+            pos = self._start
+            self._start = (self._start + 1) % self.capacity
+        self._ts[pos] = ts
+        self._values[pos] = value
+
+    def prepend(self, ts: list, values: list):
+        """Insert older samples (sorted by ts) ahead of the current ones, up to capacity."""
+        if not ts:
+            return
+        old_ts, old_values = self._linear(0, self._count)
+        keep = len(ts) if not self._count else bisect.bisect_left(ts, old_ts[0])
+        merged_ts = array("d", ts[:keep]) + old_ts
+        merged_values = array("d", values[:keep]) + old_values
+        n = min(len(merged_ts), self.capacity)
+        self._ts[:n] = merged_ts[-n:]
+        self._values[:n] = merged_values[-n:]
+        self._start = 0
+        self._count = n
+
+    def latest(self) -> Optional[tuple[float, float]]:
+        if not self._count:
+            return None
+        last = (self._start + self._count - 1) % self.capacity
+        return self._ts[last], self._values[last]
+
+    def window(self, start: float = float("-inf"),
+               end: float = float("inf")) -> tuple[array, array]:
+        """Copies of the timestamps and values with start <= ts <= end."""
+        lo = self._bisect(start, bisect.bisect_left)
+        hi = self._bisect(end, bisect.bisect_right)
+        return self._linear(lo, hi)
+
+    def stats(self, start: float = float("-inf"),
+              end: float = float("inf")) -> Optional[WindowStats]:
+        """Count / first / last / min / max / mean / slope over [start, end]; None if empty."""
+        ts, values = self.window(start, end)
+        n = len(ts)
+        if not n:
+            return None
+        total = sum(values)
+        mean = total / n
+        slope = None
+        if n >= 2 and ts[-1] > ts[0]:
+            # 以第一筆時間為原點，避免 epoch 平方造成的精度損失
+            x = array("d", map(operator.sub, ts, repeat(ts[0])))
+            sx = sum(x)
+            sxx = sum(map(operator.mul, x, x))
+            sxy = sum(map(operator.mul, x, values))
+            denom = n * sxx - sx * sx
+            if denom > 0:
+                slope = (n * sxy - sx * total) / denom
+        return WindowStats(n, ts[0], ts[-1], values[0], values[-1],
+                           min(values), max(values), mean, slope)
+
+    # ── 內部 ─────────────────────────────────────────────────────────
+
+    def _bisect(self, ts: float, func) -> int:
+        """Logical index for *ts* in the time-ordered ring (bisect over a wrapped array)."""
+        cap, start = self.capacity, self._start
+        tail = min(self._count, cap - start)        # 實體位置 start 之後的那一段
+        if self._count > tail and ts >= self._ts[0]:
+            return tail + func(self._ts, ts, 0, self._count - tail)
+        return func(self._ts, ts, start, start + tail) - start
+
+    def _linear(self, lo: int, hi: int) -> tuple[array, array]:
+        """Logical range [lo, hi) as contiguous arrays (at most two slices)."""
+        if hi <= lo:
+            return array("d"), array("d")
+        a, b = self._start + lo, self._start + hi
+        cap = self.capacity
+        if b <= cap:
+            return self._ts[a:b], self._values[a:b]
+        if a >= cap:
+            return self._ts[a - cap:b - cap], self._values[a - cap:b - cap]
+        return (self._ts[a:] + self._ts[:b - cap],
+                self._values[a:] + self._values[:b - cap])
+
+
+class MetricBuffers:
+    """RingBuffer per (source, metric), fed from QuotaRecords; safe to use from any thread."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, sources=SOURCES):
+        self.capacity = capacity
+        self.sources = frozenset(sources)
+        self._lock = threading.Lock()
+        self._buffers: dict[tuple[str, str], RingBuffer] = {}
+
+    def add_record(self, record: QuotaRecord):
+        if record.source not in self.sources:
+            return
+        values = record_values(record)
+        with self._lock:
+            for metric, value in values.items():
+                self._buffer(record.source, metric).append(record.received_ts, value)
+
+    def metrics(self) -> list[tuple[str, str]]:
+        with self._lock:
+            return sorted(self._buffers)
+
+    def window(self, source: str, metric: str, seconds: float,
+               now: Optional[float] = None) -> tuple[array, array]:
+        """Samples from the last *seconds* (relative to *now*)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            buf = self._buffers.get((source, metric))
+            return buf.window(now - seconds, now) if buf else (array("d"), array("d"))
+
+    def stats(self, source: str, metric: str, seconds: float,
+              now: Optional[float] = None) -> Optional[WindowStats]:
+        """WindowStats over the last *seconds*, or None without samples."""
+        now = time.time() if now is None else now
+        with self._lock:
+            buf = self._buffers.get((source, metric))
+            return buf.stats(now - seconds, now) if buf else None
+
+    def latest(self, source: str, metric: str) -> Optional[tuple[float, float]]:
+        with self._lock:
+            buf = self._buffers.get((source, metric))
+            return buf.latest() if buf else None
+
+    def memory_bytes(self) -> int:
+        with self._lock:
+            return sum(16 * b.capacity for b in self._buffers.values())
+
+    def preload(self, history: HistoryStore, since: float):
+        """Fill the buffers from *history* (samples newer than *since*) after a restart."""
+        try:
+            series = [(s, m) for s, m in history.series() if s in self.sources]
+            for source, metric in series:
+                points = history.query(source, metric, since)
+                if not points:
+                    continue
+                ts = [p[0] for p in points]
+                values = [p[1] for p in points]
+                with self._lock:
+                    self._buffer(source, metric).prepend(ts, values)
+        except Exception as e:
+            print(f"[AI Monitor] 載入近期歷史失敗: {e}")
+
+    def _buffer(self, source: str, metric: str) -> RingBuffer:
+        # 呼叫者需持有 self._lock
+        key = (source, metric)
+        buf = self._buffers.get(key)
+        if buf is None:
+            buf = self._buffers[key] = RingBuffer(self.capacity)
+        return buf
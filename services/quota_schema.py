@@ -0,0 +1,337 @@
+"""
+瀏覽器 payload 正規化 — 在 /update 接受資料時轉成型別固定的額度記錄
+
+各頁面的 transformer 送出的欄位鬆散（數字可能是字串、重置時間是
+"3 hrs 12 mins" / "November 1" / "2026/11/1" 等文字）。local_server 在
+寫入資料快照時呼叫一次 normalize()，之後的卡片、歷史與預測都只讀
+QuotaRecord 已算好的欄位，不再各自解析：
+
+- QuotaMetric：一個額度條（已用量、上限、百分比、單位、重置時間 epoch）
+- QuotaRecord.amounts：金額欄位（USD）
+- QuotaRecord.errors：驗證問題（型別錯誤、超出範圍、缺欄位而套用預設值）
+
+    record = normalize("claude_usage", payload)
+    record.metric("weekly").percent, record.metric("weekly").reset_at
+"""
+from __future__ import annotations
+
+import math
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+# GitHub Copilot 頁面未提供總次數時的預設 premium requests 數量
+COPILOT_DEFAULT_INCLUDED = 1500.0
+# 最遠接受的重置時間（天）；超過視為無效資料，避免日期運算溢位
+MAX_RESET_DAYS = 400
+
+
+@dataclass(frozen=True, slots=True)
+class QuotaMetric:
+    """One quota bar; unit is "percent", "requests" or "usd"."""
+
+    name: str
+    unit: str
+    used: Optional[float] = None
+    limit: Optional[float] = None
+    percent: Optional[float] = None
+    reset_at: Optional[float] = None     # epoch 秒
+    reset_text: str = ""                 # 頁面原始文字，供顯示
+
+
+@dataclass(frozen=True, slots=True)
+class QuotaRecord:
+    """Normalized view of one accepted payload."""
+
+    source: str
+    received_ts: float
+    metrics: tuple[QuotaMetric, ...] = ()
+    amounts: Mapping[str, float] = field(default_factory=dict)
+    errors: tuple[str, ...] = ()
+
+    def metric(self, name: str) -> Optional[QuotaMetric]:
+        for m in self.metrics:
+            if m.name == name:
+                return m
+        return None
+
+    def amount(self, key: str) -> Optional[float]:
+        return self.amounts.get(key)
+
+
+# ─────────────────────────────────────────────────────────────────
+#  欄位轉換
+# ─────────────────────────────────────────────────────────────────
+
+def _number(data: Mapping, key: str, errors: list) -> Optional[float]:
+    """Finite float from a number or numeric string ("$1,234.5"); None if absent or invalid."""
+    value = data.get(key)
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        errors.append(f"{key}: expected a number, got {value!r}")
+        return None
+    if isinstance(value, (int, float)):
+        number = float(value)
+    elif isinstance(value, str):
+        try:
+            number = float(value.replace("$", "").replace(",", "").strip())
+        except ValueError:
+            errors.append(f"{key}: not a number: {value!r}")
+            return None
+    else:
+        errors.append(f"{key}: expected a number, got {type(value).__name__}")
+        return None
+    if not math.isfinite(number):
+        errors.append(f"{key}: not finite")
+        return None
+    return number
+
+
+def _percent(data: Mapping, key: str, errors: list) -> Optional[float]:
+    pct = _number(data, key, errors)
+    if pct is not None and pct < 0:
+        errors.append(f"{key}: negative percent {pct:g}, using 0")
+        pct = 0.0
+    return pct
+
+
+def _ratio(used: Optional[float], limit: Optional[float]) -> Optional[float]:
+    if used is None or not limit or limit <= 0:
+        return None
+    return round(used / limit * 100, 1)
+
+
+def _text(data: Mapping, key: str) -> str:
+    value = data.get(key)
+    return value.strip() if isinstance(value, str) else ""
+
+
+# ─────────────────────────────────────────────────────────────────
+#  重置時間解析
+# ─────────────────────────────────────────────────────────────────
+
+_MONTHS = {m: i for i, m in enumerate(
+    ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), 1)}
+
+_YMD_RE = re.compile(r"(\d{4})[/\-.](\d{1,2})[/\-.](\d{1,2})")
+_MONTH_DAY_RE = re.compile(r"\b([A-Za-z]{3,9})\.?\s+(\d{1,2})(?:st|nd|rd|th)?(?:,?\s+(\d{4}))?")
+_RELATIVE_RE = re.compile(
+    r"(\d+(?:\.\d+)?)\s*(days?|d|hours?|hrs?|h|minutes?|mins?|m|天|小時|分鐘|分)(?![a-z])",
+    re.IGNORECASE)
+_UNIT_SECONDS = {"d": 86400, "天": 86400, "h": 3600, "小": 3600, "m": 60, "分": 60}
+
+
+def _local_midnight(year: int, month: int, day: int) -> Optional[float]:
+    try:
+        return datetime(year, month, day).timestamp()
+    except (ValueError, OverflowError, OSError):
+        return None
+
+
+def parse_reset(text: str, now: float) -> Optional[float]:
+    """Epoch of a reset given as page text, relative to *now*.
+
+    Handles "3 hrs 12 mins" / "4 days 6 hrs" / "2 天 3 小時" (relative),
+    "November 1" / "Nov 1, 2026" (next occurrence when no year),
+    "2026/11/1" and ISO dates. Returns None if nothing matches or the reset
+    is more than MAX_RESET_DAYS away.
+    """
+    ts = _parse_reset_text(text.strip(), now)
+    if ts is None or ts - now > MAX_RESET_DAYS * 86400:
+        return None
+    return ts
+
+
+def _parse_reset_text(text: str, now: float) -> Optional[float]:
+    if not text:
+        return None
+
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except (ValueError, OverflowError, OSError):
+        pass
+
+    m = _YMD_RE.search(text)
+    if m:
+        return _local_midnight(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+
+    for m in _MONTH_DAY_RE.finditer(text):
+        if m.group(1)[:3].lower() not in _MONTHS:
+            continue
+        month, day = _MONTHS[m.group(1)[:3].lower()], int(m.group(2))
+        if m.group(3):
+            return _local_midnight(int(m.group(3)), month, day)
+        today = datetime.fromtimestamp(now)
+        ts = _local_midnight(today.year, month, day)
+        if ts is not None and ts < now - 86400:
+            ts = _local_midnight(today.year + 1, month, day)
+        return ts
+
+    seconds = 0.0
+    matched = False
+    for amount, unit in _RELATIVE_RE.findall(text):
+        seconds += float(amount) * _UNIT_SECONDS[unit[0].lower()]
+        matched = True
+    return now + seconds if matched else None
+
+
+def reset_granularity(text: str) -> float:
+    """Resolution in seconds of a reset text understood by parse_reset(); 0 if exact or unknown.
+
+    Relative text is truncated to its smallest unit ("4 days 6 hrs" is
+    anywhere up to an hour later than parsed) and dates resolve to the day.
+    """
+    text = text.strip()
+    if not text:
+        return 0.0
+    try:
+        datetime.fromisoformat(text)
+        return 0.0 if ":" in text else 86400.0
+    except ValueError:
+        pass
+    if _YMD_RE.search(text) or any(m.group(1)[:3].lower() in _MONTHS
+                                   for m in _MONTH_DAY_RE.finditer(text)):
+        return 86400.0
+    units = [_UNIT_SECONDS[unit[0].lower()] for _, unit in _RELATIVE_RE.findall(text)]
+    return float(min(units)) if units else 0.0
+
+
+def _reset(text: str, now: float, key: str, errors: list) -> Optional[float]:
+    if not text:
+        return None
+    ts = parse_reset(text, now)
+    if ts is None:
+        errors.append(f"{key}: unrecognized reset {text!r}")
+    return ts
+
+
+def _days_from_now(days: float, now: float) -> Optional[float]:
+    """Local midnight *days* calendar days after *now* (how resets_in_days counts); None if out of range."""
+    try:
+        day = datetime.fromtimestamp(now).replace(hour=0, minute=0, second=0, microsecond=0)
+        return (day + timedelta(days=math.ceil(days))).timestamp()
+    except (ValueError, OverflowError, OSError):
+        return None
+
+
+# ─────────────────────────────────────────────────────────────────
+#  各來源
+# ─────────────────────────────────────────────────────────────────
+
+def _amounts(data: Mapping, keys: tuple, errors: list) -> dict:
+    out = {}
+    for key in keys:
+        value = _number(data, key, errors)
+        if value is not None:
+            out[key] = value
+    return out
+
+
+def _claude_usage(data: Mapping, now: float, errors: list):
+    metrics = []
+    for name in ("session", "weekly"):
+        pct = _percent(data, f"{name}_percent", errors)
+        if pct is None:
+            continue
+        text = _text(data, f"{name}_reset")
+        metrics.append(QuotaMetric(name, "percent", used=pct, limit=100.0, percent=pct,
+                                   reset_at=_reset(text, now, f"{name}_reset", errors),
+                                   reset_text=text))
+
+    amounts = _amounts(data, ("extra_spent", "extra_limit", "extra_balance"), errors)
+    if data.get("extra_enabled") or "extra_spent" in amounts or "extra_balance" in amounts:
+        spent, limit = amounts.get("extra_spent"), amounts.get("extra_limit")
+        pct = _percent(data, "extra_percent", errors)
+        if pct is None:
+            pct = _ratio(spent, limit) or 0.0
+        text = _text(data, "extra_resets")
+        metrics.append(QuotaMetric("extra", "usd", used=spent, limit=limit, percent=pct,
+                                   reset_at=_reset(text, now, "extra_resets", errors),
+                                   reset_text=text))
+    return metrics, amounts
+
+
+def _github_copilot(data: Mapping, now: float, errors: list):
+    amounts = _amounts(data, ("billed_usd",), errors)
+    used = _number(data, "included_consumed", errors)
+    limit = _number(data, "included_total", errors)
+    pct = _percent(data, "included_percent", errors)
+    if used is None and pct is None:
+        return [], amounts
+
+    if not limit:
+        errors.append(f"included_total: missing, assuming {COPILOT_DEFAULT_INCLUDED:g}")
+        limit = COPILOT_DEFAULT_INCLUDED
+    if pct is None:
+        pct = _ratio(used, limit)
+    if used is None:
+        used = round(pct / 100 * limit, 1)
+
+    text = _text(data, "next_billing")
+    reset_at = parse_reset(text, now) if text else None
+    days = _number(data, "resets_in_days", errors)
+    if days is not None and not 0 <= days <= MAX_RESET_DAYS:
+        errors.append(f"resets_in_days: out of range (0..{MAX_RESET_DAYS})")
+        days = None
+    if reset_at is None and days is not None:
+        reset_at = _days_from_now(days, now)
+        if reset_at is not None:
+            text = text or f"{days:g} 天後"
+    elif reset_at is None and text:
+        errors.append(f"next_billing: unrecognized reset {text!r}")
+    return [QuotaMetric("premium_requests", "requests", used=used, limit=limit, percent=pct,
+                        reset_at=reset_at, reset_text=text)], amounts
+
+
+def _openai_billing(data: Mapping, now: float, errors: list):
+    amounts = _amounts(data, ("balance_usd", "credits_total_usd", "credits_used_usd",
+                              "hard_limit_usd", "soft_limit_usd", "month_usage_usd"), errors)
+    used, total = amounts.get("credits_used_usd"), amounts.get("credits_total_usd")
+    if used is None or total is None:
+        return [], amounts
+    return [QuotaMetric("credits", "usd", used=used, limit=total,
+                        percent=_ratio(used, total) or 0.0)], amounts
+
+
+def _claude_billing(data: Mapping, now: float, errors: list):
+    amounts = _amounts(data, ("balance_usd", "this_month_usd", "spend_limit_usd",
+                              "monthly_usd"), errors)
+    spent = amounts.get("this_month_usd")
+    if spent is None:
+        return [], amounts
+    limit = amounts.get("spend_limit_usd")
+    text = _text(data, "next_billing")
+    return [QuotaMetric("spend", "usd", used=spent, limit=limit, percent=_ratio(spent, limit),
+                        reset_at=_reset(text, now, "next_billing", errors),
+                        reset_text=text)], amounts
+
+
+_NORMALIZERS = {
+    "claude_usage": _claude_usage,
+    "github_copilot": _github_copilot,
+    "openai_billing": _openai_billing,
+    "claude_billing": _claude_billing,
+}
+
+
+def normalize(source: str, data: Mapping, now: Optional[float] = None) -> QuotaRecord:
+    """Build the QuotaRecord for one payload. Never raises; problems go to .errors."""
+    errors: list[str] = []
+    received_ts = None
+    received = data.get("received_at")
+    if isinstance(received, str) and received:
+        try:
+            received_ts = datetime.fromisoformat(received).timestamp()
+        except (ValueError, OverflowError, OSError):
+            errors.append(f"received_at: invalid timestamp {received!r}")
+    if received_ts is None:
+        received_ts = now if now is not None else time.time()
+
+    normalizer = _NORMALIZERS.get(source)
+    metrics, amounts = normalizer(data, received_ts, errors) if normalizer else ([], {})
+    return QuotaRecord(source, received_ts, tuple(metrics), MappingProxyType(amounts),
+                       tuple(errors))
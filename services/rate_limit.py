@@ -0,0 +1,126 @@
+"""
+/update 的 token-bucket 流量限制（admission control）
+
+失控的分頁（SPA 重新載入迴圈、攔截器比對錯誤）可能大量送出 /update。
+在讀取與解析 body 之前先檢查：
+
+- 每個 source 一個 bucket（rate 個/秒，最多累積 burst 個）
+- 全域一個 bucket，限制所有來源的總和
+- 超過時回傳 429 + Retry-After，並累計丟棄次數供 /debug/stats 查詢
+
+rate <= 0 代表不限制。
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from typing import Optional
+
+# 未帶來源提示的請求共用此 bucket
+UNKNOWN_SOURCE = "(unknown)"
+# bucket 數量達上限後，新的來源名稱共用此 bucket
+OTHER_SOURCE = "(other)"
+
+
+class TokenBucket:
+    """Classic token bucket; not thread-safe on its own (AdmissionControl holds the lock)."""
+
+    __slots__ = ("rate", "burst", "tokens", "stamp")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.stamp = now
+
+    def refill(self, now: float):
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def wait_time(self) -> float:
+        """Seconds until one token is available (0 if available now)."""
+        if self.rate <= 0 or self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionControl:
+    """Per-source and global token buckets with drop counters."""
+
+    def __init__(self, per_source_rate: float = 2.0, per_source_burst: float = 20,
+                 global_rate: float = 20.0, global_burst: float = 100,
+                 max_sources: int = 32):
+        self._lock = threading.Lock()
+        self._clock = time.monotonic
+        self.max_sources = max_sources
+        self.configure(per_source_rate, per_source_burst, global_rate, global_burst)
+
+    def configure(self, per_source_rate: float, per_source_burst: float,
+                  global_rate: float, global_burst: float):
+        """Replace the limits; existing buckets and counters are reset."""
+        now = self._clock()
+        with self._lock:
+            self.per_source_rate = float(per_source_rate)
+            self.per_source_burst = float(per_source_burst)
+            self.global_rate = float(global_rate)
+            self.global_burst = float(global_burst)
+            self._global = TokenBucket(self.global_rate, self.global_burst, now)
+            self._buckets: dict[str, TokenBucket] = {}
+            self._admitted = 0
+            self._dropped_global = 0
+            self._dropped: dict[str, int] = {}
+
+    def admit(self, source: Optional[str]) -> float:
+        """Take one token for *source*. Returns 0 if admitted, else Retry-After seconds."""
+        key = source or UNKNOWN_SOURCE
+        now = self._clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_sources:
+                    key = OTHER_SOURCE
+                    bucket = self._buckets.get(key)
+                if bucket is None:
+                    bucket = self._buckets[key] = TokenBucket(
+                        self.per_source_rate, self.per_source_burst, now)
+
+            bucket.refill(now)
+            self._global.refill(now)
+            src_wait = bucket.wait_time()
+            glb_wait = self._global.wait_time()
+            if src_wait or glb_wait:
+                # 兩個 bucket 都有 token 才放行，避免只扣掉其中一個
+                if glb_wait >= src_wait:
+                    self._dropped_global += 1
+                else:
+                    self._dropped[key] = self._dropped.get(key, 0) + 1
+                return max(src_wait, glb_wait)
+
+            if bucket.rate > 0:
+                bucket.tokens -= 1
+            if self._global.rate > 0:
+                self._global.tokens -= 1
+            self._admitted += 1
+            return 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "limits": {
+                    "per_source_rate": self.per_source_rate,
+                    "per_source_burst": self.per_source_burst,
+                    "global_rate": self.global_rate,
+                    "global_burst": self.global_burst,
+                },
+                "admitted": self._admitted,
+                "dropped_global": self._dropped_global,
+                "dropped_per_source": dict(self._dropped),
+                "dropped_total": self._dropped_global + sum(self._dropped.values()),
+            }
+
+
+def retry_after_header(seconds: float) -> str:
+    """Retry-After takes whole seconds; round up so clients never retry too early."""
+    return str(max(1, math.ceil(seconds)))
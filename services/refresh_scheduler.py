@@ -0,0 +1,188 @@
+"""
+依重置時間排程的自動重新整理
+
+取代固定每 auto_refresh_minutes 分鐘重新整理一次的計時器：
+
+- 每筆 QuotaRecord 的重置時間（session / weekly / extra、Copilot 計費週期、
+  Claude API 下次計費）放進 min-heap，最早的重置一過（加上 RESET_GRACE_SEC）
+  立即重新擷取，新週期的數字不必等到下一輪
+- 重置文字只精確到小時或日（"4 days 6 hrs"、"November 1"）時排在估計值再加
+  一個單位，避免在真正重置前就重新擷取
+- 兩次重置之間以退避間隔輪詢：從 MIN_INTERVAL_SEC 開始，每次加倍，
+  上限為設定的 auto_refresh_minutes；重置觸發後回到最短間隔
+- 到期時呼叫 local_server.request_refresh()（附掛的程式不重複通知，由擁有者負責），
+  再呼叫 add_listener() 註冊的回呼，讓 GUI 重新查詢 API 服務
+
+排程在單一背景執行緒（ai-monitor-scheduler）等待；回呼在該執行緒執行，
+Tk 程式需自行以 after() 轉回主執行緒。
+
+    refresh_scheduler.scheduler.configure(config["auto_refresh_minutes"])
+    refresh_scheduler.scheduler.add_listener(on_due)     # on_due(reason)
+    refresh_scheduler.scheduler.start()
+"""
+from __future__ import annotations
+
+import heapq
+import threading
+import time
+from typing import Callable, Optional
+
+from . import local_server
+from .event_bus import bus as event_bus
+from .quota_schema import QuotaRecord, reset_granularity
+
+# 重置後等待頁面反映新數字的秒數
+RESET_GRACE_SEC = 60.0
+# 兩次重置之間的最短輪詢間隔
+MIN_INTERVAL_SEC = 5 * 60.0
+# 同一個重置時間的變動小於此秒數時不重新排入（相對時間文字每次解析會差幾秒）；
+# 只精確到小時或日的文字改以該單位為容許誤差
+RESET_JITTER_SEC = 60.0
+# 最長等待時間；電腦休眠或系統時間調整後可及時重新計算
+MAX_SLEEP_SEC = 60.0
+
+Listener = Callable[[str], None]
+
+
+class RefreshScheduler:
+    """Min-heap of upcoming resets plus an exponential idle backoff."""
+
+    def __init__(self, max_interval: float = 30 * 60.0):
+        self.max_interval = max_interval
+        self.min_interval = min(MIN_INTERVAL_SEC, max_interval)
+
+        self._cond = threading.Condition()
+        self._heap: list[tuple[float, tuple[str, str]]] = []   # (reset_at, (source, metric))
+        self._resets: dict[tuple[str, str], float] = {}       # 每個額度目前有效的重置時間
+        self._interval = self.min_interval
+        self._last_refresh = time.time()
+        self._listeners: tuple[Listener, ...] = ()
+        self._thread: Optional[threading.Thread] = None
+        self._sub = None
+
+    # ── 設定與回呼 ───────────────────────────────────────────────────
+
+    def configure(self, max_minutes: float):
+        """Longest gap between refreshes (the old fixed auto_refresh_minutes)."""
+        with self._cond:
+            self.max_interval = max(60.0, float(max_minutes) * 60)
+            self.min_interval = min(MIN_INTERVAL_SEC, self.max_interval)
+            self._interval = min(max(self._interval, self.min_interval), self.max_interval)
+            self._cond.notify_all()
+
+    def add_listener(self, listener: Listener):
+        with self._cond:
+            self._listeners = self._listeners + (listener,)
+
+    def remove_listener(self, listener: Listener):
+        with self._cond:
+            self._listeners = tuple(fn for fn in self._listeners if fn != listener)
+
+    def start(self):
+        """Seed from the current store, follow the event bus and start the timer thread."""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True,
+                                            name="ai-monitor-scheduler")
+        for record in local_server.get_snapshot().records.values():
+            self.note_record(record)
+        self._sub = event_bus.subscribe(None, self._on_update)
+        self._thread.start()
+
+    # ── 資料來源 ─────────────────────────────────────────────────────
+
+    def note_record(self, record: QuotaRecord, now: Optional[float] = None):
+        """Queue the future reset instants of *record*."""
+        now = time.time() if now is None else now
+        with self._cond:
+            earliest = self._heap[0][0] if self._heap else None
+            for m in record.metrics:
+                if m.reset_at is None or m.reset_at <= now:
+                    continue
+                key = (record.source, m.name)
+                reset_at, jitter = m.reset_at, RESET_JITTER_SEC
+                unit = reset_granularity(m.reset_text)
+                if unit > RESET_JITTER_SEC:
+                    # "4 days 6 hrs" 是無條件捨去的結果，實際重置最晚在一個單位後
+                    reset_at += unit
+                    jitter = unit
+                current = self._resets.get(key)
+                if current is not None and abs(current - reset_at) < jitter:
+                    continue
+                self._resets[key] = reset_at
+                heapq.heappush(self._heap, (reset_at, key))
+            if len(self._heap) > 4 * len(self._resets) + 16:
+                # 過期的項目只在彈出時略過；累積太多時重建
+                self._heap = [(ts, key) for key, ts in self._resets.items()]
+                heapq.heapify(self._heap)
+            if self._heap and (earliest is None or self._heap[0][0] < earliest):
+                self._cond.notify_all()
+
+    def note_refresh(self, now: Optional[float] = None):
+        """A manual refresh happened; restart the idle timer without changing the backoff."""
+        with self._cond:
+            self._last_refresh = time.time() if now is None else now
+            self._cond.notify_all()
+
+    def next_due(self) -> tuple[float, str]:
+        """(epoch, reason) of the next refresh; reason is "reset" or "backoff"."""
+        with self._cond:
+            return self._next_due()
+
+    def upcoming_resets(self) -> list[tuple[float, str, str]]:
+        """Known future resets as (reset_at, source, metric), earliest first."""
+        with self._cond:
+            return sorted((ts, src, name) for (src, name), ts in self._resets.items())
+
+    # ── 內部 ─────────────────────────────────────────────────────────
+
+    def _on_update(self, source: str, payload):
+        record = local_server.get_record(source) if payload is not None else None
+        if record is not None:
+            self.note_record(record)
+
+    def _next_due(self) -> tuple[float, str]:
+        # 呼叫者需持有 self._cond
+        heap = self._heap
+        while heap and self._resets.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)    # 已被較新的重置時間取代
+        backoff = self._last_refresh + self._interval
+        if heap and heap[0][0] + RESET_GRACE_SEC <= backoff:
+            return heap[0][0] + RESET_GRACE_SEC, "reset"
+        return backoff, "backoff"
+
+    def _mark_refreshed(self, now: float, reason: str):
+        # 呼叫者需持有 self._cond
+        if reason == "reset":
+            while self._heap and self._heap[0][0] + RESET_GRACE_SEC <= now:
+                ts, key = heapq.heappop(self._heap)
+                if self._resets.get(key) == ts:
+                    del self._resets[key]
+            self._interval = self.min_interval
+        else:
+            self._interval = min(self._interval * 2, self.max_interval)
+        self._last_refresh = now
+
+    def _run(self):
+        while True:
+            with self._cond:
+                now = time.time()
+                due, reason = self._next_due()
+                if due > now:
+                    self._cond.wait(min(due - now, MAX_SLEEP_SEC))
+                    continue
+                self._mark_refreshed(now, reason)
+                listeners = self._listeners
+
+            if not local_server.is_attached():
+                local_server.request_refresh()
+            for listener in listeners:
+                try:
+                    listener(reason)
+                except Exception as e:
+                    print(f"[AI Monitor] 排程重新整理失敗: {e}")
+
+
+# 全程式共用的排程器；MainApp / 桌面小工具啟動時 configure() + start()
+scheduler = RefreshScheduler()
@@ -0,0 +1,156 @@
+"""
+本地伺服器的效能計數器 — 由 GET /debug/stats 以 JSON 輸出
+
+記錄端只做整數累加（固定的 2 的次方延遲分桶），百分位數等彙整
+只在讀取 snapshot() 時計算，沒有人查詢時額外成本可忽略。
+
+- 每個路由：請求數、狀態碼分佈、body bytes in/out、延遲分佈
+- 階段延遲：store lock 等待、body 解析、journal 佇列與寫入（含 fsync）
+- 連線：目前開啟中與累計連線數
+"""
+from __future__ import annotations
+
+import threading
+import time
+
+# 延遲分桶：第 i 桶為 [2^(i-1), 2^i) 微秒，最後一桶收其餘（約 8.4 秒以上）
+_BUCKETS = 24
+
+
+class Histogram:
+    """Fixed log2 latency histogram (microsecond resolution)."""
+
+    __slots__ = ("_lock", "_counts", "_sum", "_max")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = [0] * (_BUCKETS + 1)
+        self._sum = 0.0
+        self._max = 0.0
+
+    def record(self, seconds: float):
+        us = int(seconds * 1e6)
+        idx = min(us.bit_length(), _BUCKETS)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += seconds
+            if seconds > self._max:
+                self._max = seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self._counts)
+            total, peak = self._sum, self._max
+        n = sum(counts)
+        out = {
+            "count": n,
+            "mean_ms": round(total / n * 1000, 3) if n else 0.0,
+            "max_ms": round(peak * 1000, 3),
+        }
+        for p in (50, 90, 99):
+            out[f"p{p}_ms"] = _percentile_ms(counts, n, p)
+        # 只列出有資料的桶，鍵為該桶上限（微秒）
+        out["buckets_us"] = {f"<{1 << i}": c for i, c in enumerate(counts) if c}
+        return out
+
+
+def _percentile_ms(counts: list[int], n: int, p: int) -> float:
+    """Upper bound of the bucket holding the p-th percentile."""
+    if not n:
+        return 0.0
+    target = n * p / 100
+    seen = 0
+    for i, c in enumerate(counts):
+        seen += c
+        if seen >= target:
+            return round((1 << i) / 1000, 3)
+    return round((1 << _BUCKETS) / 1000, 3)
+
+
+class RouteStats:
+    """Counters for one "METHOD /route" key."""
+
+    __slots__ = ("_lock", "requests", "bytes_in", "bytes_out", "status", "latency")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.status: dict[int, int] = {}
+        self.latency = Histogram()
+
+    def record(self, status: int, bytes_in: int, bytes_out: int, seconds: float):
+        with self._lock:
+            self.requests += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.status[status] = self.status.get(status, 0) + 1
+        self.latency.record(seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = {
+                "requests": self.requests,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "status": {str(k): v for k, v in sorted(self.status.items())},
+            }
+        out["latency"] = self.latency.snapshot()
+        return out
+
+
+# 統計用的路由名稱；其他路徑歸入 "other"，避免任意 URL 產生無限多的鍵
+KNOWN_ROUTES = ("/update", "/refresh", "/status", "/poll", "/events", "/health", "/history",
+                "/debug/stats", "/")
+
+
+class ServerStats:
+    """Per-route counters, stage histograms and connection gauges for one process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._routes: dict[str, RouteStats] = {}
+        self.active_connections = 0
+        self.total_connections = 0
+        self.lock_wait = Histogram()      # 等待 _store_lock
+        self.parse = Histogram()          # /update body 解碼與 JSON 解析
+        self.journal_append = Histogram() # 送入 journal 佇列（呼叫端）
+
+    def route(self, method: str, path: str) -> RouteStats:
+        route = path.split("?", 1)[0]
+        key = f"{method} {route if route in KNOWN_ROUTES else 'other'}"
+        stats = self._routes.get(key)
+        if stats is None:
+            with self._lock:
+                stats = self._routes.setdefault(key, RouteStats())
+        return stats
+
+    def record_request(self, method: str, path: str, status: int,
+                       bytes_in: int, bytes_out: int, seconds: float):
+        self.route(method, path).record(status, bytes_in, bytes_out, seconds)
+
+    def connection_opened(self):
+        with self._lock:
+            self.active_connections += 1
+            self.total_connections += 1
+
+    def connection_closed(self):
+        with self._lock:
+            self.active_connections -= 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            routes = dict(self._routes)
+            conns = {"active": self.active_connections, "total": self.total_connections}
+        return {
+            "uptime_s": round(time.time() - self._started, 1),
+            "connections": conns,
+            "stages": {
+                "lock_wait": self.lock_wait.snapshot(),
+                "parse": self.parse.snapshot(),
+                "journal_append": self.journal_append.snapshot(),
+            },
+            "routes": {k: routes[k].snapshot() for k in sorted(routes)},
+        }
@@ -0,0 +1,189 @@
+"""
+共用資料接收 — 第二個程式以用戶端身分連到已在執行的本地伺服器
+
+main.py 與 widget_main.py 都會呼叫 local_server.start(port)。後啟動的程式
+綁定 port 失敗時，若確認對方是本程式的伺服器（GET /health），改由
+IngestClient 同步對方的資料：
+
+- 先 GET /status 取得全量資料，再以 Last-Event-ID 訂閱 /events
+- 收到的 update / remove 事件寫入本程式的資料快照並發布到 event_bus，
+  GUI 與小工具不需區分資料是自己收到的還是同步來的；seen 事件同步各來源
+  最後收到的時間（含內容未變的重送），過期判斷與擁有者一致
+- request_refresh() 透過 POST /refresh 轉給擁有者，由它通知瀏覽器腳本
+- 擁有者結束（串流中斷）時嘗試接手綁定 port，成為新的擁有者；
+  port 仍被占用則稍後重新連線
+
+如此只有一條接收管線（限流、去重、journal 都在擁有者），可供任意數量的畫面使用。
+"""
+from __future__ import annotations
+
+import http.client
+import threading
+from typing import Optional
+
+from . import json_codec
+from . import local_server as ls
+
+# /events 每 SSE_HEARTBEAT_SEC 秒至少有一個 ping；超過此秒數沒有資料視為斷線
+STREAM_TIMEOUT_SEC = ls.SSE_HEARTBEAT_SEC * 3
+RECONNECT_MAX_SEC = 5.0
+
+
+def probe(port: int, timeout: float = 1.0) -> bool:
+    """True if an AI Monitor server answers /health on 127.0.0.1:port."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        conn.request("GET", "/health")
+        resp = conn.getresponse()
+        body = json_codec.loads(resp.read() or b"{}")
+        return resp.status == 200 and body.get("app") == ls.APP_ID
+    except (OSError, http.client.HTTPException, ValueError, AttributeError):
+        return False
+    finally:
+        conn.close()
+
+
+def forward_refresh(port: int, timeout: float = 2.0) -> bool:
+    """Ask the owning process to bump its refresh seq (POST /refresh)."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        conn.request("POST", "/refresh", b"", {"Content-Length": "0"})
+        resp = conn.getresponse()
+        resp.read()
+        return resp.status == 200
+    except (OSError, http.client.HTTPException):
+        return False
+    finally:
+        conn.close()
+
+
+class IngestClient:
+    """Mirror another process's store through /status + /events into this process."""
+
+    def __init__(self, port: int, engine: str = ls.DEFAULT_ENGINE):
+        self.port = port
+        self.engine = engine
+        self.thread: Optional[threading.Thread] = None
+        self.connected = False
+        self._stop = threading.Event()
+        self._conn: Optional[http.client.HTTPConnection] = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True, name="ai-monitor-ingest-client")
+        self.thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self._stop.set()
+        conn = self._conn
+        if conn is not None and conn.sock is not None:
+            # 讓阻塞中的 readline 立即返回
+            try:
+                conn.sock.shutdown(2)
+            except OSError:
+                pass
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+    def request_refresh(self):
+        """Forward a refresh request without blocking the caller (often the Tk thread)."""
+        threading.Thread(target=forward_refresh, args=(self.port,), daemon=True).start()
+
+    # ── 背景同步 ─────────────────────────────────────────────────────
+
+    def _run(self):
+        delay = 0.5
+        while not self._stop.is_set():
+            try:
+                self._sync()
+                delay = 0.5
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                if self.connected:
+                    print(f"[AI Monitor 伺服器] 與主程式的同步中斷: {e}")
+            finally:
+                self.connected = False
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+            if self._stop.is_set():
+                break
+            # 擁有者可能已結束：嘗試接手 port
+            if ls._take_over(self.port, self.engine):
+                return
+            self._stop.wait(delay)
+            delay = min(delay * 2, RECONNECT_MAX_SEC)
+
+    def _sync(self):
+        """Full load + event stream; loops on `reset`, returns when the stream ends."""
+        while not self._stop.is_set():
+            conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=STREAM_TIMEOUT_SEC)
+            self._conn = conn
+            version = self._load_full(conn)
+            conn.request("GET", "/events", headers={"Last-Event-ID": str(version)})
+            resp = conn.getresponse()
+            if resp.status != 200:
+                raise ValueError(f"/events returned {resp.status}")
+            if not self.connected:
+                self.connected = True
+                print(f"[AI Monitor 伺服器] 已連線至 port {self.port} 的主程式，同步瀏覽器資料")
+            if not self._read_stream(resp):
+                return
+            conn.close()   # 落後太多（reset）：重新取得全量資料
+
+    def _read_stream(self, resp: http.client.HTTPResponse) -> bool:
+        """Apply SSE events until the stream ends (False) or a reset is received (True)."""
+        event, data = "message", []
+        while not self._stop.is_set():
+            line = resp.readline()
+            if not line:
+                return False   # 擁有者關閉串流
+            line = line.rstrip(b"\r\n")
+            if not line:
+                if data and self._dispatch(event, b"\n".join(data)):
+                    return True
+                event, data = "message", []
+                continue
+            if line.startswith(b":"):
+                continue  # 心跳註解
+            field, _, value = line.partition(b":")
+            if value.startswith(b" "):
+                value = value[1:]
+            if field == b"event":
+                event = value.decode("utf-8")
+            elif field == b"data":
+                data.append(value)
+        return False
+
+    def _load_full(self, conn: http.client.HTTPConnection) -> int:
+        """GET /status and replace the local store with it. Returns the owner's version."""
+        conn.request("GET", "/status")
+        resp = conn.getresponse()
+        body = resp.read()
+        if resp.status != 200:
+            raise ValueError(f"/status returned {resp.status}")
+        store = json_codec.loads(body)
+        if not isinstance(store, dict):
+            raise ValueError("/status did not return an object")
+
+        ls._commit_updates([
+            (source, data, ls._payload_digest(data))
+            for source, data in store.items() if isinstance(data, dict)
+        ])
+        for source in set(ls.get_all_data()) - set(store):
+            ls.remove_data(source)
+        return int(resp.getheader("X-Store-Version") or 0)
+
+    def _dispatch(self, event: str, raw: bytes) -> bool:
+        """Apply one SSE event. Returns True if a full resync is needed."""
+        if event == "reset":
+            return True
+        payload = json_codec.loads(raw)
+        if event == "update":
+            data = payload.get("data")
+            if isinstance(data, dict) and data.get("source"):
+                ls._commit_updates([(data["source"], data, ls._payload_digest(data))])
+        elif event == "remove":
+            ls.remove_data(payload.get("source", ""))
+        elif event == "seen" and isinstance(payload, dict):
+            # 擁有者去重的重送不發布 update；只同步最後收到時間，資料才不會誤判為過期
+            ls._merge_last_seen(payload)
+        return False
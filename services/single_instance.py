@@ -0,0 +1,154 @@
+"""
+單一執行個體鎖與啟動命令轉交
+
+main.py / widget_main.py 在匯入 Tk 與 requests 之前先呼叫 acquire()：
+
+- 以綁定 127.0.0.1:CONTROL_PORT 作為鎖（綁定是原子操作，程式結束時由系統釋放）
+- 取得鎖的程式在背景執行緒接受命令（show / refresh / openurl），交給 set_handler() 的回呼
+- 沒取得鎖的程式以 forward() 把自己的意圖送給已在執行的程式後立即結束
+
+只使用標準函式庫的 socket，第二次啟動不載入 GUI 或 HTTP 套件。
+
+    lock = single_instance.acquire()
+    if lock is None and single_instance.forward(commands):
+        return
+"""
+from __future__ import annotations
+
+import os
+import socket
+import threading
+from typing import Callable, Iterable, Optional
+
+CONTROL_PORT = int(os.environ.get("AI_MONITOR_CONTROL_PORT", "7891"))
+
+# 握手前綴：port 被其他程式占用時不會誤把命令送過去
+_MAGIC = b"AI-MONITOR/1"
+_REPLY_OK = b"OK\n"
+
+COMMANDS = ("show", "refresh", "openurl")
+
+
+def commands_from_argv(argv: Iterable[str]) -> list[str]:
+    """Launch intent for a second instance: always "show", plus --refresh / --openurl."""
+    argv = list(argv)
+    commands = ["show"]
+    if "--refresh" in argv:
+        commands.append("refresh")
+    if "--openurl" in argv:
+        commands.append("openurl")
+    return commands
+
+
+class InstanceLock:
+    """Held by the running instance; accepts commands from later launches."""
+
+    def __init__(self, sock: socket.socket):
+        self._sock = sock
+        self._lock = threading.Lock()
+        self._handler: Optional[Callable[[str], None]] = None
+        self._pending: list[str] = []
+        self._thread = threading.Thread(target=self._serve, daemon=True, name="ai-monitor-instance")
+        self._thread.start()
+
+    def set_handler(self, handler: Callable[[str], None]):
+        """handler(command) runs on the listener thread; commands received earlier are replayed."""
+        with self._lock:
+            self._handler = handler
+            pending, self._pending = self._pending, []
+        for command in pending:
+            self._dispatch(handler, command)
+
+    def close(self):
+        with self._lock:
+            self._handler = None
+        try:
+            # Linux：close() 不會喚醒另一個執行緒中阻塞的 accept()，需先 shutdown
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+        self._thread.join(1.0)
+
+    # ── 背景接收 ─────────────────────────────────────────────────────
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return  # close()
+            with conn:
+                commands = self._read_request(conn)
+                if commands is None:
+                    continue
+                try:
+                    conn.sendall(_REPLY_OK)
+                    # 等對方先關閉，TIME_WAIT 留在用戶端，不影響下次綁定
+                    conn.recv(1)
+                except OSError:
+                    pass
+            for command in commands:
+                self._deliver(command)
+
+    @staticmethod
+    def _read_request(conn: socket.socket) -> Optional[list[str]]:
+        conn.settimeout(1.0)
+        buf = b""
+        try:
+            while b"\n" not in buf and len(buf) < 256:
+                chunk = conn.recv(256)
+                if not chunk:
+                    break
+                buf += chunk
+        except OSError:
+            return None
+        words = buf.split(b"\n", 1)[0].split()
+        if not words or words[0] != _MAGIC:
+            return None
+        commands = [w.decode("ascii", "replace") for w in words[1:]]
+        return [c for c in commands if c in COMMANDS]
+
+    def _deliver(self, command: str):
+        with self._lock:
+            handler = self._handler
+            if handler is None:
+                self._pending.append(command)
+                return
+        self._dispatch(handler, command)
+
+    @staticmethod
+    def _dispatch(handler: Callable[[str], None], command: str):
+        try:
+            handler(command)
+        except Exception as e:
+            print(f"[AI Monitor] 處理啟動命令失敗 ({command}): {e}")
+
+
+def acquire(port: int = CONTROL_PORT) -> Optional[InstanceLock]:
+    """Become the running instance, or return None if another one holds the lock."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if hasattr(socket, "SO_EXCLUSIVEADDRUSE"):
+        # Windows：預設允許其他程式以 SO_REUSEADDR 搶用同一個 port
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+    else:
+        # POSIX：SO_REUSEADDR 不允許兩個 listen 同時綁定，只略過 TIME_WAIT
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    try:
+        sock.bind(("127.0.0.1", port))
+        sock.listen(8)
+    except OSError:
+        sock.close()
+        return None
+    return InstanceLock(sock)
+
+
+def forward(commands: Iterable[str], port: int = CONTROL_PORT, timeout: float = 1.0) -> bool:
+    """Send *commands* to the running instance. True if it acknowledged them."""
+    request = b" ".join([_MAGIC] + [c.encode("ascii") for c in commands]) + b"\n"
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=timeout) as conn:
+            conn.sendall(request)
+            return conn.recv(len(_REPLY_OK)) == _REPLY_OK
+    except OSError:
+        return False
@@ -18,6 +18,20 @@ a = Analysis(
         'PIL.Image',
         'PIL.ImageDraw',
         'services.local_server',
+        'services.ingest_journal',
+        'services.async_server',
+        'services.rate_limit',
+        'services.json_codec',
+        'services.server_stats',
+        'services.event_bus',
+        'services.shared_ingest',
+        'services.single_instance',
+        'services.quota_schema',
+        'services.history_store',
+        'services.metric_buffer',
+        'services.downsample',
+        'services.forecast',
+        'services.refresh_scheduler',
         'services.browser_data',
         'services.base',
         'config.manager',
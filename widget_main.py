@@ -2,7 +2,10 @@
 桌面小工具入口點
 
 執行方式：
-    python widget_main.py
+    python widget_main.py [--openurl] [--refresh]
+
+已有小工具在執行時，再次啟動只會把命令（顯示視窗、重新整理、開啟網頁）
+轉交給它並立即結束。
 
 打包後執行：
     dist/AI額度監控-桌面小工具.exe
@@ -21,13 +24,24 @@ os.chdir(base_dir)
 if base_dir not in sys.path:
     sys.path.insert(0, base_dir)
 
-# ── 啟動桌面小工具 ────────────────────────────────────────────────────────
-from desktop_widget.app import DesktopWidget
-from desktop_widget.tray import SystemTray, is_available as tray_available
+# ── 單一執行個體：已在執行時轉交命令後結束（不載入 Tk / requests）──────────
+from services import single_instance
 
 
 def main():
+    lock = single_instance.acquire()
+    if lock is None:
+        if single_instance.forward(single_instance.commands_from_argv(sys.argv[1:])):
+            return
+        print("[Widget] 無法連絡已在執行的小工具，改為啟動新的視窗")
+
+    # ── 啟動桌面小工具 ────────────────────────────────────────────────────
+    from desktop_widget.app import DesktopWidget, _open_all_in_new_window
+    from desktop_widget.tray import SystemTray, is_available as tray_available
+
     app = DesktopWidget()
+    if lock is not None:
+        lock.set_handler(app.on_instance_command)
 
     # 系統匣圖示（若 pystray + Pillow 已安裝）
     tray = SystemTray(app)
@@ -40,13 +54,14 @@ def main():
 
     # --openurl：啟動時自動開啟四個額度網頁
     if "--openurl" in sys.argv:
-        from desktop_widget.app import _open_all_in_new_window
         app.after(2000, _open_all_in_new_window)
 
     try:
         app.mainloop()
     finally:
         tray.stop()
+        if lock is not None:
+            lock.close()
 
 
 if __name__ == "__main__":